@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Модуль призначено для паралельного виконання коду програми для багатьох
+наборів значень вхідних змінних у пулі процесів.
+
+Код програми передається кожному процесу пулу один раз (при запуску
+процесу), де компілюється функцією `python_backend.compile_program`.
+Після цього процесам надсилаються лише частини (chunks) наборів значень.
+Кожен процес має власну пам'ять (storage): перед виконанням програми для
+набору значень усі змінні стають невизначеними, а потім вхідним змінним
+присвоюються значення з набору.
+
+Результати повертаються у порядку наборів значень. Для кожного набору
+повертається код помилки (див. `interpreter.ERRORS`) та значення змінних.
+Якщо у наборі немає значення змінної, яку програма читає до присвоєння,
+то програма для нього не виконується (у процесах пулу значення не можна
+ввести з клавіатури), а повертається помилка 2.
+
+Пам'ять процесу пулу містить лише змінні програми, тому номери їх комірок
+відрізняються від номерів у пам'яті поточного процесу. Команди з номерами
+комірок (див. `code_generator.resolve_slots`) перед передачею коду
+замінюються командами з іменами змінних пам'яті поточного процесу.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import storage
+from closure_engine import _expand
+from code_generator import unresolve_slots
+from python_backend import compile_program
+
+# кількість частин наборів значень на один процес, якщо розмір частини
+# визначається автоматично
+CHUNKS_PER_WORKER = 4
+# розмір частини, якщо кількість наборів невідома
+DEFAULT_CHUNK_SIZE = 256
+# максимальна кількість частин, що одночасно обробляються або очікують,
+# на один процес
+PENDING_PER_WORKER = 2
+
+_worker = None      # стан процесу пулу (див. `_init_worker`)
+
+
+def run_batch(code, bindings, outputs=None, workers=None, chunk_size=None):
+    """Функція виконує код програми для кожного набору значень з bindings.
+
+    :param code: код програми - список кортежів (<команда>, <операнд>)
+    :param bindings: послідовність словників {ім'я змінної: значення}
+    :param outputs: імена змінних, значення яких потрібно повернути
+        (за замовчуванням - усі змінні програми)
+    :param workers: кількість процесів пулу (за замовчуванням - кількість
+        ядер процесора); 0 - виконання у поточному процесі, при цьому
+        змінюється пам'ять поточного процесу
+    :param chunk_size: кількість наборів значень в одній частині
+        (за замовчуванням див. `chunk_size_for`)
+    :return: список пар (<код помилки>, <словник {ім'я змінної: значення}>)
+    """
+    return list(iter_batch(code, bindings, outputs, workers, chunk_size))
+
+
+def iter_batch(code, bindings, outputs=None, workers=None, chunk_size=None):
+    """Генератор виконує код програми для кожного набору значень з bindings
+    та повертає результати по одному у порядку наборів.
+
+    Набори значень читаються з bindings поступово, тому bindings може бути
+    довільним ітератором. Параметри такі ж, як у `run_batch`.
+
+    :return: пари (<код помилки>, <словник {ім'я змінної: значення}>)
+    """
+    code = unresolve_slots(code)
+    variables, inputs = program_variables(code)
+    outputs = list(variables if outputs is None else outputs)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if chunk_size is None:
+        size = len(bindings) if hasattr(bindings, "__len__") else None
+        chunk_size = chunk_size_for(size, max(workers, 1))
+    chunks = _chunks(bindings, chunk_size)
+    init_args = (code, variables, inputs, outputs)
+
+    if workers == 0:
+        _init_worker(*init_args)
+        for chunk in chunks:
+            yield from _results(outputs, _run_chunk(chunk))
+        return
+
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=init_args) as executor:
+        pending = []
+        for chunk in chunks:
+            pending.append(executor.submit(_run_chunk, chunk))
+            if len(pending) >= workers * PENDING_PER_WORKER:
+                yield from _results(outputs, pending.pop(0).result())
+        for future in pending:
+            yield from _results(outputs, future.result())
+
+
+def chunk_size_for(count, workers):
+    """Функція повертає розмір частини наборів значень.
+
+    Набори діляться на CHUNKS_PER_WORKER частин на кожен процес: менші
+    частини краще розподіляють роботу між процесами, більші - зменшують
+    витрати на передачу даних між процесами.
+
+    :param count: кількість наборів значень або None, якщо вона невідома
+    :param workers: кількість процесів
+    :return: розмір частини
+    """
+    if count is None:
+        return DEFAULT_CHUNK_SIZE
+    return max(1, -(-count // (workers * CHUNKS_PER_WORKER)))
+
+
+def program_variables(code):
+    """Функція повертає змінні програми та її вхідні змінні.
+
+    Вхідні змінні - це змінні, значення яких програма читає до першого
+    присвоєння. Комірки, яких немає у пам'яті (ім'я None), пропускаються.
+
+    :param code: код програми
+    :return: (<список змінних у порядку появи>, <список вхідних змінних>)
+    """
+    variables, inputs = {}, []
+    for command, operand in _expand(code):
+        if command == "LOADV" or command == "SET" or command == "SETKEEP":
+            if operand is not None and operand not in variables:
+                variables[operand] = True
+                if command == "LOADV":
+                    inputs.append(operand)
+    return list(variables), inputs
+
+
+def _chunks(bindings, chunk_size):
+    """Генератор ділить набори значень на частини.
+
+    :param bindings: ітерований об'єкт наборів значень
+    :param chunk_size: розмір частини
+    :return: списки наборів значень
+    """
+    iterator = iter(bindings)
+    chunk = list(islice(iterator, chunk_size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, chunk_size))
+
+
+def _results(outputs, chunk_results):
+    """Генератор перетворює результати частини у пари
+    (<код помилки>, <словник значень>).
+
+    :param outputs: імена змінних
+    :param chunk_results: список пар (<код помилки>, <кортеж значень>)
+    :return: пари (<код помилки>, <словник значень>)
+    """
+    for error, values in chunk_results:
+        yield error, dict(zip(outputs, values))
+
+
+def _init_worker(code, variables, inputs, outputs):
+    """Функція готує процес пулу: додає змінні до пам'яті та компілює код.
+
+    Побічний ефект: очищує пам'ять процесу.
+
+    :param code: код програми
+    :param variables: змінні програми
+    :param inputs: вхідні змінні програми
+    :param outputs: імена змінних, значення яких потрібно повернути
+    :return: None
+    """
+    global _worker
+    storage.clear()
+    for variable in variables:
+        storage.add(variable)
+    output_slots = [storage.slot(variable) for variable in outputs]
+    _worker = (compile_program(code), tuple(inputs), output_slots)
+
+
+def _run_chunk(chunk):
+    """Функція виконує програму для кожного набору значень частини.
+
+    :param chunk: список наборів значень
+    :return: список пар (<код помилки>, <кортеж значень змінних outputs>)
+    """
+    program, inputs, output_slots = _worker
+    values = storage._values
+    slots = storage._slots
+    blank = [None] * len(values)
+    results = []
+    for binding in chunk:
+        values[:] = blank
+        for variable, value in binding.items():
+            index = slots.get(variable)
+            if index is not None:
+                values[index] = float(value)
+        if all(variable in binding for variable in inputs):
+            error = program()
+        else:
+            error = 2
+        results.append((error, tuple(None if index is None else values[index]
+                                     for index in output_slots)))
+    return results
+
+
+if __name__ == "__main__":
+    import random
+
+    import interpreter
+    from code_generator import generate_code
+
+    code, error = generate_code(["y = a * x + b", "z = y / (x - 1)", "w = z"])
+    success = program_variables(code) == (["a", "x", "b", "y", "z", "w"], ["a", "x", "b"])
+
+    rnd = random.Random(0)
+    bindings = [{"a": rnd.randint(-2, 2), "b": 1.5, "x": rnd.randint(0, 3)} for _ in range(200)]
+    bindings[7] = {"a": 1.0, "x": 2.0}
+    expected = []
+    for binding in bindings:
+        for variable in storage.variables():
+            storage.set(variable, binding.get(variable))
+        if all(variable in binding for variable in ("a", "b", "x")):
+            error = interpreter.execute(code)
+        else:
+            error = 2
+        expected.append((error, {"y": storage._values[storage.slot("y")],
+                                 "w": storage._values[storage.slot("w")]}))
+
+    success = success and run_batch(code, bindings, ["y", "w"], workers=0) == expected
+    success = success and run_batch(code, bindings, ["y", "w"], workers=2, chunk_size=7) == expected
+    success = success and list(iter_batch(code, iter(bindings), ["y", "w"], workers=2)) == expected
+    success = success and expected[7][0] == 2 and any(error == 3 for error, _ in expected)
+    generate_code(["q = a + x"])
+    code, error = generate_code(["y = x - a"], clear_storage=False, slots=True)
+    success = success and code == [("LOADS", 1), ("LOADS", 0), ("SUB", None), ("SETS", 3)]
+    expected = [(0, {"y": 9.0}), (2, {"y": None})]
+    bindings = [{"x": 10, "a": 1}, {"x": 10}]
+    success = success and run_batch(code, bindings, ["y"], workers=2) == expected
+    success = success and run_batch(code, bindings, ["y"], workers=0) == expected
+    success = success and run_batch([("LOADC", 1.0), ("SETS", 99)], [{}], workers=0) == [(2, {})]
+    success = success and chunk_size_for(1000, 8) == 32 and chunk_size_for(None, 8) == DEFAULT_CHUNK_SIZE
+
+    print("Success =", success)
@@ -0,0 +1,312 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Модуль призначено для вимірювання масштабованості всього конвеєра
+інтерпретатора: токенізація (`tokenizer.get_tokens`) -> перевірка
+синтаксису (`syntax_analyzer.check_assignment_syntax`) -> генерація коду
+(`code_generator.generate_code`) -> виконання (`interpreter.execute`).
+
+Синтетичні програми '.mlg' генеруються функцією `generate_mlg` уздовж
+кількох осей (AXES):
+    line_length - кількість доданків у рядку
+    nesting - глибина вкладеності дужок
+    lines - кількість рядків
+    variables - кількість змінних
+    operators - набір операцій у виразах
+Для кожної програми етапи конвеєра вимірюються окремо (найкращий час з
+кількох повторень, див. `benchmarks.measure`), обчислюється пропускна
+здатність (символів програми за секунду, для виконання - команд за
+секунду) та пікова пам'ять етапу (tracemalloc, окремим запуском). Для
+числових осей обчислюється показник степеня k у залежності
+time ~ size ** k (див. `benchmarks.fit_exponent`).
+
+Результати зберігаються у JSON та порівнюються зі збереженою базою
+(baseline): регресією вважається збільшення часу або пікової пам'яті
+більше, ніж на tolerance, або збільшення показника степеня більше, ніж на
+EXPONENT_TOLERANCE.
+
+Запуск:
+    python bench_suite.py [--quick] [--save results.json] [--baseline baseline.json]
+                          [--axis <вісь>] [--write <каталог>]
+Код завершення 1 означає, що знайдено регресії.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+import interpreter
+from benchmarks import measure, fit_exponent
+from code_generator import generate_code, cache_clear
+from syntax_analyzer import check_assignment_syntax
+from tokenizer import get_tokens
+
+# версія формату результатів
+FORMAT_VERSION = 1
+
+# етапи конвеєра
+STAGES = ("get_tokens", "check_assignment_syntax", "generate_code", "execute")
+
+# осі: параметр generate_mlg та його значення (повний і швидкий набір)
+AXES = {
+    "line_length": ("terms", (100, 400, 1600, 6400), (50, 200, 800)),
+    "nesting": ("depth", (100, 1000, 10000, 50000), (100, 1000, 5000)),
+    "lines": ("lines", (100, 400, 1600, 6400), (50, 200, 800)),
+    "variables": ("variables", (10, 100, 1000, 10000), (10, 100, 1000)),
+    "operators": ("operators", ("+", "+-", "*", "*/", "+-*/"), ("+", "*/", "+-*/")),
+}
+
+# параметри програми за замовчуванням (крім параметра осі)
+DEFAULTS = {"lines": 200, "terms": 8, "depth": 0, "variables": 20, "operators": "+-*/"}
+
+# допустиме відносне збільшення часу та пам'яті
+TOLERANCE = 0.25
+# допустиме збільшення показника степеня
+EXPONENT_TOLERANCE = 0.3
+# мінімальне збільшення часу у секундах, що вважається регресією
+# (менші різниці - шум вимірювання)
+MIN_DELTA = 0.0005
+
+# заміна символів операцій в іменах файлів програм
+_FILE_NAMES = str.maketrans("+-*/", "asmd")
+
+
+def generate_mlg(lines=200, terms=8, depth=0, variables=20, operators="+-*/", seed=0):
+    """Функція генерує синтетичну програму.
+
+    Перші variables рядків задають значення вхідних змінних v0, v1, ...;
+    далі lines рядків присвоюють змінним r0, r1, ... вирази з terms
+    операндів, вкладені у depth пар дужок. Ділення виконується лише на
+    вхідні змінні та ненульові константи, тому програма виконується без
+    помилок та без введення з клавіатури.
+
+    :param lines: кількість рядків з виразами
+    :param terms: кількість операндів у виразі
+    :param depth: глибина вкладеності дужок
+    :param variables: кількість вхідних змінних (і змінних результатів)
+    :param operators: рядок з операцій, що використовуються у виразах
+    :param seed: зерно генератора випадкових чисел
+    :return: список рядків програми
+    """
+    rnd = random.Random(seed)
+    inputs = ["v{}".format(i) for i in range(variables)]
+    program = ["{} = {}".format(name, i + 1) for i, name in enumerate(inputs)]
+    for i in range(lines):
+        parts = [rnd.choice(inputs)]
+        for _ in range(terms - 1):
+            operand = rnd.choice(inputs) if rnd.random() < 0.6 else str(rnd.randint(1, 9))
+            parts += [rnd.choice(operators), operand]
+        expression = "(" * depth + " ".join(parts) + ")" * depth
+        program.append("r{} = {}".format(i % variables, expression))
+    return program
+
+
+def write_mlg(path, program):
+    """Функція записує програму у файл '.mlg'.
+
+    :param path: шлях до файлу
+    :param program: список рядків програми
+    :return: None
+    """
+    with open(path, "w") as file:
+        file.write("\n".join(program) + "\n")
+
+
+def run_stages(program, repeat=3):
+    """Функція вимірює етапи конвеєра для програми.
+
+    :param program: список рядків програми
+    :param repeat: кількість повторень вимірювання
+    :return: словник {етап: {"time": с, "throughput": одиниць/с,
+        "peak_memory": байтів}}
+    """
+    tokens = [get_tokens(line) for line in program]
+    code, error = generate_code(program)
+    if error:
+        raise ValueError(error)
+    chars = sum(len(line) for line in program)
+    calls = {
+        "get_tokens": (lambda lines: [get_tokens(line) for line in lines], program, chars),
+        "check_assignment_syntax": (lambda items: [check_assignment_syntax(item) for item in items],
+                                    tokens, chars),
+        "generate_code": (_generate_cold, program, chars),
+        "execute": (interpreter.execute, code, len(code)),
+    }
+    result = {}
+    for stage in STAGES:
+        func, arg, units = calls[stage]
+        elapsed = measure(func, arg, repeat)
+        tracemalloc.start()
+        func(arg)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        result[stage] = {"time": elapsed, "throughput": units / max(elapsed, 1e-9), "peak_memory": peak}
+    return result
+
+
+def _generate_cold(program):
+    """Функція генерує код програми з порожнім кешем рядків
+    (див. `code_generator.cache_clear`), щоб вимірювати генерацію, а не
+    читання кешу.
+
+    :param program: список рядків програми
+    :return: (<код>, <текст помилки>)
+    """
+    cache_clear()
+    return generate_code(program)
+
+
+def run_suite(quick=False, repeat=3, axes=None, directory=None):
+    """Функція вимірює етапи конвеєра уздовж осей.
+
+    :param quick: використовувати швидкий (менший) набір значень осей
+    :param repeat: кількість повторень вимірювання
+    :param axes: імена осей (за замовчуванням - усі осі AXES)
+    :param directory: каталог, у який записуються згенеровані програми
+        '<вісь>_<значення>.mlg' (операції у імені: a, s, m, d), або None
+    :return: словник результатів (див. `save_results`)
+    """
+    results = {"version": FORMAT_VERSION, "python": platform.python_version(),
+               "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "quick": quick, "axes": {}}
+    for axis in axes or AXES:
+        parameter, sizes, quick_sizes = AXES[axis]
+        sizes = quick_sizes if quick else sizes
+        stages = {stage: {"time": [], "throughput": [], "peak_memory": []} for stage in STAGES}
+        for size in sizes:
+            options = dict(DEFAULTS)
+            options[parameter] = size
+            if parameter == "depth":
+                options["lines"] = 10
+            program = generate_mlg(**options)
+            if directory is not None:
+                name = "{}_{}.mlg".format(axis, str(size).translate(_FILE_NAMES))
+                write_mlg(os.path.join(directory, name), program)
+            measured = run_stages(program, repeat)
+            for stage in STAGES:
+                for key, value in measured[stage].items():
+                    stages[stage][key].append(value)
+        if all(isinstance(size, int) for size in sizes):
+            for stage in STAGES:
+                stages[stage]["exponent"] = fit_exponent(sizes, stages[stage]["time"])
+        results["axes"][axis] = {"parameter": parameter, "sizes": list(sizes), "stages": stages}
+    return results
+
+
+def save_results(results, path):
+    """Функція зберігає результати у файл JSON.
+
+    :param results: словник результатів
+    :param path: шлях до файлу
+    :return: None
+    """
+    with open(path, "w") as file:
+        json.dump(results, file, indent=1)
+
+
+def load_results(path):
+    """Функція читає результати з файлу JSON.
+
+    :param path: шлях до файлу
+    :return: словник результатів
+    """
+    with open(path) as file:
+        return json.load(file)
+
+
+def compare(results, baseline, tolerance=TOLERANCE, exponent_tolerance=EXPONENT_TOLERANCE):
+    """Функція порівнює результати з базою та повертає регресії.
+
+    Порівнюються лише осі та значення осей, що є в обох результатах.
+    Збільшення часу, менше за MIN_DELTA секунд, не вважається регресією.
+
+    :param results: словник результатів
+    :param baseline: словник результатів бази
+    :param tolerance: допустиме відносне збільшення часу та пам'яті
+    :param exponent_tolerance: допустиме збільшення показника степеня
+    :return: список рядків з описом регресій
+    """
+    regressions = []
+    for axis, current in results["axes"].items():
+        base = baseline.get("axes", {}).get(axis)
+        if base is None:
+            continue
+        positions = {size: i for i, size in enumerate(base["sizes"])}
+        for stage, values in current["stages"].items():
+            base_values = base["stages"].get(stage)
+            if base_values is None:
+                continue
+            for i, size in enumerate(current["sizes"]):
+                j = positions.get(size)
+                if j is None:
+                    continue
+                for key in ("time", "peak_memory"):
+                    old, new = base_values[key][j], values[key][i]
+                    if old > 0 and new > old * (1 + tolerance) and (key != "time" or new - old > MIN_DELTA):
+                        regressions.append("{} {}={} {}: {} {:.4g} -> {:.4g} (+{:.0%})".format(
+                            axis, current["parameter"], size, stage, key, old, new, new / old - 1))
+            if "exponent" in values and "exponent" in base_values:
+                old, new = base_values["exponent"], values["exponent"]
+                if new > old + exponent_tolerance:
+                    regressions.append("{} {}: exponent {:.2f} -> {:.2f}".format(axis, stage, old, new))
+    return regressions
+
+
+def report(results):
+    """Функція друкує таблицю результатів.
+
+    :param results: словник результатів
+    :return: None
+    """
+    for axis, data in results["axes"].items():
+        print("\n{} ({})".format(axis, data["parameter"]))
+        print("{:>10} {:>24} {:>12} {:>14} {:>12}".format("size", "stage", "time, s", "throughput/s",
+                                                          "peak, KiB"))
+        for i, size in enumerate(data["sizes"]):
+            for stage in STAGES:
+                values = data["stages"][stage]
+                print("{:>10} {:>24} {:>12.6f} {:>14.0f} {:>12.1f}".format(
+                    size, stage, values["time"][i], values["throughput"][i],
+                    values["peak_memory"][i] / 1024))
+        for stage in STAGES:
+            if "exponent" in data["stages"][stage]:
+                print("{}: time ~ {} ** {:.2f}".format(stage, data["parameter"],
+                                                        data["stages"][stage]["exponent"]))
+
+
+def main(argv=None):
+    """Функція запускає набір вимірювань з командного рядка.
+
+    :param argv: аргументи командного рядка (за замовчуванням sys.argv[1:])
+    :return: код завершення: 0 - без регресій, 1 - знайдено регресії
+    """
+    parser = argparse.ArgumentParser(description="Вимірювання масштабованості конвеєра MatLang")
+    parser.add_argument("--quick", action="store_true", help="менші програми")
+    parser.add_argument("--repeat", type=int, default=3, help="кількість повторень")
+    parser.add_argument("--axis", action="append", choices=list(AXES), help="вісь (можна кілька)")
+    parser.add_argument("--save", help="файл JSON для результатів")
+    parser.add_argument("--baseline", help="файл JSON бази для порівняння")
+    parser.add_argument("--write", metavar="DIR", help="каталог для згенерованих програм '.mlg'")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="допустиме відносне збільшення часу та пам'яті")
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.quick, args.repeat, args.axis, args.write)
+    report(results)
+    if args.save:
+        save_results(results, args.save)
+    if args.baseline:
+        regressions = compare(results, load_results(args.baseline), args.tolerance)
+        print("\nРегресії:" if regressions else "\nРегресій немає")
+        for line in regressions:
+            print("  " + line)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
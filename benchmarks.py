@@ -0,0 +1,499 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Модуль призначено для вимірювання швидкодії модулів інтерпретатора.
+
+Для кожного розміру вхідних даних вимірюється найкращий час з кількох
+повторень. За результатами для послідовних розмірів обчислюється показник
+степеня k у залежності time ~ size ** k (k ~ 1 - лінійний час,
+k ~ 2 - квадратичний).
+
+Запуск:
+    python benchmarks.py
+"""
+
+import math
+import os
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+import interpreter
+import reactive
+import storage
+from batch import run_batch
+from closure_engine import compile_code
+from mapped_storage import MappedStorage
+from python_backend import compile_program, cache_clear as python_cache_clear
+from code_generator import generate_code, resolve_slots
+from scheduler import build_graph, graph_metrics, run_parallel
+from optimizer import optimize, peephole, select_superinstructions, FUSIONS
+from tokenizer import get_tokens, _get_tokens_legacy
+from vectorized import execute_vectorized, np
+
+
+def generate_sum_line(terms):
+    """Функція генерує рядок присвоєння з довгою сумою доданків.
+
+    :param terms: кількість доданків
+    :return: рядок виду `x = (v0 + 1.5) * v1 - ...`
+    """
+    parts = []
+    for i in range(terms):
+        if i % 3 == 0:
+            parts.append("(v{} + {}.5)".format(i, i))
+        elif i % 3 == 1:
+            parts.append("v{} * {}".format(i, i))
+        else:
+            parts.append("{} / _w{}".format(i + 1, i))
+    return "x = " + " - ".join(parts)
+
+
+def measure(func, arg, repeat=3):
+    """Функція повертає найкращий час виконання func(arg) у секундах.
+
+    :param func: функція
+    :param arg: аргумент функції
+    :param repeat: кількість повторень
+    :return: час у секундах
+    """
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(arg)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def fit_exponent(sizes, times):
+    """Функція оцінює показник степеня k у залежності time ~ size ** k
+    методом найменших квадратів у логарифмічному масштабі.
+
+    :param sizes: список розмірів
+    :param times: список часів
+    :return: показник степеня k
+    """
+    xs = [math.log(s) for s in sizes]
+    ys = [math.log(max(t, 1e-9)) for t in times]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    num = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    den = sum((x - mean_x) ** 2 for x in xs)
+    return num / den if den else 0.0
+
+
+def bench_tokenizer(sizes=(2000, 4000, 8000, 16000, 32000), legacy_limit=400000):
+    """Функція вимірює час роботи `get_tokens` та `_get_tokens_legacy`
+    на рядках різної довжини та друкує таблицю результатів.
+
+    Старий токенізатор запускається лише для рядків, довжина яких
+    не перевищує legacy_limit, бо працює за квадратичний час.
+
+    :param sizes: кількість доданків у рядках
+    :param legacy_limit: максимальна довжина рядка для старого токенізатора
+    :return: словник {назва: показник степеня}
+    """
+    print("{:>10} {:>14} {:>14}".format("chars", "get_tokens, s", "legacy, s"))
+    lengths, new_times, legacy_lengths, legacy_times = [], [], [], []
+    for size in sizes:
+        line = generate_sum_line(size)
+        new_time = measure(get_tokens, line)
+        lengths.append(len(line))
+        new_times.append(new_time)
+        legacy_time = None
+        if len(line) <= legacy_limit:
+            assert get_tokens(line) == _get_tokens_legacy(line)
+            legacy_time = measure(_get_tokens_legacy, line, repeat=1)
+            legacy_lengths.append(len(line))
+            legacy_times.append(legacy_time)
+        print("{:>10} {:>14.6f} {:>14}".format(
+            len(line), new_time,
+            "-" if legacy_time is None else "{:.6f}".format(legacy_time)))
+    result = {"get_tokens": fit_exponent(lengths, new_times)}
+    if len(legacy_lengths) > 1:
+        result["legacy"] = fit_exponent(legacy_lengths, legacy_times)
+    for name, exponent in result.items():
+        print("{}: time ~ chars ** {:.2f}".format(name, exponent))
+    return result
+
+
+def bench_parsers(sizes=(25, 50, 100, 200, 400, 800, 1600, 3200), recursive_limit=200):
+    """Функція вимірює час генерації коду для рядка `x = 1 + 2 + ... + n`
+    кожним розбором з code_generator.PARSERS.
+
+    Рекурсивний розбір запускається лише для n <= recursive_limit,
+    бо працює за кубічний час.
+
+    :param sizes: кількість доданків у рядках
+    :param recursive_limit: максимальна кількість доданків для рекурсивного розбору
+    :return: словник {назва розбору: показник степеня}
+    """
+    print("{:>10} {:>14} {:>14} {:>14}".format("terms", "iterative, s", "precedence, s", "recursive, s"))
+    times = {"iterative": ([], []), "precedence": ([], []), "recursive": ([], [])}
+    for size in sizes:
+        line = "x = " + " + ".join(str(i) for i in range(1, size + 1))
+        row = []
+        for parser in times:
+            if parser == "recursive" and size > recursive_limit:
+                row.append("-")
+                continue
+            elapsed = measure(lambda lines: generate_code(lines, parser=parser), [line], repeat=1)
+            times[parser][0].append(size)
+            times[parser][1].append(elapsed)
+            row.append("{:.6f}".format(elapsed))
+        print("{:>10} {:>14} {:>14} {:>14}".format(size, *row))
+    result = {parser: fit_exponent(*points) for parser, points in times.items() if len(points[0]) > 1}
+    for name, exponent in result.items():
+        print("{}: time ~ terms ** {:.2f}".format(name, exponent))
+    return result
+
+
+def bench_nesting(depths=(1000, 10000, 100000)):
+    """Функція вимірює час генерації коду нерекурсивним розбором для рядка
+    `x = ((...(a + 1)...))` з різною глибиною вкладеності дужок.
+
+    :param depths: глибини вкладеності
+    :return: показник степеня залежності часу від глибини
+    """
+    print("{:>10} {:>14}".format("depth", "iterative, s"))
+    times = []
+    for depth in depths:
+        line = "x = " + "(" * depth + "a + 1" + ")" * depth
+        elapsed = measure(lambda lines: generate_code(lines, parser="iterative"), [line], repeat=1)
+        times.append(elapsed)
+        print("{:>10} {:>14.6f}".format(depth, elapsed))
+    exponent = fit_exponent(depths, times)
+    print("iterative: time ~ depth ** {:.2f}".format(exponent))
+    return exponent
+
+
+def generate_program(lines, variables=10, seed=0):
+    """Функція генерує програму з випадкових присвоєнь.
+
+    Перші variables рядків задають значення всіх змінних, тому програма
+    виконується без введення з клавіатури.
+
+    :param lines: кількість рядків з виразами
+    :param variables: кількість змінних
+    :param seed: зерно генератора випадкових чисел
+    :return: список рядків програми
+    """
+    rnd = random.Random(seed)
+    names = ["v{}".format(i) for i in range(variables)]
+    program = ["{} = {}".format(name, i + 1) for i, name in enumerate(names)]
+
+    def operand():
+        return rnd.choice(names) if rnd.random() < 0.6 else str(rnd.randint(1, 9))
+
+    for _ in range(lines):
+        expression = operand()
+        for _ in range(rnd.randint(1, 4)):
+            term = "{} {} {}".format(operand(), rnd.choice("*/"), operand()) \
+                if rnd.random() < 0.4 else operand()
+            expression = "{} {} {}".format(expression, rnd.choice("+-"), term)
+        program.append("{} = {}".format(rnd.choice(names), expression))
+    return program
+
+
+def run_program(code):
+    """Функція виконує код програми, попередньо визначивши всі змінні пам'яті.
+
+    :param code: список команд або функція програми (`closure_engine`)
+    :return: код помилки
+    """
+    for name in storage.variables():
+        storage.set(name, 1.0)
+    if callable(code):
+        return code()
+    return interpreter.execute(code)
+
+
+def profile_fusions(programs=20, lines=500, repeat=5):
+    """Функція вимірює, наскільки кожен вид суперкоманд з optimizer.FUSIONS
+    прискорює виконання тестового набору програм.
+
+    Для кожної програми код оптимізується (`optimize`, `peephole`),
+    після чого час виконання з одним видом суперкоманд (та з усіма)
+    порівнюється з часом виконання без суперкоманд.
+
+    :param programs: кількість програм у наборі
+    :param lines: кількість рядків у кожній програмі
+    :param repeat: кількість повторень вимірювання
+    :return: словник {вид суперкоманд: відношення часу до базового}
+    """
+    variants = {"none": ()}
+    variants.update((name, (name,)) for name in FUSIONS)
+    variants["all"] = tuple(FUSIONS)
+    totals = dict.fromkeys(variants, 0.0)
+    for seed in range(programs):
+        code, error = generate_code(generate_program(lines, seed=seed))
+        code, _ = peephole(optimize(code)[0])
+        for name, fusions in variants.items():
+            fused, _ = select_superinstructions(code, fusions)
+            totals[name] += measure(run_program, fused, repeat)
+    result = {name: totals[name] / totals["none"] for name in variants}
+    for name, ratio in result.items():
+        print("{:>6}: {:.2f}".format(name, ratio))
+    return result
+
+
+def bench_engines(programs=10, lines=500, repeat=5):
+    """Функція порівнює час виконання тестового набору програм інтерпретатором
+    (без суперкоманд, з DEFAULT_FUSIONS та з комірками пам'яті замість
+    імен змінних) та функціями програм
+    `closure_engine.compile_code` і `python_backend.compile_program`,
+    а також час компіляції функцій програм.
+
+    :param programs: кількість програм у наборі
+    :param lines: кількість рядків у кожній програмі
+    :param repeat: кількість повторень вимірювання
+    :return: словник {назва: сумарний час у секундах}
+    """
+    totals = dict.fromkeys(("execute", "superinstructions", "slots", "closures", "compile",
+                            "python", "python compile"), 0.0)
+    for seed in range(programs):
+        code, error = generate_code(generate_program(lines, seed=seed))
+        code, _ = peephole(optimize(code)[0])
+        fused, _ = select_superinstructions(code)
+        program = compile_code(code)
+        totals["execute"] += measure(run_program, code, repeat)
+        totals["superinstructions"] += measure(run_program, fused, repeat)
+        totals["slots"] += measure(run_program, resolve_slots(fused), repeat)
+        totals["closures"] += measure(run_program, program, repeat)
+        totals["compile"] += measure(compile_code, code, repeat)
+        totals["python"] += measure(run_program, compile_program(code), repeat)
+        python_cache_clear()
+        totals["python compile"] += measure(compile_program, code, 1)
+    for name, total in totals.items():
+        print("{:>17}: {:.6f} s ({:.2f})".format(name, total, total / totals["execute"]))
+    return totals
+
+
+def bench_vectorized(sizes=(1000, 10000, 100000), lines=20):
+    """Функція порівнює час виконання програми для size наборів значень
+    змінних викликами `interpreter.execute` для кожного набору та одним
+    викликом `vectorized.execute_vectorized`.
+
+    Інтерпретатор запускається лише для першого розміру, а його час для
+    інших розмірів оцінюється пропорційно.
+
+    :param sizes: кількості наборів значень
+    :param lines: кількість рядків у програмі
+    :return: словник {кількість наборів: відношення часу execute_vectorized до execute}
+    """
+    if np is None:
+        print("NumPy не встановлено")
+        return {}
+    code, error = generate_code(generate_program(lines))
+    names = storage.variables()
+    rnd = np.random.default_rng(0)
+    print("{:>10} {:>14} {:>14}".format("sets", "execute, s", "vectorized, s"))
+    per_set = None
+    result = {}
+    for size in sizes:
+        inputs = {name: rnd.uniform(1, 2, size) for name in names}
+        if per_set is None:
+            start = time.perf_counter()
+            for i in range(size):
+                for name in names:
+                    storage.set(name, inputs[name][i])
+                interpreter.execute(code)
+            per_set = (time.perf_counter() - start) / size
+        elapsed = measure(lambda values: execute_vectorized(code, values), inputs)
+        result[size] = elapsed / (per_set * size)
+        print("{:>10} {:>14.6f} {:>14.6f}".format(size, per_set * size, elapsed))
+    return result
+
+
+def bench_batch(sets=20000, lines=20, chunk_sizes=(64, 512, 4096)):
+    """Функція вимірює час виконання програми для sets наборів значень
+    функцією `batch.run_batch` з різною кількістю процесів (від 1 до
+    кількості ядер, степені 2) та різними розмірами частин.
+
+    :param sets: кількість наборів значень
+    :param lines: кількість рядків у програмі
+    :param chunk_sizes: розміри частин
+    :return: словник {(кількість процесів, розмір частини): час у секундах}
+    """
+    names = ["v{}".format(i) for i in range(10)]
+    code, error = generate_code(generate_program(lines, len(names))[len(names):])
+    rnd = random.Random(0)
+    bindings = [{name: rnd.uniform(1, 2) for name in names} for _ in range(sets)]
+    workers = [1]
+    while workers[-1] * 2 <= (os.cpu_count() or 1):
+        workers.append(workers[-1] * 2)
+    print("{:>8} {:>8} {:>12}".format("workers", "chunk", "time, s"))
+    result = {}
+    for count in workers:
+        for chunk_size in chunk_sizes:
+            elapsed = measure(lambda items: run_batch(code, items, workers=count, chunk_size=chunk_size),
+                              bindings, repeat=1)
+            result[count, chunk_size] = elapsed
+            print("{:>8} {:>8} {:>12.4f}".format(count, chunk_size, elapsed))
+    return result
+
+
+def bench_scheduler(width=2000, terms=20, workers=None):
+    """Функція вимірює час виконання широкої програми (width незалежних
+    присвоєнь з terms доданками та їх сума) інтерпретатором та функцією
+    `scheduler.run_parallel` у кожному зі способів `scheduler.MODES`.
+
+    :param width: кількість незалежних присвоєнь
+    :param terms: кількість доданків у кожному присвоєнні
+    :param workers: кількість потоків або процесів
+    :return: словник {спосіб: час у секундах} та характеристики графу
+    """
+    lines = ["a = 1", "b = 2"]
+    for i in range(width):
+        lines.append("x{} = ".format(i) + " + ".join("a * {} / b".format(j + i) for j in range(terms)))
+    lines.append("s = " + " + ".join("x{}".format(i) for i in range(width)))
+    code, error = generate_code(lines)
+    metrics = graph_metrics(*build_graph(code)[:2])
+    result = {"execute": measure(interpreter.execute, code)}
+    for mode in ("thread", "process"):
+        result[mode] = measure(lambda program: run_parallel(program, workers, mode), code, repeat=1)
+    print(", ".join("{} {}".format(name, value) for name, value in metrics.items()))
+    for name, elapsed in result.items():
+        print("{:>8}: {:.4f} s".format(name, elapsed))
+    return result, metrics
+
+
+def bench_reactive(lines=5000, inputs=100):
+    """Функція порівнює час повторного виконання програми з lines рядків
+    (кожен рядок залежить від однієї з inputs вхідних змінних) після зміни
+    однієї вхідної змінної інтерпретатором та функцією `reactive.set`.
+
+    :param lines: кількість рядків програми
+    :param inputs: кількість вхідних змінних
+    :return: словник {назва: час у секундах}
+    """
+    program = ["y{} = x{} * {} + 1".format(i, i % inputs, i) for i in range(lines)]
+    code, error = generate_code(program)
+    for i in range(inputs):
+        storage.set("x{}".format(i), 1.0)
+    reactive.load(code)
+    values = iter(range(10 ** 9))
+    result = {
+        "execute": measure(interpreter.execute, code),
+        "reactive": measure(lambda variable: reactive.set(variable, float(next(values))), "x0"),
+    }
+    for name, elapsed in result.items():
+        print("{:>8}: {:.6f} s".format(name, elapsed))
+    reactive.reset()
+    return result
+
+
+def bench_sessions(sizes=(1000, 10000, 100000), sessions=8, lines=200):
+    """Функція вимірює час створення пам'яті сеансу методом
+    `storage.Storage.fork` та час першої зміни такої пам'яті (копіювання
+    даних) для базової пам'яті з різною кількістю змінних, а також час
+    виконання програми у sessions сеансах з власним інтерпретатором.
+
+    :param sizes: кількості змінних базової пам'яті
+    :param sessions: кількість сеансів
+    :param lines: кількість рядків у програмі
+    :return: словник {(назва, кількість змінних): час у секундах}
+    """
+    result = {}
+    print("{:>8} {:>12} {:>12}".format("size", "fork, s", "write, s"))
+    for size in sizes:
+        base = storage.Storage()
+        for i in range(size):
+            base.add("x{}".format(i))
+        forks = [base.fork() for _ in range(100)]
+        result["fork", size] = measure(lambda _: base.fork(), None)
+        result["write", size] = measure(lambda _: forks.pop().set("x0", 1.0), None)
+        print("{:>8} {:>12.6f} {:>12.6f}".format(size, result["fork", size], result["write", size]))
+
+    code, error = generate_code(generate_program(lines))
+    base = storage.fork()
+    program = compile_code(code)
+
+    def run_sessions(engine):
+        for _ in range(sessions):
+            own = base.fork()
+            if engine == "execute":
+                interpreter.Interpreter(own).execute(code)
+            else:
+                program(own)
+    for engine in ("execute", "closure"):
+        result[engine, sessions] = measure(run_sessions, engine)
+        print("{:>8}: {:.6f} s".format(engine, result[engine, sessions]))
+    return result
+
+
+def bench_mapped_storage(count=200000):
+    """Функція порівнює пам'ять Python на одне значення та час читання
+    значень для пам'яті `storage.Storage` та `mapped_storage.MappedStorage`
+    з count змінними.
+
+    :param count: кількість змінних
+    :return: словник {(назва пам'яті, показник): значення}
+    """
+    result = {}
+    for name, factory in (("list", storage.Storage), ("mmap", MappedStorage)):
+        memory = factory()
+        for i in range(count):
+            memory.add("x{}".format(i))
+        values = memory._values
+        tracemalloc.start()
+        for i in range(count):
+            values[i] = i * 0.5
+        result[name, "bytes"] = tracemalloc.get_traced_memory()[0] / count
+        tracemalloc.stop()
+        result[name, "get"] = measure(lambda _: [memory.get("x{}".format(i)) for i in range(0, count, 10)], None)
+        print("{:>8}: {:8.2f} bytes/value, get {:.4f} s".format(name, result[name, "bytes"],
+                                                                result[name, "get"]))
+    return result
+
+
+def bench_snapshot(count=100000, sets=100000):
+    """Функція вимірює час запису та відновлення знімка пам'яті з count
+    змінними, час присвоєння значень з журналом (для кожної політики fsync,
+    крім "always") та без нього, а також час повторення журналу.
+
+    :param count: кількість змінних
+    :param sets: кількість присвоєнь
+    :return: словник {назва: час у секундах}
+    """
+    directory = tempfile.mkdtemp()
+    state, log = os.path.join(directory, "state.snap"), os.path.join(directory, "state.log")
+    memory = storage.Storage()
+    for i in range(count):
+        memory.add("x{}".format(i))
+        memory.set("x{}".format(i), i * 0.5)
+    indices = [i % count for i in range(sets)]
+
+    def assign(values):
+        for index in indices:
+            values[index] = 1.0
+
+    result = {"snapshot": measure(memory.snapshot, state),
+              "restore": measure(storage.Storage().restore, state),
+              "set": measure(assign, memory._values)}
+    for policy in ("never", "interval"):
+        memory.open_journal(log, state, fsync=policy)
+        result["set, " + policy] = measure(lambda _: assign(memory._values), None)
+        memory.close_journal()
+    result["replay"] = measure(lambda _: storage.Storage().restore(state, log), None)
+    shutil.rmtree(directory)
+    for name, elapsed in result.items():
+        print("{:>16}: {:.6f} s".format(name, elapsed))
+    return result
+
+
+if __name__ == "__main__":
+    bench_tokenizer()
+    bench_parsers()
+    bench_nesting()
+    profile_fusions()
+    bench_engines()
+    bench_vectorized()
+    bench_batch()
+    bench_scheduler()
+    bench_reactive()
+    bench_sessions()
+    bench_mapped_storage()
+    bench_snapshot()
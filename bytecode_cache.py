@@ -0,0 +1,280 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Модуль призначено для збереження коду програм `.mlg` у двійкових файлах
+`.mlc`, щоб не генерувати код повторно, якщо файл програми не змінився
+(аналогічно до `__pycache__` у Python).
+
+Файл коду для `dir/prog.mlg` зберігається як `dir/__mlcache__/prog.mlc`.
+
+Формат файлу `.mlc` (усі числа little-endian):
+    заголовок (HEADER):
+        4 байти  - MAGIC
+        uint16   - версія формату FORMAT_VERSION
+        uint16   - спосіб перевірки актуальності (VALIDATION_MODES)
+        uint64   - розмір файлу програми у байтах
+        int64    - час зміни файлу програми (st_mtime_ns)
+        32 байти - SHA-256 вмісту файлу програми
+        uint32   - кількість констант
+        uint32   - кількість імен змінних
+        uint32   - кількість команд
+        uint32   - довжина блоку імен у байтах
+    константи - масив double
+    імена змінних - рядок UTF-8, імена розділені символом '\n'
+    команди - записи (uint8 <номер команди у COMMANDS>, uint32 <аргумент>),
+              де аргумент - індекс константи для LOADC, індекс імені для
+              LOADV та SET, або 0
+
+Імена змінних записуються у порядку першої появи у коді, тобто у тому ж
+порядку, у якому генератор коду додає змінні до пам'яті.
+"""
+
+import hashlib
+import os
+import struct
+
+from code_generator import COMMANDS, iter_code
+from storage import clear, add
+
+MAGIC = b"MLC\x00"
+FORMAT_VERSION = 1
+CACHE_DIR = "__mlcache__"
+
+HEADER = struct.Struct("<4sHHQq32sIIII")
+RECORD = struct.Struct("<BI")
+
+# способи перевірки актуальності файлу коду
+VALIDATION_MODES = {
+    "timestamp": 0,     # за розміром та часом зміни файлу програми
+    "hash": 1,          # також за SHA-256 вмісту файлу програми
+}
+
+
+def cache_path(filename):
+    """Функція повертає шлях до файлу коду для файлу програми filename.
+
+    :param filename: шлях до файлу програми `.mlg`
+    :return: шлях до файлу коду `.mlc`
+    """
+    directory, name = os.path.split(filename)
+    base, _ = os.path.splitext(name)
+    return os.path.join(directory, CACHE_DIR, base + ".mlc")
+
+
+def compile_file(filename, lines, validation="timestamp"):
+    """Функція повертає код програми з файлу filename.
+
+    Якщо файл коду актуальний, то код читається з нього, а змінні додаються
+    до пам'яті без токенізації та розбору програми, і lines не читаються.
+    Інакше код генерується рядок за рядком функцією
+    `code_generator.iter_code` (тому lines може бути відкритим файлом
+    програми, який не читається у пам'ять повністю), і, якщо помилки
+    немає, записується у файл коду.
+
+    Побічний ефект: очищує пам'ять та додає до неї змінні програми.
+
+    :param filename: шлях до файлу програми `.mlg`
+    :param lines: файл або ітерований об'єкт рядків програми
+    :param validation: спосіб перевірки актуальності з VALIDATION_MODES
+    :return:
+        список команд - кортежів (<код_команди>, <операнд>)
+        текст помилки
+    """
+    path = cache_path(filename)
+    code, names = _read(path, filename, validation)
+    if code is not None:
+        clear()
+        for name in names:
+            add(name)
+        return code, ""
+
+    try:
+        source = _source_info(filename, True)  # до читання рядків програми
+    except OSError:
+        source = None
+    code, error = [], ""
+    for _, line_code, error in iter_code(lines, clear_storage=True):
+        if error:
+            break
+        code += line_code
+    if not error and source is not None:
+        _write(path, source, code, validation)
+    return code, error
+
+
+def _source_info(filename, with_hash):
+    """Функція повертає розмір, час зміни та (можливо) SHA-256 файлу програми.
+
+    :param filename: шлях до файлу програми
+    :param with_hash: чи обчислювати SHA-256
+    :return: (<розмір>, <час зміни у нс>, <SHA-256 або None>)
+    """
+    stat = os.stat(filename)
+    digest = None
+    if with_hash:
+        with open(filename, "rb") as file:
+            digest = hashlib.sha256(file.read()).digest()
+    return stat.st_size, stat.st_mtime_ns, digest
+
+
+def _read(path, filename, validation):
+    """Функція читає код з файлу коду path, якщо він актуальний.
+
+    Дані розбираються безпосередньо з буфера файлу через memoryview
+    та struct, без проміжних копій. Файл коду, записаний з іншим способом
+    перевірки актуальності, або пошкоджений файл коду (неправильний номер
+    команди, індекс константи чи імені, імена не у UTF-8) вважається
+    відсутнім.
+
+    :param path: шлях до файлу коду
+    :param filename: шлях до файлу програми
+    :param validation: спосіб перевірки актуальності
+    :return: (<список команд>, <список імен змінних>) або (None, None)
+    """
+    try:
+        with open(path, "rb") as file:
+            data = file.read()
+        size, mtime, digest = _source_info(filename, validation == "hash")
+    except OSError:
+        return None, None
+    if len(data) < HEADER.size:
+        return None, None
+    view = memoryview(data)
+    (magic, version, mode, cached_size, cached_mtime, cached_digest,
+     n_consts, n_names, n_commands, names_length) = HEADER.unpack_from(view)
+    if magic != MAGIC or version != FORMAT_VERSION or mode != VALIDATION_MODES[validation]:
+        return None, None
+    if cached_size != size or cached_mtime != mtime:
+        return None, None
+    if digest is not None and cached_digest != digest:
+        return None, None
+
+    consts_end = HEADER.size + 8 * n_consts
+    names_end = consts_end + names_length
+    if len(data) != names_end + RECORD.size * n_commands:
+        return None, None
+    consts = view[HEADER.size:consts_end].cast("d")
+    code = []
+    append = code.append
+    try:
+        names = str(view[consts_end:names_end], "utf-8").split("\n") if n_names else []
+        if len(names) != n_names:
+            return None, None
+        for opcode, arg in RECORD.iter_unpack(view[names_end:]):
+            command = COMMANDS[opcode]
+            if command == "LOADC":
+                append((command, consts[arg]))
+            elif command == "LOADV" or command == "SET":
+                append((command, names[arg]))
+            else:
+                append((command, None))
+    except (struct.error, IndexError, UnicodeDecodeError, ValueError):
+        return None, None     # пошкоджений файл коду
+    finally:
+        consts.release()
+    return code, names
+
+
+def _write(path, source, code, validation):
+    """Функція записує код у файл коду path.
+
+    Файл спочатку записується під тимчасовим ім'ям і потім атомарно
+    перейменовується. Помилки запису ігноруються.
+
+    :param path: шлях до файлу коду
+    :param source: розмір, час зміни та SHA-256 файлу програми до генерації
+        коду (див. `_source_info`), тому зміна файлу під час генерації
+        робить файл коду неактуальним
+    :param code: список команд
+    :param validation: спосіб перевірки актуальності
+    :return: None
+    """
+    consts, names, records = [], {}, bytearray()
+    for command, operand in code:
+        if command not in COMMANDS:
+            return
+        if command == "LOADC":
+            arg = len(consts)
+            consts.append(operand)
+        elif command == "LOADV" or command == "SET":
+            arg = names.setdefault(operand, len(names))
+        else:
+            arg = 0
+        records += RECORD.pack(COMMANDS.index(command), arg)
+    names_blob = "\n".join(names).encode("utf-8")
+    try:
+        size, mtime, digest = source
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        header = HEADER.pack(MAGIC, FORMAT_VERSION, VALIDATION_MODES[validation],
+                             size, mtime, digest, len(consts), len(names),
+                             len(code), len(names_blob))
+        tmp_path = "{}.{}.tmp".format(path, os.getpid())
+        with open(tmp_path, "wb") as file:
+            file.write(header)
+            file.write(struct.pack("<{}d".format(len(consts)), *consts))
+            file.write(names_blob)
+            file.write(records)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+if __name__ == "__main__":
+    import shutil
+    import tempfile
+
+    import storage
+
+    directory = tempfile.mkdtemp()
+    filename = os.path.join(directory, "prog.mlg")
+    lines = ["x = 1", "z = (((a)))", "a = b + c * (d - e)", "y = (2 - 1) * x / 234.5 - z"]
+    with open(filename, "w") as file:
+        file.write("\n".join(lines))
+
+    code1, error1 = compile_file(filename, lines)
+    storage1 = storage.variables()
+    success = not error1 and os.path.exists(cache_path(filename))
+
+    code2, error2 = compile_file(filename, None)     # рядки не потрібні
+    success = success and not error2 and code2 == code1 and storage.variables() == storage1
+
+    code3, error3 = compile_file(filename, lines, validation="hash")     # інший спосіб перевірки
+    success = success and code3 == code1
+    code3, error3 = compile_file(filename, None, validation="hash")
+    success = success and code3 == code1
+
+    with open(cache_path(filename), "rb") as file:
+        data = file.read()
+    records = len(data) - RECORD.size * len(code1)
+    names_start = records - len("\n".join(storage1).encode("utf-8"))
+    loadv = records + RECORD.size * [command for command, _ in code1].index("LOADV")
+    damages = (
+        (records, RECORD.pack(255, 0)),                         # номер команди
+        (loadv, RECORD.pack(COMMANDS.index("LOADV"), 999)),     # індекс імені
+        (names_start, b"\xff"),                                 # не UTF-8
+    )
+    for position, damage in damages:
+        with open(cache_path(filename), "wb") as file:
+            file.write(data[:position] + damage + data[position + len(damage):])
+        code5, error5 = compile_file(filename, lines, validation="hash")
+        success = success and not error5 and code5 == code1
+
+    lines.append("w = (x")
+    with open(filename, "w") as file:
+        file.write("\n".join(lines))
+    os.utime(filename, ns=(0, 0))
+    code4, error4 = compile_file(filename, lines)
+    success = success and error4 == "Неправильно розставлені дужки"
+
+    def edited(lines):  # файл змінюється під час генерації коду
+        yield lines[0]
+        with open(filename, "w") as file:
+            file.write("x = 2\n")
+        yield from lines[1:]
+
+    lines.pop()
+    code6, error6 = compile_file(filename, edited(lines))
+    success = success and not error6 and _read(cache_path(filename), filename, "timestamp") == (None, None)
+
+    shutil.rmtree(directory)
+    print("Success =", success)
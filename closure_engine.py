@@ -0,0 +1,545 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Модуль призначено для виконання коду програми без покомандного
+інтерпретатора (див. `interpreter.py`).
+
+Функція `compile_code` один раз перетворює список команд у дерево
+замикань (closures) Python з наперед зв'язаними операндами та повертає
+функцію програми. Виклик цієї функції виконує всю програму без вибору
+функції команди за її кодом та без розпакування кортежів команд, тому
+програму, яку виконують багато разів, вигідно скомпілювати один раз.
+
+Під час компіляції стек інтерпретатора моделюється стеком записів:
+    ("c", <число>) - константа
+    ("v", <змінна>, <номер комірки або None>) - значення змінної
+    ("r", <номер>) - обчислене раніше значення у комірці кадру з номером
+    ("e", <глибина>, <перший запис>, [(<операція>, <запис>), ...]) -
+        вираз: ланцюжок операцій, що застосовуються зліва направо,
+        тому довгі суми на кшталт `a + b + c + ...` не збільшують глибину.
+
+Присвоєння та інші команди з побічними ефектами стають кроками програми.
+Перед кожним кроком усі записи стеку, що залишаються, обчислюються у
+комірки кадру - списку, який функція програми створює під час кожного
+виклику (тому одночасні виклики не заважають один одному), тому значення обчислюються та вводяться з клавіатури у тому ж
+порядку, що й в інтерпретаторі. Вирази, глибина яких перевищує
+MAX_DEPTH, також обчислюються у комірки, щоб не перевищити глибину
+рекурсії Python під час виконання.
+
+Змінні програми під час компіляції замінюються номерами комірок пам'яті
+(див. `storage.py`), тому замикання звертаються до значень однією
+операцією індексування. Перед кожним виконанням функція програми
+перевіряє, що комірки змінних не змінилися (наприклад, після
+`storage.clear` або для іншої пам'яті), і, якщо потрібно, компілює код
+повторно. Функції програми можна передати пам'ять (`storage.Storage`),
+тому одну скомпільовану програму можуть одночасно виконувати кілька
+сеансів з власною пам'яттю.
+
+Функція програми повертає ті ж коди помилок, що й `interpreter.execute`
+(див. `interpreter.ERRORS`). Стек інтерпретатора не використовується.
+"""
+
+from operator import add, sub, mul, truediv
+
+from code_generator import NAMED_COMMANDS
+from storage import read_value, _default
+
+# арифметичні команди та відповідні їм операції
+OPERATIONS = {
+    "ADD": add,
+    "SUB": sub,
+    "MUL": mul,
+    "DIV": truediv,
+}
+
+# максимальна глибина вкладеності замикань у виразі
+MAX_DEPTH = 100
+
+
+def compile_code(code):
+    """Функція компілює код програми у функцію програми.
+
+    Функція програми має необов'язковий параметр storage - пам'ять
+    (`storage.Storage`, за замовчуванням - пам'ять за замовчуванням модуля
+    storage), виконує код над цією пам'яттю та повертає код останньої
+    помилки або 0, якщо помилки немає.
+    Якщо у коді є недопустима команда, то виконуються команди до неї, після
+    чого повертається помилка 1.
+
+    :param code: код програми - список кортежів (<команда>, <операнд>),
+        зокрема з командами оптимізатора та суперкомандами
+    :return: функція програми
+    """
+    code = list(code)
+    compiled = _compile(code, _default)
+
+    def program(storage=_default):
+        nonlocal compiled
+        steps, cells, last_error, variables, expected = compiled
+        if tuple(map(storage._slots.get, variables)) != expected:
+            compiled = _compile(code, storage)
+            steps, cells, last_error, variables, expected = compiled
+        env = storage.writable()
+        frame = [None] * cells
+        try:
+            for step in steps:
+                step(env, frame)
+        except KeyError:
+            return 2
+        except ZeroDivisionError:
+            return 3
+        return last_error
+    return program
+
+
+def _compile(code, storage):
+    """Функція компілює код програми у кроки програми.
+
+    :param code: код програми
+    :param storage: пам'ять, для якої визначаються комірки змінних
+    :return:
+        кортеж кроків програми
+        кількість комірок кадру
+        код помилки після виконання всіх кроків
+        кортеж імен змінних програми
+        кортеж номерів їх комірок на час компіляції (None, якщо змінної немає)
+    """
+    steps = []
+    stack = []
+    cells = []
+    bindings = {}
+    invalid = False
+    slots = storage._slots
+    for command, operand in _expand(code, storage):
+        if command == "LOADC":
+            stack.append(("c", operand))
+        elif command == "LOADV":
+            stack.append(("v", operand, _bind(bindings, slots, operand)))
+        elif command in OPERATIONS:
+            right = stack.pop()
+            left = stack.pop()
+            if max(_depth(left), _depth(right)) >= MAX_DEPTH:
+                stack += (left, right)
+                _flush(stack, steps, cells)
+                right = stack.pop()
+                left = stack.pop()
+            stack.append(_combine(OPERATIONS[command], left, right))
+        elif command == "SET":
+            value = stack.pop()
+            _flush(stack, steps, cells)
+            steps.append(_make_set(_bind(bindings, slots, operand), _closure(value)))
+        elif command == "SETKEEP":
+            value = stack.pop()
+            _flush(stack, steps, cells)
+            if value[0] == "c":
+                steps.append(_make_set(_bind(bindings, slots, operand), _closure(value)))
+            else:
+                cell = _new_cell(cells)
+                steps.append(_make_set(_bind(bindings, slots, operand), _closure(value), cell))
+                value = ("r", cell)
+            stack.append(value)
+        elif command == "DUP":
+            value = stack[-1]
+            if value[0] == "e":
+                _flush(stack, steps, cells)
+                value = stack[-1]
+            stack.append(value)
+        else:
+            invalid = True
+            break
+    _flush(stack, steps, cells)
+    return tuple(steps), len(cells), 1 if invalid else 0, tuple(bindings), tuple(bindings.values())
+
+
+def _bind(bindings, slots, variable):
+    """Функція повертає номер комірки змінної та запам'ятовує його.
+
+    :param bindings: словник {ім'я змінної: номер комірки або None}
+    :param slots: таблиця символів пам'яті
+    :param variable: ім'я змінної
+    :return: номер комірки або None, якщо змінної немає у пам'яті
+    """
+    if variable not in bindings:
+        bindings[variable] = slots.get(variable)
+    return bindings[variable]
+
+
+def _expand(code, storage=_default):
+    """Генератор замінює команди оптимізатора та суперкоманди
+    (див. `interpreter.py`) на послідовності простих команд, а команди з
+    номерами комірок (LOADS, SETS та інші з `code_generator.NAMED_COMMANDS`)
+    - командами з іменами змінних (комірка, якої немає, замінюється ім'ям
+    None).
+
+    Недопустимі команди повертаються без змін.
+
+    :param code: код програми
+    :param storage: пам'ять, у якій шукаються імена змінних за комірками
+    :return: пари (<команда>, <операнд>)
+    """
+    slot_name = storage.name
+    for command, operand in code:
+        form = NAMED_COMMANDS.get(command)
+        if form is not None:
+            command, positions = form
+            if positions is None:
+                operand = slot_name(operand)
+            else:
+                operand = tuple(slot_name(item) if i in positions else item
+                                for i, item in enumerate(operand))
+        if command == "MULC":
+            yield "LOADC", operand
+            yield "MUL", None
+        elif command == "SETC":
+            yield "LOADC", operand[0]
+            yield "SET", operand[1]
+        elif command[:3] in OPERATIONS and len(command) > 3:
+            name, suffix = command[:3], command[3:]
+            if suffix == "VV":
+                yield "LOADV", operand[0]
+                yield "LOADV", operand[1]
+                yield name, None
+            elif suffix == "VC":
+                yield "LOADV", operand[0]
+                yield "LOADC", operand[1]
+                yield name, None
+            elif suffix == "C":
+                yield "LOADC", operand
+                yield name, None
+            elif suffix == "SET":
+                yield name, None
+                yield "SET", operand
+            else:
+                yield command, operand
+        else:
+            yield command, operand
+
+
+def _depth(entry):
+    """Функція повертає глибину вкладеності замикань запису стеку.
+
+    :param entry: запис стеку
+    :return: глибина
+    """
+    return entry[1] if entry[0] == "e" else 0
+
+
+def _combine(operation, left, right):
+    """Функція повертає запис стеку для операції над двома записами.
+
+    Якщо лівий запис - ланцюжок, то операція додається у його кінець.
+
+    :param operation: функція операції
+    :param left: запис лівого операнда
+    :param right: запис правого операнда
+    :return: запис стеку
+    """
+    if left[0] == "e":
+        left[3].append((operation, right))
+        return "e", max(left[1], _depth(right) + 1), left[2], left[3]
+    return "e", max(_depth(left), _depth(right)) + 1, left, [(operation, right)]
+
+
+def _new_cell(cells):
+    """Функція виділяє нову комірку кадру.
+
+    :param cells: список виділених комірок (змінюється)
+    :return: номер комірки
+    """
+    cells.append(None)
+    return len(cells) - 1
+
+
+def _flush(stack, steps, cells):
+    """Функція додає до програми кроки, що обчислюють усі вирази та
+    змінні стеку у комірки кадру, та замінює ці записи записами комірок.
+
+    :param stack: стек записів
+    :param steps: список кроків програми
+    :param cells: список виділених комірок кадру
+    :return: None
+    """
+    for i, entry in enumerate(stack):
+        if entry[0] == "e" or entry[0] == "v":
+            cell = _new_cell(cells)
+            steps.append(_make_store(_closure(entry), cell))
+            stack[i] = ("r", cell)
+
+
+def _closure(entry):
+    """Функція створює замикання, що обчислює значення запису стеку.
+
+    Замикання має параметри env - список значень пам'яті та frame - кадр
+    (список значень комірок) поточного виклику. Якщо змінної не
+    існує, то замикання викликає KeyError, при діленні на 0 -
+    ZeroDivisionError.
+
+    :param entry: запис стеку
+    :return: замикання
+    """
+    kind = entry[0]
+    if kind == "c":
+        number = entry[1]
+        return lambda env, frame: number
+    if kind == "v":
+        return _make_load(entry[1], entry[2])
+    if kind == "r":
+        cell = entry[1]
+        return lambda env, frame: frame[cell]
+    first, rest = entry[2], entry[3]
+    if len(rest) == 1:
+        return _make_binary(rest[0][0], first, rest[0][1])
+    start = _closure(first)
+    operands = tuple((operation, _closure(right)) for operation, right in rest)
+
+    def chain(env, frame):
+        value = start(env, frame)
+        for operation, right in operands:
+            value = operation(value, right(env, frame))
+        return value
+    return chain
+
+
+def _make_load(variable, index):
+    """Функція створює замикання, що повертає значення змінної.
+
+    Якщо змінна невизначена, то її значення вводиться з клавіатури.
+
+    :param variable: ім'я змінної
+    :param index: номер комірки змінної або None, якщо змінної немає
+    :return: замикання
+    """
+    if index is None:
+        return _make_missing(variable)
+
+    def load(env, frame):
+        value = env[index]
+        if value is None:
+            value = _input(env, index, variable)
+        return value
+    return load
+
+
+def _input(env, index, variable):
+    """Функція вводить значення невизначеної змінної з клавіатури.
+
+    :param env: список значень пам'яті
+    :param index: номер комірки змінної
+    :param variable: ім'я змінної
+    :return: значення змінної (None, якщо введено не число)
+    """
+    value = read_value(variable)
+    if value is not None:
+        env[index] = value
+    return value
+
+
+def _make_missing(variable):
+    """Функція створює замикання для змінної, якої немає у пам'яті.
+
+    :param variable: ім'я змінної
+    :return: замикання, що викликає KeyError
+    """
+    def missing(env, frame):
+        raise KeyError(variable)
+    return missing
+
+
+def _make_binary(operation, left, right):
+    """Функція створює замикання для однієї операції над двома записами.
+
+    Для змінних та констант замикання звертаються до пам'яті та операндів
+    безпосередньо, без виклику вкладених замикань.
+
+    :param operation: функція операції
+    :param left: запис лівого операнда
+    :param right: запис правого операнда
+    :return: замикання
+    """
+    if left[0] == "v" and left[2] is not None and right[0] == "c":
+        variable, index, number = left[1], left[2], right[1]
+
+        def binary(env, frame):
+            value = env[index]
+            if value is None:
+                value = _input(env, index, variable)
+            return operation(value, number)
+    elif left[0] == "v" and right[0] == "v" and left[2] is not None and right[2] is not None:
+        first, second = left[1], right[1]
+        i, j = left[2], right[2]
+
+        def binary(env, frame):
+            a = env[i]
+            if a is None:
+                a = _input(env, i, first)
+            b = env[j]
+            if b is None:
+                b = _input(env, j, second)
+            return operation(a, b)
+    elif right[0] == "c":
+        f, number = _closure(left), right[1]
+
+        def binary(env, frame):
+            return operation(f(env, frame), number)
+    else:
+        f, g = _closure(left), _closure(right)
+
+        def binary(env, frame):
+            return operation(f(env, frame), g(env, frame))
+    return binary
+
+
+def _make_set(index, f, cell=None):
+    """Функція створює крок програми, що встановлює значення змінної.
+
+    :param index: номер комірки змінної або None, якщо змінної немає
+    :param f: замикання, що обчислює значення
+    :param cell: номер комірки кадру, у яку також записується значення, або None
+    :return: крок програми
+    """
+    if index is None:
+        def assign(env, frame):
+            f(env, frame)
+            raise KeyError(index)
+    elif cell is None:
+        def assign(env, frame):
+            env[index] = f(env, frame)
+    else:
+        def assign(env, frame):
+            env[index] = frame[cell] = f(env, frame)
+    return assign
+
+
+def _make_store(f, cell):
+    """Функція створює крок програми, що обчислює значення у комірку.
+
+    :param f: замикання, що обчислює значення
+    :param cell: номер комірки кадру
+    :return: крок програми
+    """
+    def store(env, frame):
+        frame[cell] = f(env, frame)
+    return store
+
+
+if __name__ == "__main__":
+    import random
+    import sys
+
+    import interpreter
+    import storage
+    from code_generator import generate_code, resolve_slots
+    from optimizer import optimize, peephole, eliminate_common_subexpressions, \
+        select_superinstructions, FUSIONS
+
+    def run(engine, code, values):
+        for variable in storage.variables():
+            storage.set(variable, values.get(variable, 1.0))
+        if engine == "closure":
+            error = compile_code(code)()
+        else:
+            interpreter._stack.clear()
+            error = interpreter.execute(code)
+        return error, dict(zip(storage.variables(), storage._values))
+
+    success = True
+    rnd = random.Random(0)
+    names = ["a", "b", "c", "d"]
+    for _ in range(300):
+        lines = []
+        for _ in range(rnd.randint(1, 5)):
+            expression = rnd.choice(names)
+            for _ in range(rnd.randint(0, 5)):
+                operand = rnd.choice(names + ["0", "2", "(a - b)", "(c * (d + 1))"])
+                expression = "{} {} {}".format(expression, rnd.choice("+-*/"), operand)
+            lines.append("{} = {}".format(rnd.choice(names), expression))
+        code, error = generate_code(lines)
+        values = {name: float(rnd.randint(0, 2)) for name in names}
+        expected = run("interpreter", code, values)
+        fused = select_superinstructions(peephole(code)[0], tuple(FUSIONS))[0]
+        variants = [code, optimize(code)[0], peephole(code)[0], fused, resolve_slots(fused)]
+        success = success and all(run("closure", variant, values) == expected for variant in variants)
+        success = success and run("interpreter", resolve_slots(fused), values) == expected
+        new_code, temps = eliminate_common_subexpressions(code)
+        expected_cse = run("interpreter", new_code, values)
+        success = success and run("closure", new_code, values) == expected_cse
+        fused = resolve_slots(select_superinstructions(peephole(new_code)[0], tuple(FUSIONS))[0])
+        success = success and run("interpreter", fused, values) == expected_cse
+        success = success and run("closure", fused, values) == expected_cse
+
+    storage.clear()
+    storage.add("x")
+    code = [("LOADC", 1.0), ("SET", "x"), ("LOADV", "y"), ("SET", "x")]
+    success = success and compile_code(code)() == 2 and storage.get("x") == 1.0
+    code = [("LOADC", 2.0), ("SET", "x"), ("XXX", None), ("LOADC", 3.0), ("SET", "x")]
+    success = success and compile_code(code)() == 1 and storage.get("x") == 2.0
+
+    storage.clear()
+    storage.add("a")
+    storage.add("b")
+    program = compile_code([("LOADV", "a"), ("SET", "b")])
+    storage.set("a", 5.0)
+    success = success and program() == 0 and storage.get("b") == 5.0
+    storage.clear()
+    storage.add("b")
+    storage.add("a")
+    storage.set("a", 7.0)
+    success = success and program() == 0 and storage.get("b") == 7.0
+    program = compile_code([("LOADS", 1), ("SETS", 0)])
+    success = success and program() == 0 and storage.get("b") == 7.0
+    success = success and compile_code([("LOADS", 2), ("SETS", 0)])() == 2
+
+    depth = 100000
+    code, error = generate_code(["x = " + "a - (" * depth + "1" + ")" * depth,
+                                 "y = " + " + ".join(["a"] * depth)])
+    storage.set("a", 1.0)
+    success = success and compile_code(code)() == 0
+    success = success and storage.get("x") == 1.0 and storage.get("y") == float(depth)
+
+    import threading
+
+    base = storage.Storage()
+    for variable in ("a", "b", "y"):
+        base.add(variable)
+    base.set("b", 2.0)
+    code, error = generate_code(["y = a * b"], clear_storage=False)
+    program = compile_code(code)
+    results = {}
+
+    def session(number):
+        own = base.fork()
+        own.set("a", float(number))
+        results[number] = program(own), own.get("y")
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    success = success and results == {i: (0, 2.0 * i) for i in range(8)} and base.get("y") is None
+
+    # комірки кадру (SETKEEP) не спільні для одночасних викликів
+    base.add("t")
+    lines = ["y = t + y" if i % 2 else "t = a * {}".format(i) for i in range(200)]
+    code, error = generate_code(lines, clear_storage=False)
+    program = compile_code(peephole(code)[0])
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+
+    def session(number):
+        own = base.fork()
+        own.set("a", float(number))
+        results[number] = []
+        for _ in range(50):
+            own.set("y", 0.0)
+            results[number].append((program(own), own.get("y")))
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    sys.setswitchinterval(interval)
+    success = success and results == {i: [(0, 9900.0 * i)] * 50 for i in range(8)}
+
+    print("Success =", success)
@@ -41,13 +41,25 @@
 
 Під час розбору кожна функція забирає токени зі списку токенів tokens,
 а також додає команди до списку команд code
+
+Крім рекурсивного розбору (parser="recursive") є розбір методом
+підйому за пріоритетами (parser="precedence", див. `_precedence_expression`),
+який генерує той самий код за один прохід зліва направо без копіювання
+списку токенів, та його нерекурсивний варіант з явним стеком операцій
+(parser="iterative", див. `_iterative_expression`), глибина вкладеності
+дужок для якого обмежена лише пам'яттю. Нерекурсивний розбір
+використовується за замовчуванням.
 """
 
+from collections import OrderedDict
+from itertools import islice
 from typing import List
 
-from storage import is_in, clear, add
-from tokenizer import get_tokens, Token
-from syntax_analyzer import check_assignment_syntax, check_expression_syntax, _check_parens
+from storage import is_in, clear, add, slot, name as slot_name
+from tokenizer import (get_tokens, iter_lines_tokens, Token,
+                       VARIABLE, CONSTANT, OPERATION, LEFT_PAREN, RIGHT_PAREN)
+from syntax_analyzer import (check_assignment_syntax, check_expression_syntax, _check_parens,
+                             SyntaxMachine)
 
 COMMANDS = [
     "LOADC",
@@ -59,8 +71,36 @@ COMMANDS = [
     "SET"
 ]
 
-
-def generate_code(program_lines: List[str], clear_storage=True):
+# пріоритети операцій та відповідні їм команди
+PRECEDENCE = {"+": 1, "-": 1, "*": 2, "/": 2}
+OPERATION_COMMANDS = {"+": "ADD", "-": "SUB", "*": "MUL", "/": "DIV"}
+
+# команди зі змінними, заданими іменами, та відповідні їм команди зі
+# змінними, заданими номерами комірок пам'яті (див. `resolve_slots`):
+# <команда> -> (<команда з номерами комірок>, <позиції змінних в операнді>),
+# де позиції None означають, що операнд - це одна змінна
+SLOT_COMMANDS = {
+    "LOADV": ("LOADS", None),
+    "SET": ("SETS", None),
+    "SETKEEP": ("SETKEEPS", None),
+    "SETC": ("SETCS", (1,)),
+}
+for _command in ("ADD", "SUB", "MUL", "DIV"):
+    SLOT_COMMANDS[_command + "VV"] = (_command + "SS", (0, 1))
+    SLOT_COMMANDS[_command + "VC"] = (_command + "SC", (0,))
+    SLOT_COMMANDS[_command + "SET"] = (_command + "SETS", None)
+# обернена таблиця: <команда з номерами комірок> -> (<команда>, <позиції>)
+NAMED_COMMANDS = {slot_command: (command, positions)
+                  for command, (slot_command, positions) in SLOT_COMMANDS.items()}
+
+# кеш коду рядків програми (див. `_generate_line_code`):
+# (<рядок>, <розбір>) -> (<код>, <текст помилки>, <змінні рядка>)
+_line_cache = OrderedDict()
+_line_cache_size = 1024     # максимальна кількість рядків у кеші
+_line_cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def generate_code(program_lines: List[str], clear_storage=True, parser=None, slots=False):
     """Функція генерує код за списком рядків програми program_lines
 
     Повертає програмний код у вигляді списку кортежів
@@ -73,6 +113,10 @@ def generate_code(program_lines: List[str], clear_storage=True):
 
     :param program_lines: список рядків програми
     :param clear_storage: флаг, чи очищати пам'ять
+    :param parser: назва розбору виразів з PARSERS
+                   (за замовчуванням DEFAULT_PARSER)
+    :param slots: флаг, чи замінювати змінні номерами комірок пам'яті
+                  (див. `resolve_slots`)
     :return:
         список команд - кортежів (<код_команди>, <операнд>)
         текст помилки
@@ -82,7 +126,7 @@ def generate_code(program_lines: List[str], clear_storage=True):
     code = []
     err = ''
     for line in program_lines:
-        tmp_code, err = _generate_line_code(line)
+        tmp_code, err = _generate_line_code(line, parser)
 
         if err and err != "Порожній вираз":
             break
@@ -90,10 +134,76 @@ def generate_code(program_lines: List[str], clear_storage=True):
             continue
         code += tmp_code
 
+    if slots:
+        code = resolve_slots(code)
     return code, err
 
 
-def _generate_line_code(program_line: str):
+def resolve_slots(code):
+    """Функція замінює у коді команди зі змінними, заданими іменами,
+    командами з SLOT_COMMANDS, у яких змінні задано номерами комірок у
+    пам'яті (`storage.slot`): LOADV та SET - командами LOADS та SETS,
+    а команди оптимізатора та суперкоманди (SETKEEP, SETC, <OP>VV, <OP>VC,
+    <OP>SET) - їх варіантами з номерами комірок.
+
+    Такий код звертається до значень змінних однією операцією
+    індексування, але правильний лише доки не змінено таблицю символів
+    пам'яті (наприклад, `storage.clear`). Оптимізатор (`optimizer.py`)
+    працює з іменами змінних, тому заміну слід виконувати після
+    оптимізації та вибору суперкоманд. Команди зі змінними, яких немає у
+    пам'яті, не замінюються.
+
+    :param code: список команд
+    :return: новий список команд
+    """
+    new_code = []
+    append = new_code.append
+    for command, operand in code:
+        form = SLOT_COMMANDS.get(command)
+        if form is None:
+            append((command, operand))
+            continue
+        slot_command, positions = form
+        if positions is None:
+            if is_in(operand):
+                append((slot_command, slot(operand)))
+            else:
+                append((command, operand))
+        elif all(is_in(operand[i]) for i in positions):
+            append((slot_command, tuple(slot(item) if i in positions else item
+                                        for i, item in enumerate(operand))))
+        else:
+            append((command, operand))
+    return new_code
+
+
+def unresolve_slots(code, name=slot_name):
+    """Функція виконує заміну, обернену до `resolve_slots`: команди з
+    номерами комірок замінюються командами з іменами змінних.
+
+    :param code: список команд
+    :param name: функція, що повертає ім'я змінної за номером комірки
+        або None, якщо комірки немає (за замовчуванням `storage.name`
+        пам'яті за замовчуванням)
+    :return: новий список команд
+    """
+    new_code = []
+    append = new_code.append
+    for command, operand in code:
+        form = NAMED_COMMANDS.get(command)
+        if form is None:
+            append((command, operand))
+            continue
+        command, positions = form
+        if positions is None:
+            append((command, name(operand)))
+        else:
+            append((command, tuple(name(item) if i in positions else item
+                                   for i, item in enumerate(operand))))
+    return new_code
+
+
+def _generate_line_code(program_line: str, parser=None):
     """Функція генерує код за рядком програми program_line.
 
     Рядок програми має бути присвоєнням виду x = e,
@@ -102,7 +212,8 @@ def _generate_line_code(program_line: str):
     Використовує модулі `tokenizer.py` та `syntax_analyzer.py` для розбору
     та аналізу правильності синтаксису рядка програми.
 
-    Використовує функцію `_expression` для генерації коду виразу, після чого
+    Використовує функцію розбору з PARSERS (за замовчуванням
+    DEFAULT_PARSER) для генерації коду виразу, після чого
     генерує команду SET для змінної з лівої частини присвоєння, та додає
     змінну до пам'яті (`storage.py`), якщо потрібно.
 
@@ -114,24 +225,147 @@ def _generate_line_code(program_line: str):
     Також, якщо під час генерації коду або аналізу виникає помилка,
     то повертає текст помилки. Якщо помилки немає, то повертає порожній рядок.
 
+    Код рядків зберігається у кеші LRU розміром до `_line_cache_size`
+    рядків (див. `set_cache_size`). Для рядка, який вже є у кеші, токенізація,
+    перевірка та генерація коду не виконуються: береться збережений код,
+    а змінні рядка додаються до пам'яті, якщо їх там немає.
+
     :param program_line: рядок програми
+    :param parser: назва розбору виразів з PARSERS
     :return:
         список команд - кортежів (<код_команди>, <операнд>)
         текст помилки
     """
-    tokens = get_tokens(program_line)
-    res, error = check_assignment_syntax(tokens)
+    parser = parser or DEFAULT_PARSER
+    key = (program_line, parser)
+    cached = _line_cache.get(key)
+    if cached is not None:
+        _line_cache.move_to_end(key)
+        _line_cache_stats["hits"] += 1
+        code, error, variables = cached
+        for variable in variables:
+            if not is_in(variable):
+                add(variable)
+        return list(code), error
+
+    _line_cache_stats["misses"] += 1
+    code, error = _generate_tokens_code(get_tokens(program_line), parser)
+    if _line_cache_size > 0:
+        variables = tuple(dict.fromkeys(operand for command, operand in code
+                                        if command == "LOADV" or command == "SET"))
+        _line_cache[key] = (tuple(code), error, variables)
+        if len(_line_cache) > _line_cache_size:
+            _line_cache.popitem(last=False)
+            _line_cache_stats["evictions"] += 1
+    return code, error
+
+
+def set_cache_size(size: int):
+    """Функція встановлює максимальну кількість рядків у кеші коду.
+
+    Якщо рядків у кеші більше, то видаляє ті, що використовувались
+    найдавніше. Розмір 0 вимикає кеш.
+
+    :param size: максимальна кількість рядків
+    :return: None
+    """
+    global _line_cache_size
+    _line_cache_size = size
+    while len(_line_cache) > max(size, 0):
+        _line_cache.popitem(last=False)
+        _line_cache_stats["evictions"] += 1
+
+
+def cache_info():
+    """Функція повертає статистику кешу коду рядків.
+
+    :return: словник з ключами
+        hits - кількість знайдених у кеші рядків
+        misses - кількість рядків, для яких код генерувався
+        evictions - кількість видалених з кешу рядків
+        size - поточна кількість рядків у кеші
+        maxsize - максимальна кількість рядків у кеші
+    """
+    info = dict(_line_cache_stats)
+    info["size"] = len(_line_cache)
+    info["maxsize"] = _line_cache_size
+    return info
+
+
+def cache_clear():
+    """Функція очищує кеш коду рядків та його статистику.
+
+    :return: None
+    """
+    _line_cache.clear()
+    for key in _line_cache_stats:
+        _line_cache_stats[key] = 0
+
+
+def iter_code(source, clear_storage=True, parser=None):
+    """Функція-генератор генерує код програми рядок за рядком.
+
+    source - відкритий файл або будь-який ітерований об'єкт рядків.
+    Рядки розбиваються на токени за допомогою `tokenizer.iter_lines_tokens`,
+    тому ні текст програми, ні її код не зберігаються повністю у пам'яті.
+    Порожні рядки пропускаються.
+
+    Для кожного непорожнього рядка повертає трійку
+    (<номер рядка>, <код рядка>, <текст помилки>).
+    Після першого рядка з помилкою генерація припиняється.
+
+    Побічний ефект: очищує пам'ять (якщо clear_storage) та додає змінні
+    до пам'яті, як і `generate_code`.
+
+    :param source: файл або ітерований об'єкт рядків програми
+    :param clear_storage: флаг, чи очищати пам'ять
+    :param parser: назва розбору виразів з PARSERS
+    :return: генератор трійок (<номер рядка>, <список команд>, <текст помилки>)
+    """
+    if clear_storage:
+        clear()
+    for line_number, tokens in iter_lines_tokens(source):
+        code, err = _generate_tokens_code(tokens, parser)
+        if err == "Порожній вираз":
+            continue
+        yield line_number, code, err
+        if err:
+            return
+
+
+def _generate_tokens_code(tokens: List[Token], parser=None):
+    """Функція генерує код за списком токенів рядка програми.
+
+    Див. `_generate_line_code`.
+
+    :param tokens: список токенів рядка програми
+    :param parser: назва розбору виразів з PARSERS
+    :return:
+        список команд - кортежів (<код_команди>, <операнд>)
+        текст помилки
+    """
+    parser = parser or DEFAULT_PARSER
     code = []
+    if parser == "iterative":
+        # перевірка синтаксису виконується у тому ж проході, що й генерація
+        machine = SyntaxMachine(assignment=True)
+        tokens_iter = iter(tokens)
+        for token in islice(tokens_iter, 2):
+            machine.feed(token)
+        _iterative_expression(code, tokens_iter, machine)
+        res, error = machine.result()
+    else:
+        res, error = check_assignment_syntax(tokens)
+        if res:
+            PARSERS[parser](code, tokens[2:])
     if res:
-        _expression(code, tokens[2:])
+        code = [el for el in code if el is not None]
         code.append(("SET", tokens[0].value))
-        if is_in(tokens[0].value):
-            pass
-        else:
-            add(tokens[0].value)
+        for command, operand in code:
+            if (command == "LOADV" or command == "SET") and not is_in(operand):
+                add(operand)
     else:
-        pass
-    code = [el for el in code if el is not None]
+        code = []
     return code, error
 
 
@@ -318,6 +552,143 @@ def _factor(code: list, tokens: List[Token]):
     else:
         _expression(code, tokens)
 
+
+def _precedence_expression(code: list, tokens: List[Token]):
+    """Функція генерує код за списком токенів виразу методом підйому
+    за пріоритетами (precedence climbing).
+
+    Розбір йде один раз зліва направо по індексу у списку tokens,
+    без копіювання списку та без повторної перевірки синтаксису,
+    тому час роботи лінійний відносно кількості токенів.
+    Згенерований код такий самий, як і у `_expression`:
+    операції одного пріоритету виконуються зліва направо.
+
+    Список токенів має бути синтаксично правильним виразом
+    (див. `syntax_analyzer.check_expression_syntax`).
+
+    Побічний ефект: змінює список code (додає відповідні команди)
+
+    :param code: список команд - кортежів (<код_команди>, <операнд>)
+    :param tokens: список токенів
+    :return: None
+    """
+    _climb(code, tokens, 0, 1)
+
+
+def _climb(code: list, tokens: List[Token], pos: int, min_precedence: int):
+    """Функція генерує код для частини виразу, що починається з позиції pos
+    і містить лише операції з пріоритетом не менше min_precedence.
+
+    :param code: список команд - кортежів (<код_команди>, <операнд>)
+    :param tokens: список токенів
+    :param pos: позиція першого токена частини виразу
+    :param min_precedence: мінімальний пріоритет операцій
+    :return: позиція першого токена після частини виразу
+    """
+    pos = _primary(code, tokens, pos)
+    n = len(tokens)
+    while pos < n and tokens[pos].code == OPERATION:
+        operation = tokens[pos].value
+        precedence = PRECEDENCE[operation]
+        if precedence < min_precedence:
+            break
+        pos = _climb(code, tokens, pos + 1, precedence + 1)
+        code.append((OPERATION_COMMANDS[operation], None))
+    return pos
+
+
+def _primary(code: list, tokens: List[Token], pos: int):
+    """Функція генерує код для множника, що починається з позиції pos:
+    константи, змінної або виразу у дужках.
+
+    Для змінної додає її до пам'яті, якщо необхідно.
+
+    :param code: список команд - кортежів (<код_команди>, <операнд>)
+    :param tokens: список токенів
+    :param pos: позиція першого токена множника
+    :return: позиція першого токена після множника
+    """
+    token = tokens[pos]
+    if token.code == LEFT_PAREN:
+        pos = _climb(code, tokens, pos + 1, 1)
+        return pos + 1
+    if token.code == CONSTANT:
+        code.append(("LOADC", float(token.value)))
+    else:
+        code.append(("LOADV", token.value))
+        if not is_in(token.value):
+            add(token.value)
+    return pos + 1
+
+
+def _iterative_expression(code: list, tokens: List[Token], machine=None):
+    """Функція генерує код за списком токенів виразу без рекурсії.
+
+    Використовує явний стек операцій та лівих дужок (алгоритм
+    сортувальної станції): константи та змінні одразу генерують команди
+    LOADC/LOADV, операція спочатку виштовхує зі стеку операції з не
+    меншим пріоритетом, а права дужка - усі операції до відповідної лівої.
+    Згенерований код такий самий, як і у `_precedence_expression`, а час
+    та пам'ять лінійні відносно кількості токенів при будь-якій глибині
+    вкладеності дужок.
+
+    Якщо задано автомат machine (див. `syntax_analyzer.SyntaxMachine`),
+    то кожен токен спочатку подається автомату, і після першої знайденої
+    помилки решта токенів лише перевіряється, без генерації коду. Інакше
+    список токенів має бути синтаксично правильним виразом
+    (див. `syntax_analyzer.check_expression_syntax`).
+
+    Змінні виразу до пам'яті не додаються (див. `_generate_tokens_code`).
+
+    Побічний ефект: змінює список code (додає відповідні команди)
+
+    :param code: список команд - кортежів (<код_команди>, <операнд>)
+    :param tokens: список (або ітератор) токенів
+    :param machine: автомат перевірки синтаксису або None
+    :return: None
+    """
+    append = code.append
+    stack = []      # операції та ліві дужки (None)
+    tokens = iter(tokens)
+    for token in tokens:
+        if machine is not None and not machine.feed(token):
+            for token in tokens:
+                machine.feed(token)
+            return
+        token_code = token.code
+        if token_code == VARIABLE:
+            append(("LOADV", token.value))
+        elif token_code == CONSTANT:
+            append(("LOADC", float(token.value)))
+        elif token_code == OPERATION:
+            precedence = PRECEDENCE[token.value]
+            while stack and stack[-1] is not None and PRECEDENCE[stack[-1]] >= precedence:
+                append((OPERATION_COMMANDS[stack.pop()], None))
+            stack.append(token.value)
+        elif token_code == LEFT_PAREN:
+            stack.append(None)
+        elif token_code == RIGHT_PAREN:
+            operation = stack.pop()
+            while operation is not None:
+                append((OPERATION_COMMANDS[operation], None))
+                operation = stack.pop()
+    if machine is not None and machine.balance:
+        return
+    while stack:
+        append((OPERATION_COMMANDS[stack.pop()], None))
+
+
+# словник доступних розборів виразу
+PARSERS = {
+    "recursive": _expression,
+    "precedence": _precedence_expression,
+    "iterative": _iterative_expression,
+}
+
+# розбір виразу, що використовується за замовчуванням
+DEFAULT_PARSER = "iterative"
+
+
 if __name__ == "__main__":
     code0, error = generate_code(["a = b + c",
                                   "y = (2 - 1"])
@@ -410,4 +781,78 @@ if __name__ == "__main__":
             if exp != got:
                 print(f'wrong code command: expected {exp}, got {got}')
 
+    lines = ["x = 1", "", "z = (((a)))", "a = b + c * (d - e)"]
+    code4, error = generate_code(lines)
+    streamed = []
+    for line_number, line_code, error in iter_code(iter(lines)):
+        streamed += line_code
+    success = success and not error and streamed == code4 and line_number == 4
+
+    streamed = [err for _, _, err in iter_code(["x = 1", "y = (2 - 1", "z = 3"])]
+    success = success and streamed == ["", "Неправильно розставлені дужки"]
+
+    import storage
+    lines += ["y = (2 - 1) * (x345 + 3 * d) / 234.5 - z",
+              "x = ((_abc + 3.12) * (12 - (3 * 2)))",
+              "v = ((a)) * (((b - c)) / (d)) - (e)",
+              "w = 1 + 2 + 3 + 4 + ((((3))))"]
+    for parser in PARSERS:
+        generated = generate_code(lines, parser=parser)
+        if parser == "recursive":
+            needed, needed_storage = generated, storage.variables()
+        success = success and generated == needed and storage.variables() == needed_storage
+
+    # рекурсивний розбір групує такий вираз як (a - b) * c - d
+    code5, error = generate_code(["x = a - b * c - d"], parser="precedence")
+    needed = [('LOADV', 'a'), ('LOADV', 'b'), ('LOADV', 'c'), ('MUL', None),
+              ('SUB', None), ('LOADV', 'd'), ('SUB', None), ('SET', 'x')]
+    success = success and not error and code5 == needed
+    success = success and generate_code(["x = a - b * c - d"], parser="iterative") == (needed, "")
+
+    for line, needed in [("x = (a + b", "Неправильно розставлені дужки"),
+                         ("x = a + * b)", "Неправильно розставлені дужки"),
+                         ("x = a b", "Недопустима пара токенів Token(type='variable', value='a'), "
+                                     "Token(type='variable', value='b')"),
+                         ("x + a", "Неправильне присвоєння")]:
+        code7, error = generate_code([line])
+        success = success and code7 == [] and error == needed and not storage.variables()
+
+    generate_code(["x = (a + b) * 2"])
+    success = success and storage.variables() == ['a', 'b', 'x']
+
+    cache_clear()
+    set_cache_size(2)
+    generate_code(["x = a + b", "y = x * 2", "x = a + b"])
+    info = cache_info()
+    success = success and info["hits"] == 1 and info["misses"] == 2 and info["size"] == 2
+    clear()
+    code8, error = generate_code(["x = a + b"], clear_storage=False)
+    success = success and not error and code8 == [('LOADV', 'a'), ('LOADV', 'b'), ('ADD', None), ('SET', 'x')]
+    success = success and storage.variables() == ['a', 'b', 'x'] and cache_info()["hits"] == 2
+    generate_code(["z = 1"])
+    success = success and cache_info()["evictions"] == 1
+    set_cache_size(0)
+    success = success and cache_info()["size"] == 0 and cache_info()["evictions"] == 3
+    set_cache_size(1024)
+
+    depth = 100000
+    code6, error = generate_code(["x = " + "(" * depth + "a + 1" + ")" * depth + " * b"])
+    needed = [('LOADV', 'a'), ('LOADC', 1.0), ('ADD', None),
+              ('LOADV', 'b'), ('MUL', None), ('SET', 'x')]
+    success = success and not error and code6 == needed
+
+    code9, error = generate_code(["x = a + b", "a = x * 2"], slots=True)
+    success = success and code9 == [('LOADS', 0), ('LOADS', 1), ('ADD', None), ('SETS', 2),
+                                    ('LOADS', 2), ('LOADC', 2.0), ('MUL', None), ('SETS', 0)]
+    success = success and storage.variables() == ['a', 'b', 'x']
+    fused = [('ADDVV', ('a', 'b')), ('SETKEEP', 'x'), ('MULVC', ('x', 2.0)), ('DIVSET', 'a'),
+             ('SETC', (1.0, 'b')), ('SUBVV', ('a', 'c')), ('SET', 'c')]
+    code10 = resolve_slots(fused)
+    success = success and code10 == [('ADDSS', (0, 1)), ('SETKEEPS', 2), ('MULSC', (2, 2.0)),
+                                     ('DIVSETS', 0), ('SETCS', (1.0, 1)), ('SUBVV', ('a', 'c')),
+                                     ('SET', 'c')]
+    success = success and unresolve_slots(code10) == fused and unresolve_slots(code9) == [
+        ('LOADV', 'a'), ('LOADV', 'b'), ('ADD', None), ('SET', 'x'),
+        ('LOADV', 'x'), ('LOADC', 2.0), ('MUL', None), ('SET', 'a')]
+
     print("Success =", success)
@@ -22,13 +22,44 @@ number = _stack.pop()
 ("MUL", None) - обчислити добуток двох верхніх елементів стеку
 ("DIV", None) - обчислити частку від ділення двох верхніх елементів стеку
 ("SET", <змінна>) - встановити значення змінної у пам'яті (storage)
+
+Додаткові команди, які генерує оптимізатор (див. `optimizer.peephole`):
+("DUP", None) - додати у стек копію останнього елементу стеку
+("SETKEEP", <змінна>) - встановити значення змінної рівним останньому
+                        елементу стеку, не забираючи його зі стеку
+("MULC", <число>) - помножити останній елемент стеку на число
+
+Команди зі змінними, заданими номерами комірок пам'яті
+(див. `code_generator.resolve_slots`):
+("LOADS", <номер комірки>) - завантажити значення змінної у стек
+("SETS", <номер комірки>) - встановити значення змінної у пам'яті
+а також варіанти команд SETKEEP, SETC та суперкоманд з номерами комірок
+замість імен змінних (див. `code_generator.SLOT_COMMANDS`):
+SETKEEPS, SETCS, <OP>SS, <OP>SC та <OP>SETS.
+
+Суперкоманди - злиті послідовності команд, які виконуються за один виклик
+(див. `optimizer.select_superinstructions`). Для кожної операції
+<OP> з ADD, SUB, MUL, DIV:
+("<OP>VV", (<змінна a>, <змінна b>)) - LOADV a; LOADV b; <OP>
+("<OP>VC", (<змінна a>, <число c>)) - LOADV a; LOADC c; <OP>
+("<OP>C", <число c>) - LOADC c; <OP> (MULC описано вище)
+("<OP>SET", <змінна x>) - <OP>; SET x
+а також
+("SETC", (<число c>, <змінна x>)) - LOADC c; SET x
+
+Інтерпретатор - це об'єкт класу `Interpreter` з власним стеком, кодом
+останньої помилки та пам'яттю (`storage.Storage`). Функції модуля
+працюють з інтерпретатором за замовчуванням `_default`, який використовує
+пам'ять за замовчуванням модуля storage, а _stack та COMMAND_FUNCS - це
+його стек і словник функцій команд. Кожен сеанс (наприклад, кожен потік)
+має використовувати власний об'єкт Interpreter; пам'ять сеансу можна
+створити методом `Storage.fork` зі спільної базової пам'яті.
 """
-from storage import (get, clear, is_in, set as storage_set,
-                      get_last_error, input_var, add)
+from operator import add as _op_add, sub as _op_sub, mul as _op_mul, truediv as _op_div
 
+import storage as _storage
+from storage import get, clear, is_in, get_last_error, input_var, add
 
-_stack = []         # стек інтерпретатора для виконання обчислень
-_last_error = 0     # код помилки останньої операції
 
 # словник, що співставляє коди помилок до їх описи
 ERRORS = {
@@ -39,189 +70,588 @@ ERRORS = {
 }
 
 
-def _loadc(number):
-    """Функція завантажує число у стек.
-    
-    Щоб додати у стек, використовує _stack.append(...)
-    
-    Побічний ефект: встановлює значення _last_error у 0
-    :param number: число
-    :return: None
+class Interpreter:
+    """Інтерпретатор коду програми над пам'яттю storage.
+
+    Атрибути:
+        _storage - пам'ять (storage.Storage)
+        _stack - стек інтерпретатора для виконання обчислень
+        _last_error - код помилки останньої операції
+        _funcs - словник функцій команд {код команди: функція}
+    """
+
+    def __init__(self, storage=None):
+        """
+        :param storage: пам'ять (storage.Storage); за замовчуванням - нова
+            порожня пам'ять
+        """
+        self._storage = _storage.Storage() if storage is None else storage
+        self._stack = []
+        self._last_error = 0
+        self._funcs = {
+            "LOADC": self._loadc,
+            "LOADV": self._loadv,
+            "ADD": self._add,
+            "SUB": self._sub,
+            "MUL": self._mul,
+            "DIV": self._div,
+            "SET": self._set,
+            "DUP": self._dup,
+            "SETKEEP": self._setkeep,
+            "MULC": self._mulc,
+            "SETC": self._setc,
+            "LOADS": self._loads,
+            "SETS": self._sets,
+            "SETKEEPS": self._setkeeps,
+            "SETCS": self._setcs,
+        }
+        for name, operation in (("ADD", _op_add), ("SUB", _op_sub), ("MUL", _op_mul), ("DIV", _op_div)):
+            self._funcs[name + "VV"] = _make_vv(self, operation)
+            self._funcs[name + "VC"] = _make_vc(self, operation)
+            self._funcs[name + "SET"] = _make_set(self, operation)
+            self._funcs[name + "SS"] = _make_ss(self, operation)
+            self._funcs[name + "SC"] = _make_sc(self, operation)
+            self._funcs[name + "SETS"] = _make_sets(self, operation)
+            if name != "MUL":
+                self._funcs[name + "C"] = _make_c(self, operation)
+
+    @property
+    def storage(self):
+        """Пам'ять інтерпретатора (storage.Storage)."""
+        return self._storage
+
+    def execute(self, code):
+        """Метод виконує код програми, записаний у code.
+
+        Повертає код останньої помилки або 0, якщо помилки немає.
+
+        Використовує словник функцій команд _funcs.
+
+        :param code: код програми - список кортежів (<команда>, <операнд>)
+        :return: код останньої помилки або 0, якщо помилки немає
+        """
+        self._storage.writable()
+        funcs = self._funcs
+        for command, operand in code:
+            func = funcs.get(command)
+            if func is None:
+                self._last_error = 1
+                break
+            func(operand)
+            if self._last_error != 0:
+                break
+        return self._last_error
+
+    def _loadc(self, number):
+        """Метод завантажує число у стек.
+
+        Щоб додати у стек, використовує _stack.append(...)
+
+        Побічний ефект: встановлює значення _last_error у 0
+        :param number: число
+        :return: None
+        """
+        self._stack.append(number)
+        self._last_error = 0
+
+    def _loadv(self, variable):
+        """Метод завантажує значення змінної з пам'яті у стек.
+
+        Якщо змінної не існує, то встановлює відповідну помилку.
+
+        Якщо змінна не визначена, вводить значення зміної
+        за допомогою storage.
+
+        Щоб додати у стек, використовує _stack.append(...)
+
+        Побічний ефект: змінює значення _last_error
+
+        :param variable: ім'я змінної
+        :return: None
+        """
+        storage = self._storage
+        if not storage.is_in(variable):
+            self._last_error = 2
+            return
+        value = storage.get(variable)
+        if value is None:
+            storage.input_var(variable)
+            value = storage.get(variable)
+        self._stack.append(value)
+        self._last_error = 0
+
+    def _add(self, _=None):
+        """Метод бере 2 останніх елемента зі стеку,
+        обчислює їх суму та додає результат у стек.
+
+        Щоб взяти значення зі стеку, використовує _stack.pop()
+
+        Щоб додати у стек, використовує _stack.append(...)
+
+        Побічний ефект: встановлює значення _last_error у 0
+        :param _: ігнорується
+        :return: None
+        """
+        a = self._stack.pop()
+        b = self._stack.pop()
+        self._loadc(b+a)
+
+    def _sub(self, _=None):
+        """Метод бере 2 останніх елемента зі стеку,
+        обчислює їх різницю та додає результат у стек.
+
+        Щоб взяти значення зі стеку, використовує _stack.pop()
+
+        Щоб додати у стек, використовує _stack.append(...)
+
+        Побічний ефект: встановлює значення _last_error у 0
+
+        :param _: ігнорується
+        :return: None
+        """
+        b = self._stack.pop()
+        a = self._stack.pop()
+        self._loadc(a-b)
+
+    def _mul(self, _=None):
+        """Метод бере 2 останніх елемента зі стеку,
+        обчислює їх добуток та додає результат у стек.
+
+        Щоб взяти значення зі стеку, використовує _stack.pop()
+
+        Щоб додати у стек, використовує _stack.append(...)
+
+        Побічний ефект: встановлює значення _last_error у 0
+        :param _: ігнорується
+        :return: None
+        """
+        b = self._stack.pop()
+        a = self._stack.pop()
+        self._loadc(a*b)
+
+    def _div(self, _=None):
+        """Метод бере останнй та передостанній елементи зі стеку,
+        обчислює частку від ділення передостаннього елемента на останній
+        та додає результат у стек.
+
+        Якщо дільник - 0, то встановлює помилку.
+
+        Щоб взяти значення зі стеку, використовує _stack.pop()
+
+        Щоб додати у стек, використовує _stack.append(...)
+
+        Побічний ефект: змінює значення _last_error
+        :param _: ігнорується
+        :return: None
+        """
+        b = self._stack.pop()
+        a = self._stack.pop()
+        if b == 0:
+            self._last_error = 3
+        else:
+            self._loadc(a/b)
+
+    def _set(self, variable):
+        """Метод бере останній елемент зі стеку
+        та встановлює значення змінної рівним цьому елементу.
+
+        Якщо змінної не існує, то встановлює відповідну помилку.
+        Щоб взяти значення зі стеку, використовує _stack.pop()
+
+        Побічний ефект: змінює значення _last_error
+
+        :param variable: ім'я змінної
+        :return: None
+        """
+        if not self._storage.is_in(variable):
+            self._last_error = 2
+        else:
+            self._storage.set(variable, self._stack.pop())
+            self._last_error = 0
+
+    def _dup(self, _=None):
+        """Метод додає у стек копію останнього елемента стеку.
+
+        Побічний ефект: встановлює значення _last_error у 0
+        :param _: ігнорується
+        :return: None
+        """
+        self._stack.append(self._stack[-1])
+        self._last_error = 0
+
+    def _setkeep(self, variable):
+        """Метод встановлює значення змінної рівним останньому елементу стеку,
+        не забираючи його зі стеку (як SET, за яким іде LOADV тієї ж змінної).
+
+        Якщо змінної не існує, то встановлює відповідну помилку.
+
+        Побічний ефект: змінює значення _last_error
+
+        :param variable: ім'я змінної
+        :return: None
+        """
+        if not self._storage.is_in(variable):
+            self._last_error = 2
+        else:
+            self._storage.set(variable, self._stack[-1])
+            self._last_error = 0
+
+    def _mulc(self, number):
+        """Метод бере останній елемент зі стеку, множить його на число
+        та додає результат у стек (як LOADC number, за яким іде MUL).
+
+        Побічний ефект: встановлює значення _last_error у 0
+        :param number: число
+        :return: None
+        """
+        self._loadc(self._stack.pop() * number)
+
+    def _loads(self, index):
+        """Метод завантажує значення змінної з комірки пам'яті у стек.
+
+        Значення береться з пам'яті однією операцією індексування.
+        Якщо комірки не існує, то встановлює відповідну помилку.
+        Якщо змінна не визначена, вводить значення зміної
+        за допомогою storage.
+
+        Побічний ефект: змінює значення _last_error
+
+        :param index: номер комірки
+        :return: None
+        """
+        storage = self._storage
+        try:
+            value = storage._values[index]
+        except IndexError:
+            self._last_error = 2
+            return
+        if value is None:
+            storage.input_var(storage.name(index))
+            value = storage._values[index]
+        self._stack.append(value)
+        self._last_error = 0
+
+    def _sets(self, index):
+        """Метод бере останній елемент зі стеку
+        та записує його у комірку пам'яті.
+
+        Якщо комірки не існує, то встановлює відповідну помилку.
+
+        Побічний ефект: змінює значення _last_error
+
+        :param index: номер комірки
+        :return: None
+        """
+        values = self._storage._values
+        if index < len(values):
+            values[index] = self._stack.pop()
+            self._last_error = 0
+        else:
+            self._last_error = 2
+
+    def _setkeeps(self, index):
+        """Метод записує останній елемент стеку у комірку пам'яті, не
+        забираючи його зі стеку (SETKEEP з номером комірки).
+
+        Якщо комірки не існує, то встановлює відповідну помилку.
+
+        Побічний ефект: змінює значення _last_error
+
+        :param index: номер комірки
+        :return: None
+        """
+        values = self._storage._values
+        if index < len(values):
+            values[index] = self._stack[-1]
+            self._last_error = 0
+        else:
+            self._last_error = 2
+
+    def _setcs(self, operands):
+        """Суперкоманда LOADC c; SETS x.
+
+        Побічний ефект: змінює значення _last_error
+
+        :param operands: (c, номер комірки x)
+        :return: None
+        """
+        number, index = operands
+        values = self._storage._values
+        if index < len(values):
+            values[index] = number
+            self._last_error = 0
+        else:
+            self._stack.append(number)
+            self._last_error = 2
+
+    def _setc(self, operands):
+        """Суперкоманда LOADC c; SET x.
+
+        Побічний ефект: змінює значення _last_error
+
+        :param operands: (c, x)
+        :return: None
+        """
+        number, variable = operands
+        if not self._storage.is_in(variable):
+            self._stack.append(number)
+            self._last_error = 2
+        else:
+            self._storage.set(variable, number)
+            self._last_error = 0
+
+    def _value(self, variable):
+        """Метод повертає значення змінної, як його завантажила б команда LOADV.
+
+        Спочатку значення береться одним викликом storage.get; якщо змінна не
+        існує або невизначена, то використовується `_loadv` (помилка або
+        введення значення).
+
+        Побічний ефект: змінює значення _last_error
+
+        :param variable: ім'я змінної
+        :return: значення змінної або _ERROR, якщо виникла помилка
+        """
+        value = self._storage.get(variable)
+        if value is None:
+            self._loadv(variable)
+            if self._last_error != 0:
+                return _ERROR
+            value = self._stack.pop()
+        return value
+
+
+    def _slot_value(self, index):
+        """Метод повертає значення змінної з комірки, як його завантажила б
+        команда LOADS (помилка або введення значення).
+
+        Побічний ефект: змінює значення _last_error
+
+        :param index: номер комірки
+        :return: значення змінної або _ERROR, якщо виникла помилка
+        """
+        self._loads(index)
+        if self._last_error != 0:
+            return _ERROR
+        return self._stack.pop()
+
+
+_ERROR = object()   # ознака помилки для `Interpreter._value`
+
+
+def _make_vv(interpreter, operation):
+    """Функція створює суперкоманду LOADV a; LOADV b; <операція>.
+
+    :param interpreter: інтерпретатор
+    :param operation: функція операції з модуля operator
+    :return: функція команди з операндом (a, b)
     """
-    global _last_error
-    _stack.append(number)
-    _last_error = 0
-
-def _loadv(variable):
-    """Функція завантажує значення змінної з пам'яті у стек.
-    
-    Використовує модуль storage.
-    
-    Якщо змінної не існує, то встановлює відповідну помилку.
-    
-    Якщо змінна не визначена, вводить значення зміної
-    за допомогою storage.
-    
-    Щоб додати у стек, використовує _stack.append(...)
-    
-    Побічний ефект: змінює значення _last_error
-    
-    :param variable: ім'я змінної
-    :return: None
+    is_div = operation is _op_div
+    stack = interpreter._stack
+    get = interpreter._storage.get
+    value = interpreter._value
+
+    def command(operands):
+        a = get(operands[0])
+        if a is None:
+            a = value(operands[0])
+            if a is _ERROR:
+                return
+        b = get(operands[1])
+        if b is None:
+            b = value(operands[1])
+            if b is _ERROR:
+                stack.append(a)
+                return
+        if is_div and b == 0:
+            interpreter._last_error = 3
+        else:
+            stack.append(operation(a, b))
+            interpreter._last_error = 0
+    return command
+
+
+def _make_vc(interpreter, operation):
+    """Функція створює суперкоманду LOADV a; LOADC c; <операція>.
+
+    :param interpreter: інтерпретатор
+    :param operation: функція операції з модуля operator
+    :return: функція команди з операндом (a, c)
     """
-    global _last_error
-    if not is_in(variable):
-        _last_error = 2
-    elif get(variable) is None:
-        input_var(variable)
-        var = get(variable)
-        _stack.append(var)
-        _last_error = 0
-    else:
-        var = get(variable)
-        _stack.append(var)
-        _last_error = 0
-
-
-
-def _add(_=None):
-    """Функція бере 2 останніх елемента зі стеку,
-    обчислює їх суму та додає результат у стек.
-    
-    Щоб взяти значення зі стеку, використовує _stack.pop()
-    
-    Щоб додати у стек, використовує _stack.append(...)
-    
-    Побічний ефект: встановлює значення _last_error у 0
-    :param _: ігнорується
-    :return: None
+    is_div = operation is _op_div
+    stack = interpreter._stack
+    get = interpreter._storage.get
+    value = interpreter._value
+
+    def command(operands):
+        a = get(operands[0])
+        if a is None:
+            a = value(operands[0])
+            if a is _ERROR:
+                return
+        b = operands[1]
+        if is_div and b == 0:
+            interpreter._last_error = 3
+        else:
+            stack.append(operation(a, b))
+            interpreter._last_error = 0
+    return command
+
+
+def _make_c(interpreter, operation):
+    """Функція створює суперкоманду LOADC c; <операція>.
+
+    :param interpreter: інтерпретатор
+    :param operation: функція операції з модуля operator
+    :return: функція команди з операндом c
     """
-    global _last_error
-    a = _stack.pop()
-    b = _stack.pop()
-    _loadc(b+a)
-    _last_error = 0
-
-
-def _sub(_=None):
-    """Функція бере 2 останніх елемента зі стеку,
-    обчислює їх різницю та додає результат у стек.
-    
-    Щоб взяти значення зі стеку, використовує _stack.pop()
-    
-    Щоб додати у стек, використовує _stack.append(...)
-    
-    Побічний ефект: встановлює значення _last_error у 0
-    
-    :param _: ігнорується
-    :return: None
+    is_div = operation is _op_div
+    stack = interpreter._stack
+
+    def command(number):
+        a = stack.pop()
+        if is_div and number == 0:
+            interpreter._last_error = 3
+        else:
+            stack.append(operation(a, number))
+            interpreter._last_error = 0
+    return command
+
+
+def _make_set(interpreter, operation):
+    """Функція створює суперкоманду <операція>; SET x.
+
+    :param interpreter: інтерпретатор
+    :param operation: функція операції з модуля operator
+    :return: функція команди з операндом x
     """
-    global _last_error
-    b = _stack.pop()
-    a = _stack.pop()
-    _loadc(a-b)
-    _last_error = 0
-
-
-def _mul(_=None):
-    """Функція бере 2 останніх елемента зі стеку,
-    обчислює їх добуток та додає результат у стек.
-    
-    Щоб взяти значення зі стеку, використовує _stack.pop()
-    
-    Щоб додати у стек, використовує _stack.append(...)
-    
-    Побічний ефект: встановлює значення _last_error у 0
-    :param _: ігнорується
-    :return: None
+    is_div = operation is _op_div
+    stack = interpreter._stack
+    storage = interpreter._storage
+
+    def command(variable):
+        b = stack.pop()
+        a = stack.pop()
+        if is_div and b == 0:
+            interpreter._last_error = 3
+        elif not storage.is_in(variable):
+            stack.append(operation(a, b))
+            interpreter._last_error = 2
+        else:
+            storage.set(variable, operation(a, b))
+            interpreter._last_error = 0
+    return command
+
+
+def _make_ss(interpreter, operation):
+    """Функція створює суперкоманду LOADS a; LOADS b; <операція>.
+
+    :param interpreter: інтерпретатор
+    :param operation: функція операції з модуля operator
+    :return: функція команди з операндом (номер комірки a, номер комірки b)
     """
-    global _last_error
-    b = _stack.pop()
-    a = _stack.pop()
-    _loadc(a*b)
-    _last_error = 0
-
-
-def _div(_=None):
-    """Функція бере останнй та передостанній елементи зі стеку,
-    обчислює частку від ділення передостаннього елемента на останній
-    та додає результат у стек.
-    
-    Якщо дільник - 0, то встановлює помилку.
-    
-    Щоб взяти значення зі стеку, використовує _stack.pop()
-    
-    Щоб додати у стек, використовує _stack.append(...)
-    
-    Побічний ефект: встановлює значення _last_error у 0
-    :param _: ігнорується
-    :return: None
+    is_div = operation is _op_div
+    stack = interpreter._stack
+    storage = interpreter._storage
+    value = interpreter._slot_value
+
+    def command(operands):
+        values = storage._values
+        try:
+            a = values[operands[0]]
+            b = values[operands[1]]
+        except IndexError:
+            a = b = None
+        if a is None:
+            a = value(operands[0])
+            if a is _ERROR:
+                return
+        if b is None:
+            b = value(operands[1])
+            if b is _ERROR:
+                stack.append(a)
+                return
+        if is_div and b == 0:
+            interpreter._last_error = 3
+        else:
+            stack.append(operation(a, b))
+            interpreter._last_error = 0
+    return command
+
+
+def _make_sc(interpreter, operation):
+    """Функція створює суперкоманду LOADS a; LOADC c; <операція>.
+
+    :param interpreter: інтерпретатор
+    :param operation: функція операції з модуля operator
+    :return: функція команди з операндом (номер комірки a, c)
     """
-    global _last_error
-    b = _stack.pop()
-    a = _stack.pop()
-    if b == 0:
-        _last_error = 3
-    else:
-        _loadc(a/b)
-        _last_error = 0
-
-
-def _set(variable):
-    """Функція бере останній елемент зі стеку
-    та встановлює значення змінної рівним цьому елементу.
-    
-    Якщо змінної не існує, то встановлює відповідну помилку.
-    Щоб взяти значення зі стеку, використовує _stack.pop()
-    
-    Побічний ефект: змінює значення _last_error
-    
-    :param variable: ім'я змінної
-    :return: None
+    is_div = operation is _op_div
+    stack = interpreter._stack
+    storage = interpreter._storage
+    value = interpreter._slot_value
+
+    def command(operands):
+        values = storage._values
+        index = operands[0]
+        a = values[index] if index < len(values) else None
+        if a is None:
+            a = value(index)
+            if a is _ERROR:
+                return
+        b = operands[1]
+        if is_div and b == 0:
+            interpreter._last_error = 3
+        else:
+            stack.append(operation(a, b))
+            interpreter._last_error = 0
+    return command
+
+
+def _make_sets(interpreter, operation):
+    """Функція створює суперкоманду <операція>; SETS x.
+
+    :param interpreter: інтерпретатор
+    :param operation: функція операції з модуля operator
+    :return: функція команди з операндом - номером комірки x
     """
-    global _last_error
-
-    if not is_in(variable):
-        _last_error = 2
-    else:
-        c = _stack.pop()
-        storage_set(variable, c)
-        _last_error = 0
-
-
-COMMAND_FUNCS = {
-    "LOADC": _loadc,
-    "LOADV": _loadv,
-    "ADD": _add,
-    "SUB": _sub,
-    "MUL": _mul,
-    "DIV": _div,
-    "SET": _set
-}
+    is_div = operation is _op_div
+    stack = interpreter._stack
+    storage = interpreter._storage
+
+    def command(index):
+        b = stack.pop()
+        a = stack.pop()
+        values = storage._values
+        if is_div and b == 0:
+            interpreter._last_error = 3
+        elif index < len(values):
+            values[index] = operation(a, b)
+            interpreter._last_error = 0
+        else:
+            stack.append(operation(a, b))
+            interpreter._last_error = 2
+    return command
+
+
+_default = Interpreter(_storage._default)   # інтерпретатор за замовчуванням
+_stack = _default._stack        # стек інтерпретатора для виконання обчислень
+COMMAND_FUNCS = _default._funcs     # функції команд {код команди: функція}
 
 
 def execute(code):
     """Функція виконує код програми, записаний у code.
-    
+
     Повертає код останньої помилки або 0, якщо помилки немає.
     Якщо є помилка, то показує її.
-    
-    Використовує словник функцій COMMAND_FUNCS.
+
+    Використовує інтерпретатор за замовчуванням та його словник функцій
+    команд COMMAND_FUNCS.
 
     :param code: код програми - список кортежів (<команда>, <операнд>)
     :return: код останньої помилки або 0, якщо помилки немає
     """
-    global _last_error
-    for command, operand in code:
-        if command in COMMAND_FUNCS:
-            func = COMMAND_FUNCS[command]
-            func(operand)
-            if _last_error != 0:
-                break
-        else:
-            _last_error = 1
-            break
-    return _last_error
+    return _default.execute(code)
 
 
 if __name__ == "__main__":
@@ -284,4 +714,61 @@ if __name__ == "__main__":
     z = get('z')
     assert last_error == 0 and z == 1.0
 
+    code = [('LOADC', 3.0),
+            ('SETKEEP', 'x'),
+            ('DUP', None),
+            ('MUL', None),
+            ('MULC', 0.5),
+            ('SET', 'y')]
+    depth = len(_stack)
+    last_error = execute(code)
+    assert last_error == 0 and get('x') == 3.0 and get('y') == 4.5 and len(_stack) == depth
+
+    code = [('LOADS', 0),       # x
+            ('LOADC', 2.0),
+            ('MUL', None),
+            ('SETS', 2)]        # z
+    last_error = execute(code)
+    assert last_error == 0 and get('z') == 6.0 and len(_stack) == depth
+    last_error = execute([('LOADS', 7)])
+    assert last_error == 2 and len(_stack) == depth
+
+    code = [('ADDSS', (0, 1)),      # x + y
+            ('SETKEEPS', 2),        # z
+            ('MULSC', (2, 0.5)),
+            ('SUBSETS', 1),         # y
+            ('SETCS', (4.0, 0))]    # x
+    last_error = execute(code)
+    assert last_error == 0 and get('x') == 4.0 and get('y') == 3.75 and get('z') == 7.5
+    assert len(_stack) == depth
+    assert execute([('ADDSS', (0, 7))]) == 2 and execute([('DIVSC', (0, 0.0))]) == 3
+    assert execute([('LOADC', 1.0), ('SETCS', (1.0, 7))]) == 2
+    del _stack[depth:]
+
+    import threading
+    from storage import Storage
+
+    base = Storage()
+    for variable in ('x', 'y', 'z'):
+        base.add(variable)
+    base.set('y', 1.0)
+    code = [('LOADV', 'x'), ('LOADV', 'y'), ('SUB', None), ('SET', 'z'),
+            ('LOADC', 1.0), ('LOADV', 'z'), ('DIVSET', 'y')]
+    results = {}
+
+    def session(number):
+        interpreter = Interpreter(base.fork())
+        for i in range(200):
+            interpreter.storage.set('x', float(number % 2))
+            interpreter.storage.set('y', 1.0)
+            results[number] = interpreter.execute(code), interpreter.storage.get('y')
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == {i: (0, -1.0) if i % 2 == 0 else (3, 1.0) for i in range(8)}
+    assert base.get('y') == 1.0 and base.get('z') is None and Interpreter().execute([('SET', 'x')]) == 2
+
     print("Success = True")
@@ -0,0 +1,390 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Модуль призначено для збереження стану пам'яті (`storage.py`) у файлах:
+знімків (snapshot) та журналу змін (journal).
+
+Знімок - це двійковий файл з усіма змінними та їх значеннями:
+    заголовок SNAPSHOT_HEADER: сигнатура, версія, покоління та зміщення
+        журналу, кількість змінних, довжина блоку імен
+    імена змінних у UTF-8, розділені '\\n'
+    значення змінних - масив чисел double
+    ознаки визначеності значень - по одному байту на змінну
+Знімок записується у тимчасовий файл, який після fsync атомарно замінює
+попередній знімок, тому після збою залишається попередній або новий
+знімок повністю.
+
+Журнал - це файл, у кінець якого дописуються записи операцій пам'яті
+(після заголовка JOURNAL_HEADER: сигнатура, версія, покоління):
+    b"A" <довжина імені> <ім'я> - додати змінну
+    b"S" <номер комірки> <число> - встановити значення
+    b"U" <номер комірки> - зробити значення невизначеним
+    b"R" <довжина імені> <ім'я> - видалити змінну
+    b"C" - очистити пам'ять
+Відновлення стану - це читання знімка та повторення записів журналу.
+Неповний останній запис (збій під час запису) ігнорується.
+
+Записи S та U посилаються на номери комірок, тому повторювати над знімком
+можна лише записи, зроблені після нього. Для цього знімок зберігає
+позицію журналу (покоління, зміщення), до якої він містить усі записи:
+записи журналу того ж покоління повторюються з цього зміщення, журнал
+старшого покоління не повторюється. Стиснення журналу (compaction)
+записує знімок з наступним поколінням та зміщенням одразу після
+заголовка і потім очищує журнал, записуючи у заголовок це покоління,
+тому збій між записом знімка та очищенням журналу не порушує стан.
+
+Кожен запис одразу передається операційній системі (flush), тому
+записи не втрачаються при збої процесу. Політика fsync визначає, коли
+записи гарантовано потрапляють на диск, тобто не втрачаються при збої
+операційної системи або живлення (FSYNC_POLICIES):
+    "always" - після кожного запису (найповільніше, без втрат)
+    "interval" - під час запису, якщо з попереднього fsync минуло не
+        менше interval секунд, та при закритті; записи, після яких
+        журнал не змінюється, потрапляють на диск лише при закритті
+        (або коли вирішить операційна система)
+    "never" - коли вирішить операційна система (та при закритті)
+"""
+
+import os
+import struct
+import time
+from array import array
+
+# сигнатура, версія, покоління та зміщення журналу, кількість змінних,
+# довжина блоку імен
+SNAPSHOT_HEADER = struct.Struct("<4sIQQQQ")
+SNAPSHOT_MAGIC = b"MLGS"
+# сигнатура, версія та покоління журналу
+JOURNAL_HEADER = struct.Struct("<4sIQ")
+JOURNAL_MAGIC = b"MLGJ"
+VERSION = 3
+
+_ADD = struct.Struct("<cI")        # також для запису видалення змінної
+_SET = struct.Struct("<cId")
+_UNDEFINED = struct.Struct("<cI")
+_CLEAR = b"C"
+
+FSYNC_POLICIES = ("always", "interval", "never")
+
+
+def write_snapshot(path, names, values, position=(0, 0)):
+    """Функція атомарно записує знімок пам'яті у файл.
+
+    :param path: шлях до файлу знімка
+    :param names: імена змінних за номерами комірок
+    :param values: значення змінних за номерами комірок (None - невизначене)
+    :param position: позиція журналу (<покоління>, <зміщення>), записи до
+        якої вже містяться у знімку (див. `Journal.position`)
+    :return: None
+    """
+    values = list(values)
+    block = "\n".join(names).encode("utf-8")
+    numbers = array("d", [0.0 if value is None else value for value in values])
+    flags = bytes(value is not None for value in values)
+    temp = path + ".tmp"
+    with open(temp, "wb") as file:
+        file.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, VERSION, *position, len(values), len(block)))
+        file.write(block)
+        file.write(numbers.tobytes())
+        file.write(flags)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp, path)
+
+
+def read_snapshot(path):
+    """Функція читає знімок пам'яті з файлу.
+
+    :param path: шлях до файлу знімка
+    :return: (<список імен змінних>, <список значень>, <позиція журналу>)
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+    if len(data) < SNAPSHOT_HEADER.size:
+        raise ValueError("{} не є знімком пам'яті".format(path))
+    magic, version, generation, offset, count, length = SNAPSHOT_HEADER.unpack_from(data)
+    start = SNAPSHOT_HEADER.size
+    if magic != SNAPSHOT_MAGIC or version != VERSION or len(data) != start + length + 9 * count:
+        raise ValueError("{} не є знімком пам'яті".format(path))
+    names = data[start:start + length].decode("utf-8").split("\n") if count else []
+    numbers = array("d")
+    numbers.frombytes(data[start + length:start + length + 8 * count])
+    flags = data[start + length + 8 * count:]
+    values = numbers.tolist()
+    if not all(flags):
+        values = [value if flag else None for value, flag in zip(values, flags)]
+    return names, values, (generation, offset)
+
+
+def replay(path, storage, position=(0, 0)):
+    """Функція повторює записи журналу над пам'яттю.
+
+    :param path: шлях до файлу журналу
+    :param storage: пам'ять (storage.Storage)
+    :param position: позиція журналу, до якої записи вже містяться у
+        пам'яті (див. `read_snapshot`)
+    :return: кількість повторених записів
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+    if not data:
+        return 0
+    generation = _read_generation(data, path)
+    covered, offset = position
+    if generation < covered:
+        return 0        # журнал очищено після запису знімка
+    position = max(offset, JOURNAL_HEADER.size) if generation == covered else JOURNAL_HEADER.size
+    count, size = 0, len(data)
+    while position < size:
+        kind = data[position:position + 1]
+        if (kind == b"A" or kind == b"R") and position + _ADD.size <= size:
+            length = _ADD.unpack_from(data, position)[1]
+            end = position + _ADD.size + length
+            if end > size:
+                break
+            variable = data[position + _ADD.size:end].decode("utf-8")
+            if kind == b"A":
+                storage.add(variable)
+            else:
+                storage.remove(variable)
+        elif kind == b"S" and position + _SET.size <= size:
+            _, index, value = _SET.unpack_from(data, position)
+            storage.set(storage._names[index], value)
+            end = position + _SET.size
+        elif kind == b"U" and position + _UNDEFINED.size <= size:
+            index = _UNDEFINED.unpack_from(data, position)[1]
+            storage.set(storage._names[index], None)
+            end = position + _UNDEFINED.size
+        elif kind == _CLEAR:
+            storage.clear()
+            end = position + 1
+        else:
+            break
+        position = end
+        count += 1
+    return count
+
+
+def _read_generation(data, path):
+    """Функція перевіряє заголовок журналу та повертає його покоління.
+
+    :param data: початок файлу журналу
+    :param path: шлях до файлу журналу
+    :return: покоління
+    """
+    if len(data) < JOURNAL_HEADER.size:
+        raise ValueError("{} не є журналом пам'яті".format(path))
+    magic, version, generation = JOURNAL_HEADER.unpack_from(data)
+    if magic != JOURNAL_MAGIC or version != VERSION:
+        raise ValueError("{} не є журналом пам'яті".format(path))
+    return generation
+
+
+class Journal:
+    """Журнал операцій пам'яті, відкритий для дописування."""
+
+    def __init__(self, path, fsync="interval", interval=1.0):
+        """
+        :param path: шлях до файлу журналу
+        :param fsync: політика fsync з FSYNC_POLICIES
+        :param interval: інтервал fsync у секундах для політики "interval"
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError("невідома політика fsync: {}".format(fsync))
+        self.path = path
+        self.fsync = fsync
+        self.interval = interval
+        self.snapshot = None        # шлях до знімка для стиснення журналу
+        self.compact_size = None    # розмір журналу для автоматичного стиснення
+        self.generation = 0
+        self._file = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(JOURNAL_HEADER.pack(JOURNAL_MAGIC, VERSION, 0))
+            self._file.flush()
+        else:
+            with open(path, "rb") as file:
+                self.generation = _read_generation(file.read(JOURNAL_HEADER.size), path)
+        self._synced = time.monotonic()
+
+    def add(self, variable):
+        """Метод записує операцію додавання змінної.
+
+        :param variable: ім'я змінної
+        :return: None
+        """
+        name = variable.encode("utf-8")
+        self._write(_ADD.pack(b"A", len(name)) + name)
+
+    def set(self, index, value):
+        """Метод записує операцію встановлення значення.
+
+        :param index: номер комірки
+        :param value: число або None
+        :return: None
+        """
+        if value is None:
+            self._write(_UNDEFINED.pack(b"U", index))
+        else:
+            self._write(_SET.pack(b"S", index, value))
+
+    def remove(self, variable):
+        """Метод записує операцію видалення змінної.
+
+        :param variable: ім'я змінної
+        :return: None
+        """
+        name = variable.encode("utf-8")
+        self._write(_ADD.pack(b"R", len(name)) + name)
+
+    def clear(self):
+        """Метод записує операцію очищення пам'яті.
+
+        :return: None
+        """
+        self._write(_CLEAR)
+
+    def size(self):
+        """Метод повертає розмір журналу у байтах.
+
+        :return: розмір
+        """
+        return self._file.tell()
+
+    def position(self):
+        """Метод повертає поточну позицію журналу для знімка.
+
+        :return: (<покоління>, <розмір у байтах>)
+        """
+        return self.generation, self._file.tell()
+
+    def sync(self):
+        """Метод записує буфер журналу на диск (fsync).
+
+        :return: None
+        """
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._synced = time.monotonic()
+
+    def truncate(self):
+        """Метод видаляє усі записи журналу та збільшує його покоління.
+
+        :return: None
+        """
+        self.generation += 1
+        self._file.seek(0)
+        self._file.truncate()
+        self._file.write(JOURNAL_HEADER.pack(JOURNAL_MAGIC, VERSION, self.generation))
+        self.sync()
+
+    def close(self):
+        """Метод записує буфер журналу на диск та закриває файл.
+
+        :return: None
+        """
+        if not self._file.closed:
+            self.sync()
+            self._file.close()
+
+    def _write(self, record):
+        """Метод дописує запис у журнал, передає його операційній системі
+        та виконує fsync відповідно до політики fsync.
+
+        :param record: байти запису
+        :return: None
+        """
+        self._file.write(record)
+        self._file.flush()
+        if self.fsync == "always":
+            self.sync()
+        elif self.fsync == "interval" and time.monotonic() - self._synced >= self.interval:
+            self.sync()
+
+
+class JournalValues(list):
+    """Список значень пам'яті, що записує кожне присвоєння за індексом у
+    журнал.
+
+    Використовується пам'яттю замість звичайного списку, поки журнал
+    відкритий (див. `storage.Storage.open_journal`), тому у журнал
+    потрапляють і присвоєння рушіїв виконання, які змінюють список значень
+    безпосередньо. Метод copy повертає звичайний список.
+    """
+
+    __slots__ = ("journal", "storage")
+
+    def __init__(self, values, journal, storage):
+        """
+        :param values: початкові значення
+        :param journal: журнал (Journal)
+        :param storage: пам'ять, для якої виконується стиснення журналу
+        """
+        super().__init__(values)
+        self.journal = journal
+        self.storage = storage
+
+    def __setitem__(self, index, value):
+        list.__setitem__(self, index, value)
+        if isinstance(index, slice):
+            for i in range(*index.indices(len(self))):
+                self.journal.set(i, self[i])
+        else:
+            self.journal.set(index if index >= 0 else index + len(self), value)
+        self.storage._journal_written()
+
+
+if __name__ == "__main__":
+    import shutil
+    import subprocess
+    import sys
+    import tempfile
+
+    import storage
+
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, "state.snap")
+        write_snapshot(path, ["a", "b", "c"], [1.5, None, -2.0], (3, 40))
+        success = read_snapshot(path) == (["a", "b", "c"], [1.5, None, -2.0], (3, 40))
+        write_snapshot(path, [], [])
+        success = success and read_snapshot(path) == ([], [], (0, 0))
+        with open(path, "ab") as file:
+            file.write(b"x")
+        try:
+            read_snapshot(path)
+            success = False
+        except ValueError:
+            pass
+        try:
+            Journal(os.path.join(directory, "bad.log"), fsync="sometimes")
+            success = False
+        except ValueError:
+            pass
+
+        # збій процесу без закриття журналу та fsync
+        log = os.path.join(directory, "crash.log")
+        script = ("import os, storage\n"
+                  "storage.open_journal({!r})\n"
+                  "for i in range(50):\n"
+                  "    storage.add('x{{}}'.format(i))\n"
+                  "    storage.set('x{{}}'.format(i), i * 0.5)\n"
+                  "os._exit(0)\n").format(log)
+        subprocess.run([sys.executable, "-c", script], check=True,
+                       cwd=os.path.dirname(os.path.abspath(__file__)))
+        memory = storage.Storage()
+        success = success and memory.restore(None, log) == 100
+        success = success and len(memory.variables()) == 50 and memory.get("x49") == 24.5
+
+        long_name = "x" * 70000       # довжина імені не вміщується у 2 байти
+        log = os.path.join(directory, "long.log")
+        memory = storage.Storage()
+        memory.open_journal(log, fsync="never")
+        memory.add(long_name)
+        memory.set(long_name, 1.0)
+        memory.close_journal()
+        restored = storage.Storage()
+        success = success and restored.restore(None, log) == 2 and restored.get(long_name) == 1.0
+    finally:
+        shutil.rmtree(directory)
+
+    print("Success =", success)
@@ -6,9 +6,16 @@
 ----------------
 `exec(filename)` :
     відкрити файл з розширенням '.mlg' і виконати його як окрему програму
+    (код програми зберігається у `__mlcache__/<ім'я>.mlc` поруч з файлом
+    і використовується повторно, поки файл не зміниться)
+
+`watch(filename)` :
+    виконати програму з файлу '.mlg' у реактивному режимі: після цього
+    кожне введене присвоєння повторно обчислює лише залежні від нього
+    рядки програми, а змінені змінні показуються
 
 `clear()` : 
-    очистити пам'ять 
+    очистити пам'ять (та вимкнути реактивний режим)
 
 `help()` : 
     показати це повідомлення 
@@ -18,12 +25,20 @@
 
 `print(variable)` : 
     показати значення змінної 
+
+Режим сервера (див. `server.py`):
+    python main.py --serve <хост>:<порт> | <шлях до сокета Unix> [<кількість сеансів>]
 """
 
+import sys
 
-from code_generator import generate_code
+from bytecode_cache import compile_file
+from code_generator import generate_code, resolve_slots
 from interpreter import execute, ERRORS
-from storage import clear, get_last_error, get
+from optimizer import (optimize, peephole, eliminate_common_subexpressions, slice_program,
+                       select_superinstructions)
+from storage import clear, get_last_error, get, remove_many
+import reactive
 
 
 def show_help(): 
@@ -31,21 +46,34 @@ def show_help():
     print(__doc__)
 
 
-def exec_program(filename): 
+def exec_program(filename, outputs=None): 
+    """Функція виконує програму з файлу filename.
+
+    Якщо задано outputs (імена змінних), то виконуються лише рядки,
+    від яких залежать значення цих змінних (див. `optimizer.slice_program`).
+    """
     if not filename.endswith('.mlg'): 
         print('Помилка під час генерації коду: неправильне розширення у файлу.')
         return 
     
     with open(filename, 'r') as file: 
-        lines = [line.strip() for line in file.readlines()]
-        print('... ', end='')
-        print(*lines, sep='\n... ')
-        code, error = generate_code(lines, clear_storage=True)
+        for line in file:
+            print('...', line.strip())
+        file.seek(0)
+        code, error = compile_file(filename, file)
         if error: 
             print('Помилка під час генерації коду:', error)
             return 
     
+        code, _ = optimize(code)
+        if outputs is not None:
+            code, _ = slice_program(code, outputs)
+        code, temps = eliminate_common_subexpressions(code)
+        code, _ = peephole(code)
+        code, _ = select_superinstructions(code)
+        code = resolve_slots(code)
         last_error = execute(code)
+        remove_many(temps)
         if last_error:
             error = ERRORS[last_error]
             print("Помилка виконання програми: {}".format(error))
@@ -60,13 +88,46 @@ def print_var(variable):
         print(var)
 
 
+def watch_program(filename):
+    """Функція виконує програму з файлу filename у реактивному режимі
+    (див. `reactive.py`).
+    """
+    if not filename.endswith('.mlg'): 
+        print('Помилка під час генерації коду: неправильне розширення у файлу.')
+        return 
+
+    with open(filename, 'r') as file: 
+        code, error = compile_file(filename, file)
+    if error: 
+        print('Помилка під час генерації коду:', error)
+        return 
+    code, _ = optimize(code)
+    last_error = reactive.load(code)
+    if last_error:
+        print("Помилка виконання програми: {}".format(ERRORS[last_error]))
+
+
 def exec_line(line): 
 
+    if reactive.is_loaded():
+        error, last_error, changed = reactive.assign(line)
+        if error:
+            print('Помилка під час генерації коду:', error)
+        elif last_error:
+            print("Помилка виконання програми: {}".format(ERRORS[last_error]))
+        elif changed:
+            print('Змінено:', ', '.join(changed))
+        return
+
     code, error = generate_code([line, ], clear_storage=False)
     if error: 
         print('Помилка під час генерації коду:', error)
         return 
     
+    code, _ = optimize(code)
+    code, _ = peephole(code)
+    code, _ = select_superinstructions(code)
+    code = resolve_slots(code)
     last_error = execute(code)
     if last_error:
         error = ERRORS[last_error]
@@ -86,9 +147,12 @@ def mainloop():
             show_help()
         elif line == 'clear()': 
             clear() 
+            reactive.reset()
         elif line.startswith('exec(') and line.endswith(')'):
             filename = line[len('exec('):-1]
             exec_program(filename)
+        elif line.startswith('watch(') and line.endswith(')'):
+            watch_program(line[len('watch('):-1])
         elif line.startswith('print(') and line.endswith(')'):
             variable = line[len('print('):-1]
             print_var(variable)
@@ -97,4 +161,8 @@ def mainloop():
 
     
 if __name__ == '__main__': 
-    mainloop()
+    if len(sys.argv) > 2 and sys.argv[1] == '--serve':
+        import server
+        server.serve(sys.argv[2], *map(int, sys.argv[3:4]))
+    else:
+        mainloop()
@@ -0,0 +1,466 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Модуль призначено для пам'яті з дуже великою кількістю змінних, значення
+яких зберігаються у файлі, відображеному у пам'ять (mmap).
+
+Клас `MappedStorage` - це пам'ять (`storage.Storage`), у якій список
+значень _values замінено об'єктом `MappedValues`: значення зберігаються
+масивом чисел double (8 байтів на значення) у файлі, а ознака
+визначеності значення - бітовою картою (1 біт на значення), тому
+невизначена змінна (None) відрізняється від змінної, якої не існує, як і у
+`storage.get`. Сторінки файлу завантажує та вивантажує операційна
+система, тому в оперативній пам'яті знаходяться лише потрібні частини
+масиву значень. Рушії виконання (`interpreter.py`, `closure_engine.py`,
+`python_backend.py`) звертаються до MappedValues так само, як до списку.
+
+Формат файлу значень:
+    заголовок HEADER: сигнатура MAGIC, версія, ємність, кількість значень
+    масив значень double на ємність значень
+    бітова карта визначеності на ємність значень
+При заповненні ємність подвоюється.
+
+Імена змінних записуються у файл '<шлях>.names' по одному у рядку; при
+відкритті існуючого файлу таблиця символів (ім'я -> номер комірки)
+відновлюється з нього. Ім'я нової змінної записується у файл імен до
+того, як для неї додається комірка у файлі значень, тому після аварійного
+завершення процесу імен не менше, ніж значень; якщо кількості не
+збігаються, то залишаються змінні спільного початку обох файлів. Таблиця символів залишається словником Python, але
+значення змінних не є об'єктами Python.
+
+Пам'ять, створена методом fork з MappedStorage, отримує при першій зміні
+копію значень у тимчасовому файлі (див. `MappedValues.copy`).
+"""
+
+import mmap
+import os
+import struct
+import tempfile
+
+from storage import Storage
+
+# сигнатура файлу значень
+MAGIC = b"MLGV"
+# версія формату файлу значень
+VERSION = 1
+# заголовок: сигнатура, версія, ємність, кількість значень
+HEADER = struct.Struct("<4sIQQ")
+# ємність нового файлу значень
+INITIAL_CAPACITY = 1024
+
+
+class MappedValues:
+    """Список значень змінних у файлі, відображеному у пам'ять.
+
+    Підтримує операції списку, які використовує пам'ять та рушії
+    виконання: len, індексування (лише невід'ємні індекси), присвоєння та
+    видалення за індексом, append, clear, truncate та copy. Значення None означає
+    невизначене значення.
+    """
+
+    __slots__ = ("_file", "_map", "_data", "_valid", "_length", "_capacity")
+
+    def __init__(self, path=None):
+        """
+        :param path: шлях до файлу значень або None - тимчасовий файл;
+            якщо файл існує, то значення читаються з нього
+        """
+        if path is None:
+            self._file = tempfile.TemporaryFile()
+        else:
+            self._file = open(path, "r+b" if os.path.exists(path) else "w+b")
+        size = os.fstat(self._file.fileno()).st_size
+        if size == 0:
+            self._capacity, self._length = INITIAL_CAPACITY, 0
+            self._file.truncate(_file_size(self._capacity))
+        else:
+            magic, version, self._capacity, self._length = HEADER.unpack(self._file.read(HEADER.size))
+            if magic != MAGIC or version != VERSION or size < _file_size(self._capacity):
+                self._file.close()
+                raise ValueError("{} не є файлом значень".format(path))
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        self._views()
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if not 0 <= index < self._length:
+            raise IndexError(index)
+        if self._valid[index >> 3] >> (index & 7) & 1:
+            return self._data[index]
+        return None
+
+    def __setitem__(self, index, value):
+        if not 0 <= index < self._length:
+            raise IndexError(index)
+        if value is None:
+            self._valid[index >> 3] &= ~(1 << (index & 7)) & 0xFF
+        else:
+            self._data[index] = value
+            self._valid[index >> 3] |= 1 << (index & 7)
+
+    def __delitem__(self, index):
+        if not 0 <= index < self._length:
+            raise IndexError(index)
+        start = HEADER.size + 8 * index
+        self._map.move(start, start + 8, 8 * (self._length - 1 - index))
+        first, end, bit = index >> 3, -(-self._length // 8), index & 7
+        bits = int.from_bytes(self._valid[first:end], "little")
+        bits = bits & ((1 << bit) - 1) | bits >> (bit + 1) << bit
+        self._valid[first:end] = bits.to_bytes(end - first, "little")
+        self._length -= 1
+        HEADER.pack_into(self._map, 0, MAGIC, VERSION, self._capacity, self._length)
+
+    def __iter__(self):
+        for index in range(self._length):
+            yield self[index]
+
+    def append(self, value):
+        """Метод додає значення у кінець списку.
+
+        :param value: число або None
+        :return: None
+        """
+        if self._length == self._capacity:
+            self._grow(self._capacity * 2)
+        self._length += 1
+        HEADER.pack_into(self._map, 0, MAGIC, VERSION, self._capacity, self._length)
+        self[self._length - 1] = value
+
+    def clear(self):
+        """Метод видаляє усі значення (розмір файлу не змінюється).
+
+        :return: None
+        """
+        self.truncate(0)
+
+    def truncate(self, length):
+        """Метод залишає перші length значень (розмір файлу не змінюється).
+
+        :param length: нова кількість значень (не більша за поточну)
+        :return: None
+        """
+        self._length = min(length, self._length)
+        HEADER.pack_into(self._map, 0, MAGIC, VERSION, self._capacity, self._length)
+
+    def copy(self):
+        """Метод повертає копію значень у тимчасовому файлі.
+
+        :return: MappedValues
+        """
+        values = MappedValues()
+        values._grow(self._capacity)
+        values._map[:] = self._map[:_file_size(self._capacity)]
+        values._length = self._length
+        return values
+
+    def flush(self):
+        """Метод записує змінені сторінки у файл.
+
+        :return: None
+        """
+        self._map.flush()
+
+    def close(self):
+        """Метод закриває відображення та файл.
+
+        :return: None
+        """
+        self._release()
+        self._map.close()
+        self._file.close()
+
+    def _views(self):
+        """Метод створює представлення масиву значень та бітової карти.
+
+        :return: None
+        """
+        data_end = HEADER.size + 8 * self._capacity
+        self._data = memoryview(self._map)[HEADER.size:data_end].cast("d")
+        self._valid = memoryview(self._map)[data_end:_file_size(self._capacity)]
+
+    def _release(self):
+        """Метод звільняє представлення (потрібно перед зміною розміру
+        відображення).
+
+        :return: None
+        """
+        self._data.release()
+        self._valid.release()
+
+    def _grow(self, capacity):
+        """Метод збільшує ємність файлу значень до capacity.
+
+        Бітова карта переноситься у кінець нового масиву значень.
+
+        :param capacity: нова ємність
+        :return: None
+        """
+        if capacity <= self._capacity:
+            return
+        old_valid = HEADER.size + 8 * self._capacity
+        new_valid = HEADER.size + 8 * capacity
+        bitmap = -(-self._capacity // 8)
+        self._release()
+        self._map.resize(_file_size(capacity))
+        self._map.move(new_valid, old_valid, bitmap)
+        self._map[old_valid:new_valid] = bytes(new_valid - old_valid)
+        self._capacity = capacity
+        HEADER.pack_into(self._map, 0, MAGIC, VERSION, self._capacity, self._length)
+        self._views()
+
+
+class MappedStorage(Storage):
+    """Пам'ять, значення якої зберігаються у файлі, відображеному у пам'ять
+    (див. `MappedValues`).
+    """
+
+    __slots__ = ("_names_file",)
+
+    def __init__(self, path=None):
+        """
+        :param path: шлях до файлу значень або None - тимчасовий файл;
+            якщо файл існує, то змінні та значення читаються з нього
+        """
+        super().__init__()
+        self._values = MappedValues(path)
+        if path is None:
+            self._names_file = tempfile.TemporaryFile("w+", encoding="utf-8")
+        else:
+            self._names_file = open(path + ".names", "a+", encoding="utf-8")
+            self._names_file.seek(0)
+            names = self._names_file.read().splitlines()
+            self._names = names[:len(self._values)]
+            self._slots = {variable: index for index, variable in enumerate(self._names)}
+            if len(self._names) != len(self._values) or len(self._names) != len(names):
+                self._values.truncate(len(self._names))
+                self._write_names()
+
+    def add(self, variable):
+        """
+        Метод додає змінну у память. Ім'я змінної записується у файл імен
+        до додавання комірки у файл значень.
+        Якщо така змінна вже існує, то встановлює помилку
+        :param variable: змінна
+        :return: None
+        """
+        if variable not in self._slots:
+            self._names_file.write(variable + "\n")
+            self._names_file.flush()
+        super().add(variable)
+
+    def remove_many(self, variables):
+        """
+        Метод видаляє кілька змінних з пам'яті (див. `Storage.remove_many`)
+        та один раз переписує файл імен.
+        Якщо якась змінна не існує, то встановлює помилку
+        :param variables: ітерований об'єкт змінних
+        :return: None
+        """
+        count = len(self._names)
+        super().remove_many(variables)
+        if len(self._names) != count:
+            self._write_names()
+
+    def clear(self):
+        """
+        Метод видаляє усі змінні з пам'яті та з файлу імен.
+        :return: None
+        """
+        super().clear()
+        self._names_file.seek(0)
+        self._names_file.truncate()
+
+    def restore(self, path, journal=None):
+        """
+        Метод замінює вміст пам'яті станом зі знімка та журналу
+        (див. `Storage.restore`) та переписує файл імен.
+        :param path: шлях до файлу знімка або None - порожня пам'ять
+        :param journal: шлях до файлу журналу або None
+        :return: кількість повторених записів журналу
+        """
+        count = super().restore(path, journal)
+        self._write_names()
+        return count
+
+    def flush(self):
+        """
+        Метод записує значення та імена змінних у файли.
+        :return: None
+        """
+        self._names_file.flush()
+        self._values.flush()
+
+    def close(self):
+        """
+        Метод записує дані та закриває файли.
+        :return: None
+        """
+        self.flush()
+        self._names_file.close()
+        self._values.close()
+
+    def _write_names(self):
+        """
+        Метод переписує файл імен іменами змінних пам'яті.
+        :return: None
+        """
+        self._names_file.seek(0)
+        self._names_file.truncate()
+        self._names_file.writelines(variable + "\n" for variable in self._names)
+        self._names_file.flush()
+
+
+def _file_size(capacity):
+    """Функція повертає розмір файлу значень заданої ємності.
+
+    :param capacity: ємність (кількість значень)
+    :return: розмір у байтах
+    """
+    return HEADER.size + 8 * capacity + -(-capacity // 8)
+
+
+if __name__ == "__main__":
+    import shutil
+    import subprocess
+    import sys
+    import tracemalloc
+
+    import interpreter
+    from closure_engine import compile_code
+    from code_generator import generate_code
+    from python_backend import compile_program
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "values.mlv")
+    try:
+        memory = MappedStorage(path)
+        memory.add("a")
+        memory.add("b")
+        memory.add("a")
+        success = memory.get_last_error() == 1
+        success = success and memory.get("a") is None and memory.get_last_error() == 3
+        success = success and memory.get("c") is None and memory.get_last_error() == 2
+        memory.set("a", 1.5)
+        success = success and memory.get("a") == 1.5 and memory.get_last_error() == 0
+        memory.set("a", None)
+        success = success and memory.get("a") is None and memory.get_last_error() == 3
+
+        count = 100000
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        values = memory._values
+        for i in range(count):
+            values.append(float(i))
+        allocated = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        success = success and allocated < count and values[count + 1] == count - 1.0
+        values.clear()
+        success = success and len(values) == 0 and values._capacity >= count
+
+        memory.clear()
+        for i in range(3000):
+            memory.add("x{}".format(i))
+            memory.set("x{}".format(i), i * 0.5)
+        memory.set("x7", None)
+        memory.close()
+
+        memory = MappedStorage(path)
+        success = success and memory.variables()[:2] == ["x0", "x1"] and len(memory.variables()) == 3000
+        success = success and memory.get("x2999") == 1499.5 and memory.get("x7") is None
+
+        for variable in ("x", "y", "z"):
+            memory.add(variable)
+        code, error = generate_code(["z = x2999 * 2 + x1", "y = z / x0"], clear_storage=False)
+        machine = interpreter.Interpreter(memory)
+        success = success and machine.execute(code) == 3 and memory.get("z") == 2999.5
+        memory.set("z", None)
+        success = success and compile_code(code)(memory) == 3 and memory.get("z") == 2999.5
+        memory.set("x0", 4.0)
+        success = success and compile_program(code)(memory) == 0 and memory.get("y") == 2999.5 / 4
+
+        memory.add("t")
+        memory.set("t", 8.0)
+        memory.remove("x1")
+        success = success and memory.slot("t") == 3002 and memory.get("t") == 8.0
+        success = success and memory.get("x2") == 1.0 and memory.get("x7") is None
+        memory.remove("t")
+        for i in range(5):
+            memory.add("t{}".format(i))
+            memory.set("t{}".format(i), float(i))
+        memory.set("t2", None)
+        memory.remove_many(["t0", "t3", "u"])
+        success = success and memory.get_last_error() == 2 and memory.variables()[-3:] == ["t1", "t2", "t4"]
+        success = success and memory.get("t4") == 4.0 and memory.get("t2") is None and memory.get("x7") is None
+        memory.remove_many(["t1", "t2", "t4"])
+
+        fork = memory.fork()
+        fork.set("y", 1.0)
+        fork.add("w")
+        success = success and memory.get("y") == 2999.5 / 4 and not memory.is_in("w")
+        success = success and fork.get("y") == 1.0 and type(fork._values) is MappedValues
+        memory.close()
+        success = success and len(open(path + ".names").read().splitlines()) == 3002
+        memory = MappedStorage(path)
+        success = success and not memory.is_in("x1") and memory.get("y") == 2999.5 / 4
+
+        snapshot = os.path.join(directory, "state.snap")
+        memory.clear()
+        memory.add("a")
+        memory.add("b")
+        memory.set("b", 2.0)
+        memory.snapshot(snapshot)
+        memory.clear()
+        memory.add("c")
+        memory.restore(snapshot)
+        memory.close()
+        memory = MappedStorage(path)
+        success = success and memory.variables() == ["a", "b"] and memory.get("b") == 2.0
+        memory.close()
+
+        # аварійне завершення процесу без закриття пам'яті
+        script = ("import os, sys\n"
+                  "from mapped_storage import MappedStorage\n"
+                  "memory = MappedStorage(sys.argv[1])\n"
+                  "for i in range(5000):\n"
+                  "    memory.add('v{}'.format(i))\n"
+                  "    memory.set('v{}'.format(i), float(i))\n"
+                  "os._exit(0)\n")
+        os.remove(path)
+        os.remove(path + ".names")
+        subprocess.run([sys.executable, "-c", script, path], check=True,
+                       cwd=os.path.dirname(os.path.abspath(__file__)))
+        memory = MappedStorage(path)
+        success = success and len(memory.variables()) == 5000 and memory.get("v4999") == 4999.0
+        memory.add("w")
+        memory.set("w", 1.0)
+        memory.close()
+        memory = MappedStorage(path)
+        success = success and memory.slot("w") == 5000 and memory.get("v10") == 10.0
+        memory.close()
+
+        with open(path + ".names", "a") as file:   # ім'я без комірки значення
+            file.write("lost\n")
+        memory = MappedStorage(path)
+        memory.add("q")
+        memory.close()
+        memory = MappedStorage(path)
+        success = success and memory.slot("q") == 5001 and not memory.is_in("lost")
+        memory.close()
+        with open(path + ".names") as file:         # комірки значень без імен
+            names = file.read().splitlines()
+        with open(path + ".names", "w") as file:
+            file.writelines(name + "\n" for name in names[:100])
+        memory = MappedStorage(path)
+        memory.add("r")
+        memory.set("r", 2.0)
+        memory.close()
+        memory = MappedStorage(path)
+        success = success and memory.slot("r") == 100 and memory.get("r") == 2.0
+        success = success and memory.get("v99") == 99.0 and len(memory.variables()) == 101
+        memory.close()
+    finally:
+        shutil.rmtree(directory)
+
+    print("Success =", success)
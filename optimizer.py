@@ -0,0 +1,654 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Модуль призначено для оптимізації коду, який згенеровано генератором коду,
+перед його виконанням інтерпретатором.
+
+Код програми - це список команд (<код_команди>, <операнд>)
+(див. `code_generator.py`). Для оптимізації код перетворюється у
+проміжне представлення:
+    nodes - список вузлів виразів, кожен вузол - кортеж
+        ("LOADC", <число>, None) - константа
+        ("LOADV", <змінна>, None) - змінна
+        (<операція>, <індекс лівого вузла>, <індекс правого вузла>) - операція
+            ADD, SUB, MUL або DIV над двома вузлами
+    statements - список присвоєнь, кожне присвоєння - кортеж
+        (<змінна>, <індекс кореня виразу>)
+
+Після перетворень представлення знову записується у вигляді списку команд
+(див. `_emit`). Усі обходи виконуються без рекурсії, тому підходять для
+виразів будь-якої глибини.
+
+Функція `optimize` згортає константні підвирази (constant folding).
+
+Функція `eliminate_common_subexpressions` обчислює підвирази, що
+повторюються у програмі, лише один раз, зберігаючи їх значення у
+прихованих змінних.
+
+Функція `eliminate_dead_stores` видаляє присвоєння, значення яких
+перезаписується до першого читання, а `slice_program` залишає лише
+присвоєння, від яких залежать задані змінні.
+
+Функція `peephole` замінює короткі послідовності команд дешевшими,
+використовуючи додаткові команди інтерпретатора DUP, SETKEEP та MULC.
+Функція `select_superinstructions` замінює часті послідовності команд
+суперкомандами інтерпретатора (див. `interpreter.py`), що виконуються
+за один виклик. Її слід застосовувати після `peephole`.
+
+Інші перетворення працюють лише з командами генератора коду, тому
+`peephole` та `select_superinstructions` слід застосовувати останніми.
+"""
+
+import math
+from operator import add, sub, mul, truediv
+
+from interpreter import COMMAND_FUNCS
+from storage import is_in, add as storage_add
+
+# арифметичні команди та відповідні їм операції
+BINARY_COMMANDS = {
+    "ADD": add,
+    "SUB": sub,
+    "MUL": mul,
+    "DIV": truediv,
+}
+
+
+# префікс імен прихованих змінних; такі імена не є ідентифікаторами,
+# тому не можуть збігтися з іменами змінних програми
+TEMP_PREFIX = "$t"
+
+# правила перетворення peephole: назва -> опис
+PEEPHOLE_RULES = {
+    "dup": "LOADV x; LOADV x -> LOADV x; DUP",
+    "setkeep": "SET x; LOADV x -> SETKEEP x",
+    "mul_one": "LOADC 1; MUL -> (нічого), LOADC 1; DIV -> (нічого)",
+    "add_zero": "LOADC 0; ADD -> (нічого), LOADC 0; SUB -> (нічого)",
+    "div_pow2": "LOADC c; DIV -> MULC 1/c, якщо c - степінь 2",
+    "mulc": "LOADC c; MUL -> MULC c",
+}
+
+# правила, що застосовуються за замовчуванням; "add_zero" не входить,
+# бо змінює знак нуля (див. peephole)
+DEFAULT_PEEPHOLE_RULES = ("dup", "setkeep", "mul_one", "div_pow2", "mulc")
+
+
+# види суперкоманд: назва -> опис
+FUSIONS = {
+    "vv": "LOADV a; LOADV b; <OP> -> <OP>VV (a, b)",
+    "vc": "LOADV a; LOADC c; <OP> -> <OP>VC (a, c)",
+    "c": "LOADC c; <OP> -> <OP>C c",
+    "set": "<OP>; SET x -> <OP>SET x",
+    "setc": "LOADC c; SET x -> SETC (c, x)",
+}
+
+# суперкоманди, що дають виграш на тестовому наборі програм
+# (benchmarks.profile_fusions, час виконання відносно коду без суперкоманд):
+#     vv 0.87, set 0.92, c 0.95, setc 0.97, vc 1.01, усі разом 0.78,
+#     DEFAULT_FUSIONS 0.76;
+# vc не дає виграшу, бо перехоплює пари, які вигідніше злити у vv та c
+DEFAULT_FUSIONS = ("vv", "set", "c", "setc")
+
+
+def optimize(code, fast_math=False):
+    """Функція згортає константні підвирази у коді програми.
+
+    Операція над двома константами замінюється однією константою,
+    результат обчислюється так само, як в інтерпретаторі, тому значення
+    програми не змінюються. Ділення на константу 0 ніколи не згортається,
+    щоб під час виконання виникла та сама помилка (код 3).
+
+    Якщо fast_math, то також переставляються константи у ланцюжках
+    додавання/віднімання та множення/ділення, наприклад
+    a + 1 + 2 -> a + 3, a * 2 / 4 -> a * 0.5. Через округлення результат
+    може трохи відрізнятись від обчисленого без перестановки.
+
+    Якщо код не має вигляду послідовності присвоєнь (наприклад, містить
+    невідомі команди), то він повертається без змін.
+
+    :param code: список команд - кортежів (<код_команди>, <операнд>)
+    :param fast_math: чи дозволено переставляти константи
+    :return:
+        новий список команд
+        кількість видалених команд
+    """
+    program = _build(code, fold=True, fast_math=fast_math)
+    if program is None:
+        return list(code), 0
+    new_code = _emit(*program)
+    return new_code, len(code) - len(new_code)
+
+
+def peephole(code, rules=None):
+    """Функція замінює у коді програми короткі послідовності команд
+    дешевшими за правилами з PEEPHOLE_RULES.
+
+    Команди переглядаються один раз зліва направо; після додавання кожної
+    команди до результату правила застосовуються до двох останніх команд
+    результату, доки щось змінюється.
+
+    Усі правила зберігають значення змінних та помилки виконання, крім
+    "add_zero": для x = -0.0 вираз x + 0 дорівнює 0.0, а не -0.0, тому
+    це правило застосовується лише на явний запит.
+
+    :param code: список команд - кортежів (<код_команди>, <операнд>)
+    :param rules: множина назв правил з PEEPHOLE_RULES
+                  (за замовчуванням - DEFAULT_PEEPHOLE_RULES)
+    :return:
+        новий список команд
+        статистика - словник з ключами
+            before - кількість команд до перетворення
+            after - кількість команд після перетворення
+            rules - словник {назва правила: кількість застосувань}
+    """
+    enabled = set(DEFAULT_PEEPHOLE_RULES if rules is None else rules)
+    counts = dict.fromkeys(enabled, 0)
+    out = []
+    for command in code:
+        out.append(command)
+        while len(out) > 1:
+            rule = _rewrite_tail(out, enabled)
+            if rule is None:
+                break
+            counts[rule] += 1
+    return out, {"before": len(code), "after": len(out), "rules": counts}
+
+
+def _rewrite_tail(out, enabled):
+    """Функція застосовує перше підходяще правило до двох останніх команд out.
+
+    :param out: список команд (змінюється)
+    :param enabled: множина назв дозволених правил
+    :return: назва застосованого правила або None
+    """
+    (first, first_operand), (second, second_operand) = out[-2], out[-1]
+    if first == "LOADV" and second == "LOADV" and first_operand == second_operand:
+        if "dup" in enabled:
+            out[-1] = ("DUP", None)
+            return "dup"
+    elif first == "SET" and second == "LOADV" and first_operand == second_operand:
+        if "setkeep" in enabled:
+            out[-2:] = [("SETKEEP", first_operand)]
+            return "setkeep"
+    elif first == "LOADC":
+        if first_operand == 1 and second in ("MUL", "DIV") and "mul_one" in enabled:
+            del out[-2:]
+            return "mul_one"
+        if first_operand == 0 and second in ("ADD", "SUB") and "add_zero" in enabled:
+            del out[-2:]
+            return "add_zero"
+        if second == "DIV" and "div_pow2" in enabled and _is_power_of_two(first_operand):
+            out[-2:] = [("MULC", 1 / first_operand)]
+            return "div_pow2"
+        if second == "MUL" and "mulc" in enabled:
+            out[-2:] = [("MULC", first_operand)]
+            return "mulc"
+    return None
+
+
+def select_superinstructions(code, fusions=DEFAULT_FUSIONS):
+    """Функція замінює послідовності команд суперкомандами з FUSIONS.
+
+    Команди переглядаються один раз зліва направо, після додавання кожної
+    команди до результату її кінець замінюється суперкомандою, якщо це
+    можливо. Операції у послідовностях - ADD, SUB, MUL або DIV.
+
+    :param code: список команд - кортежів (<код_команди>, <операнд>)
+    :param fusions: назви дозволених видів суперкоманд з FUSIONS
+    :return:
+        новий список команд
+        словник {назва виду: кількість замін}
+    """
+    enabled = set(fusions)
+    counts = dict.fromkeys(enabled, 0)
+    out = []
+    append = out.append
+    for command, operand in code:
+        if command in BINARY_COMMANDS and len(out) > 0:
+            first, first_operand = out[-2] if len(out) > 1 else (None, None)
+            second, second_operand = out[-1]
+            if first == "LOADV" and second == "LOADV" and "vv" in enabled:
+                out[-2:] = [(command + "VV", (first_operand, second_operand))]
+                counts["vv"] += 1
+                continue
+            if first == "LOADV" and second == "LOADC" and "vc" in enabled:
+                out[-2:] = [(command + "VC", (first_operand, second_operand))]
+                counts["vc"] += 1
+                continue
+            if second == "LOADC" and "c" in enabled:
+                out[-1] = (command + "C", second_operand)
+                counts["c"] += 1
+                continue
+        elif command == "SET" and len(out) > 0:
+            last, last_operand = out[-1]
+            if last in BINARY_COMMANDS and "set" in enabled:
+                out[-1] = (last + "SET", operand)
+                counts["set"] += 1
+                continue
+            if last == "LOADC" and "setc" in enabled:
+                out[-1] = ("SETC", (last_operand, operand))
+                counts["setc"] += 1
+                continue
+        append((command, operand))
+    return out, counts
+
+
+def _is_power_of_two(number):
+    """Функція перевіряє, чи є число степенем 2 (тоді ділення на нього
+    та множення на обернене дають однаковий результат).
+
+    :param number: число
+    :return: булівське значення
+    """
+    if not isinstance(number, float) or number == 0 or not math.isfinite(number):
+        return False
+    return math.frexp(abs(number))[0] == 0.5 and math.isfinite(1 / number)
+
+
+def eliminate_common_subexpressions(code):
+    """Функція усуває повторні обчислення однакових підвиразів у програмі.
+
+    Підвирази порівнюються за структурою (нумерація значень), причому
+    змінна після кожного SET вважається новим значенням, тому однаковими
+    є лише підвирази, операнди яких не змінювались між їх обчисленнями.
+
+    Підвираз, що зустрічається хоча б двічі, обчислюється на місці першої
+    появи, після чого команда SETKEEP зберігає його значення у прихованій
+    змінній (з префіксом TEMP_PREFIX), не змінюючи стек. Решта появ
+    замінюються командою LOADV цієї змінної. Порядок обчислень, введення
+    невизначених змінних та помилок виконання не змінюється.
+
+    Побічний ефект: додає приховані змінні до пам'яті (storage). Після
+    виконання програми їх слід видалити (`storage.remove`), щоб вони не
+    потрапили до змінних користувача (`storage.variables`, `input_all`,
+    знімки пам'яті).
+
+    Якщо код не має вигляду послідовності присвоєнь (наприклад, містить
+    команди, додані `peephole`), то він повертається без змін.
+
+    :param code: список команд - кортежів (<код_команди>, <операнд>)
+    :return:
+        новий список команд
+        список імен прихованих змінних
+    """
+    program = _build(code)
+    if program is None:
+        return list(code), []
+    nodes, statements = program
+
+    # номери значень вузлів: однакові номери - однакові значення
+    numbers = [0] * len(nodes)
+    table = {}
+    counts = {}
+    versions = {}
+    for target, root in statements:
+        stack = [(root, False)]
+        while stack:
+            index, visited = stack.pop()
+            command, left, right = nodes[index]
+            if command == "LOADC":
+                key = (command, repr(left))
+            elif command == "LOADV":
+                key = (command, left, versions.get(left, 0))
+            elif visited:
+                key = (command, numbers[left], numbers[right])
+            else:
+                stack.append((index, True))
+                stack.append((right, False))
+                stack.append((left, False))
+                continue
+            number = table.setdefault(key, len(table))
+            numbers[index] = number
+            if command in BINARY_COMMANDS:
+                counts[number] = counts.get(number, 0) + 1
+        versions[target] = versions.get(target, 0) + 1
+
+    temps = {}          # номер значення -> ім'я прихованої змінної
+    uses = {}           # ім'я прихованої змінної -> кількість використань
+    new_code = []
+    append = new_code.append
+    for target, root in statements:
+        stack = [(root, False)]
+        while stack:
+            index, visited = stack.pop()
+            command, left, right = nodes[index]
+            number = numbers[index]
+            if command == "LOADC" or command == "LOADV":
+                append((command, left))
+            elif visited:
+                append((command, None))
+                if counts[number] > 1:
+                    temps[number] = _new_temp_name(uses)
+                    append(("SETKEEP", temps[number]))
+            elif number in temps:
+                uses[temps[number]] += 1
+                append(("LOADV", temps[number]))
+            else:
+                stack.append((index, True))
+                stack.append((right, False))
+                stack.append((left, False))
+        append(("SET", target))
+
+    used = [name for name, count in uses.items() if count]
+    if len(used) < len(uses):
+        new_code = [command for command in new_code
+                    if command[0] != "SETKEEP" or uses[command[1]]]
+    for name in used:
+        storage_add(name)
+    return new_code, used
+
+
+def eliminate_dead_stores(code):
+    """Функція видаляє з програми присвоєння, значення яких не читається
+    до наступного присвоєння тієї ж змінної.
+
+    Останнє присвоєння кожної змінної вважається потрібним, бо її значення
+    може бути прочитане після виконання програми.
+
+    Вираз видаленого присвоєння не обчислюється, тому не виникають і його
+    побічні ефекти: введення невизначених змінних та ділення на 0.
+
+    Якщо код не має вигляду послідовності присвоєнь, то він повертається
+    без змін.
+
+    :param code: список команд - кортежів (<код_команди>, <операнд>)
+    :return:
+        новий список команд
+        кількість видалених команд
+    """
+    return slice_program(code, None)
+
+
+def slice_program(code, outputs):
+    """Функція залишає у програмі лише присвоєння, від яких залежать
+    значення змінних outputs після виконання програми (зворотний зріз).
+
+    Присвоєння переглядаються з кінця; присвоєння змінної, значення якої
+    ще потрібне, залишається, і тоді потрібними стають змінні його виразу.
+    Решта присвоєнь не виконуються, тому для їх змінних не викликається
+    введення значень (storage.input_var).
+
+    Якщо outputs - None, то потрібними вважаються всі змінні
+    (див. `eliminate_dead_stores`).
+
+    Якщо код не має вигляду послідовності присвоєнь, то він повертається
+    без змін.
+
+    :param code: список команд - кортежів (<код_команди>, <операнд>)
+    :param outputs: ітерований об'єкт імен потрібних змінних або None
+    :return:
+        новий список команд
+        кількість видалених команд
+    """
+    program = _build(code)
+    if program is None:
+        return list(code), 0
+    nodes, statements = program
+    live = {target for target, _ in statements} if outputs is None else set(outputs)
+    kept = []
+    for target, root in reversed(statements):
+        if target not in live:
+            continue
+        kept.append((target, root))
+        live.discard(target)
+        live.update(_variables(nodes, root))
+    kept.reverse()
+    new_code = _emit(nodes, kept)
+    return new_code, len(code) - len(new_code)
+
+
+def _variables(nodes, root):
+    """Функція повертає імена змінних, що читаються у виразі з коренем root.
+
+    :param nodes: список вузлів
+    :param root: індекс кореня виразу
+    :return: список імен змінних
+    """
+    names = []
+    stack = [root]
+    while stack:
+        command, left, right = nodes[stack.pop()]
+        if command == "LOADV":
+            names.append(left)
+        elif command != "LOADC":
+            stack.append(left)
+            stack.append(right)
+    return names
+
+
+def _new_temp_name(uses):
+    """Функція створює ім'я нової прихованої змінної, якого немає ні
+    серед вже створених (uses), ні у пам'яті.
+
+    :param uses: словник створених прихованих змінних (змінюється)
+    :return: ім'я прихованої змінної
+    """
+    number = len(uses)
+    while TEMP_PREFIX + str(number) in uses or is_in(TEMP_PREFIX + str(number)):
+        number += 1
+    name = TEMP_PREFIX + str(number)
+    uses[name] = 0
+    return name
+
+
+def _build(code, fold=False, fast_math=False):
+    """Функція перетворює код у проміжне представлення (nodes, statements).
+
+    Якщо fold, то константні підвирази згортаються під час побудови
+    (див. `_make_binary`).
+
+    :param code: список команд
+    :param fold: чи згортати константи
+    :param fast_math: чи дозволено переставляти константи
+    :return: (nodes, statements) або None, якщо код не є послідовністю
+             присвоєнь з команд LOADC, LOADV, ADD, SUB, MUL, DIV, SET
+    """
+    nodes = []
+    statements = []
+    stack = []
+    for command, operand in code:
+        if command in BINARY_COMMANDS:
+            if len(stack) < 2:
+                return None
+            right = stack.pop()
+            left = stack.pop()
+            if fold:
+                stack.append(_make_binary(nodes, command, left, right, fast_math))
+            else:
+                nodes.append((command, left, right))
+                stack.append(len(nodes) - 1)
+        elif command == "LOADC" or command == "LOADV":
+            nodes.append((command, operand, None))
+            stack.append(len(nodes) - 1)
+        elif command == "SET":
+            if len(stack) != 1:
+                return None
+            statements.append((operand, stack.pop()))
+        else:
+            return None
+    if stack:
+        return None
+    return nodes, statements
+
+
+def _make_binary(nodes, command, left, right, fast_math):
+    """Функція додає до nodes вузол операції command над вузлами left та right,
+    згортаючи константи, якщо це можливо.
+
+    :param nodes: список вузлів
+    :param command: ADD, SUB, MUL або DIV
+    :param left: індекс лівого вузла
+    :param right: індекс правого вузла
+    :param fast_math: чи дозволено переставляти константи
+    :return: індекс нового вузла
+    """
+    left_node = nodes[left]
+    right_node = nodes[right]
+    if right_node[0] == "LOADC":
+        value = right_node[1]
+        if left_node[0] == "LOADC" and not (command == "DIV" and value == 0):
+            nodes.append(("LOADC", BINARY_COMMANDS[command](left_node[1], value), None))
+            return len(nodes) - 1
+        if fast_math and left_node[0] in BINARY_COMMANDS and nodes[left_node[2]][0] == "LOADC":
+            folded = _reassociate(command, value, left_node[0], nodes[left_node[2]][1])
+            if folded is not None:
+                new_command, new_value = folded
+                nodes.append(("LOADC", new_value, None))
+                nodes.append((new_command, left_node[1], len(nodes) - 1))
+                return len(nodes) - 1
+    nodes.append((command, left, right))
+    return len(nodes) - 1
+
+
+def _reassociate(command, value, inner_command, inner_value):
+    """Функція об'єднує дві константи у виразі (x <inner_command> inner_value)
+    <command> value в одну: x <new_command> new_value.
+
+    :param command: зовнішня операція
+    :param value: зовнішня константа
+    :param inner_command: внутрішня операція
+    :param inner_value: внутрішня константа
+    :return: (new_command, new_value) або None, якщо об'єднати не можна
+    """
+    additive = ("ADD", "SUB")
+    if command in additive and inner_command in additive:
+        total = (inner_value if inner_command == "ADD" else -inner_value) \
+            + (value if command == "ADD" else -value)
+        return ("ADD", total) if total >= 0 else ("SUB", -total)
+    if command in additive or inner_command in additive:
+        return None
+    if (command == "DIV" and value == 0) or (inner_command == "DIV" and inner_value == 0):
+        return None
+    if inner_command == "MUL" and command == "MUL":
+        result = ("MUL", inner_value * value)
+    elif inner_command == "MUL":
+        result = ("MUL", inner_value / value)
+    elif command == "MUL":
+        result = ("MUL", value / inner_value)
+    else:
+        result = ("DIV", inner_value * value)
+    if not math.isfinite(result[1]) or (result[0] == "DIV" and result[1] == 0):
+        return None
+    return result
+
+
+def _emit(nodes, statements):
+    """Функція записує проміжне представлення у вигляді списку команд.
+
+    Вузли виразу обходяться у зворотному польському порядку за допомогою
+    явного стеку.
+
+    :param nodes: список вузлів
+    :param statements: список присвоєнь (<змінна>, <індекс кореня>)
+    :return: список команд
+    """
+    code = []
+    append = code.append
+    for target, root in statements:
+        stack = [(root, False)]
+        while stack:
+            index, visited = stack.pop()
+            command, left, right = nodes[index]
+            if command == "LOADC" or command == "LOADV":
+                append((command, left))
+            elif visited:
+                append((command, None))
+            else:
+                stack.append((index, True))
+                stack.append((right, False))
+                stack.append((left, False))
+        append(("SET", target))
+    return code
+
+
+if __name__ == "__main__":
+    from code_generator import generate_code
+
+    code, error = generate_code(['x = 1 + 2 + 3 + 4 + ((((3))))'])
+    new_code, removed = optimize(code)
+    success = new_code == [('LOADC', 13.0), ('SET', 'x')] and removed == 8
+
+    code, error = generate_code(['y = a + 1 + 2', 'z = (2 - 2) / (1 - 1) + b / (3 - 3)'])
+    new_code, removed = optimize(code)
+    success = success and new_code == [
+        ('LOADV', 'a'), ('LOADC', 1.0), ('ADD', None), ('LOADC', 2.0), ('ADD', None),
+        ('SET', 'y'),
+        ('LOADC', 0.0), ('LOADC', 0.0), ('DIV', None),
+        ('LOADV', 'b'), ('LOADC', 0.0), ('DIV', None), ('ADD', None),
+        ('SET', 'z')] and removed == 6
+
+    new_code, removed = optimize(code, fast_math=True)
+    success = success and new_code[:4] == [('LOADV', 'a'), ('LOADC', 3.0), ('ADD', None), ('SET', 'y')]
+
+    code, error = generate_code(['w = a * 2 / 4 - 1 - 2 + 0.5'])
+    new_code, removed = optimize(code, fast_math=True)
+    success = success and new_code == [('LOADV', 'a'), ('LOADC', 0.5), ('MUL', None),
+                                       ('LOADC', 2.5), ('SUB', None), ('SET', 'w')]
+
+    code = [('LOADC', 1.0), ('XXX', None), ('SET', 'x')]
+    success = success and optimize(code) == (code, 0)
+
+    code, error = generate_code(['t = a * a + b / 4', 'x = t * 1 + 0', 'y = t * 3 / 3'])
+    new_code, stats = peephole(code)
+    success = success and new_code == [
+        ('LOADV', 'a'), ('DUP', None), ('MUL', None), ('LOADV', 'b'), ('MULC', 0.25), ('ADD', None),
+        ('SETKEEP', 't'), ('LOADC', 0.0), ('ADD', None), ('SET', 'x'),
+        ('LOADV', 't'), ('MULC', 3.0), ('LOADC', 3.0), ('DIV', None), ('SET', 'y')]
+    success = success and stats["before"] == 20 and stats["after"] == 15
+    success = success and all(command in COMMAND_FUNCS for command, _ in new_code)
+    new_code, stats = peephole(code, rules=PEEPHOLE_RULES)
+    success = success and stats["after"] == 13 and stats["rules"]["add_zero"] == 1
+    new_code, stats = peephole([('LOADV', 'a'), ('LOADC', 0.0), ('ADD', None), ('SET', 'x')])
+    success = success and len(new_code) == 4     # -0.0 + 0 = 0.0
+    new_code, stats = peephole(code, rules={"mulc"})
+    success = success and stats["rules"] == {"mulc": 2} and stats["after"] == 18
+
+    import storage
+    code, error = generate_code(['x = b + c * (d - e)',
+                                 'y = 2 * (b + c * (d - e)) + (d - e)',
+                                 'b = 1',
+                                 'z = (b + c * (d - e)) / (b + c * (d - e))'])
+    new_code, temps = eliminate_common_subexpressions(code)
+    success = success and temps == ['$t0', '$t1', '$t2', '$t3'] and all(storage.is_in(t) for t in temps)
+    success = success and new_code == [
+        ('LOADV', 'b'), ('LOADV', 'c'), ('LOADV', 'd'), ('LOADV', 'e'), ('SUB', None),
+        ('SETKEEP', '$t0'), ('MUL', None), ('SETKEEP', '$t1'), ('ADD', None),
+        ('SETKEEP', '$t2'), ('SET', 'x'),
+        ('LOADC', 2.0), ('LOADV', '$t2'), ('MUL', None), ('LOADV', '$t0'), ('ADD', None), ('SET', 'y'),
+        ('LOADC', 1.0), ('SET', 'b'),
+        ('LOADV', 'b'), ('LOADV', '$t1'), ('ADD', None), ('SETKEEP', '$t3'),
+        ('LOADV', '$t3'), ('DIV', None), ('SET', 'z')]
+
+    code, error = generate_code(['t = a / 0', 'x = b + 1', 't = 2', 'y = x * 2',
+                                 'x = x + t', 'u = c', 'x = 5'])
+    new_code, removed = eliminate_dead_stores(code)
+    success = success and removed == 8 and new_code == [
+        ('LOADV', 'b'), ('LOADC', 1.0), ('ADD', None), ('SET', 'x'),
+        ('LOADC', 2.0), ('SET', 't'),
+        ('LOADV', 'x'), ('LOADC', 2.0), ('MUL', None), ('SET', 'y'),
+        ('LOADV', 'c'), ('SET', 'u'),
+        ('LOADC', 5.0), ('SET', 'x')]
+    new_code, removed = slice_program(code, ['y'])
+    success = success and new_code == [
+        ('LOADV', 'b'), ('LOADC', 1.0), ('ADD', None), ('SET', 'x'),
+        ('LOADV', 'x'), ('LOADC', 2.0), ('MUL', None), ('SET', 'y')]
+    success = success and slice_program(code, []) == ([], len(code))
+
+    code, error = generate_code(['x = a * b + c * 2 - 3', 'y = 1', 'z = (x - y) / (x + 4)'])
+    new_code, counts = select_superinstructions(code, tuple(FUSIONS))
+    success = success and new_code == [
+        ('MULVV', ('a', 'b')), ('MULVC', ('c', 2.0)), ('ADD', None), ('SUBC', 3.0), ('SET', 'x'),
+        ('SETC', (1.0, 'y')),
+        ('SUBVV', ('x', 'y')), ('ADDVC', ('x', 4.0)), ('DIVSET', 'z')]
+    success = success and all(command in COMMAND_FUNCS for command, _ in new_code)
+    success = success and counts == {"vv": 2, "vc": 2, "c": 1, "set": 1, "setc": 1}
+    success = success and select_superinstructions(code, ())[0] == code
+
+    depth = 100000
+    code, error = generate_code(["x = " + "(" * depth + "a + 1" + ")" * depth + " * (2 + 2)"])
+    success = success and optimize(code)[0] == [('LOADV', 'a'), ('LOADC', 1.0), ('ADD', None),
+                                                 ('LOADC', 4.0), ('MUL', None), ('SET', 'x')]
+    code, error = generate_code(["x = " + " + ".join(["1"] * depth)])
+    success = success and optimize(code)[0] == [('LOADC', float(depth)), ('SET', 'x')]
+
+    print("Success =", success)
@@ -0,0 +1,428 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Модуль призначено для компіляції коду програми у функцію Python.
+
+Функція `generate_source` перекладає список команд у текст функції
+Python, у якій значення змінних зберігаються у локальних змінних, а
+арифметика записана виразами Python, наприклад, для `y = (a + 2) * a`:
+
+    def _program(values, slots):
+        s0 = slots['a']
+        v0 = values[s0]
+        if v0 is None:
+            v0 = _input(values, s0, 'a')
+        v1 = (v0 + 2.0) * v0
+        s1 = slots['y']
+        values[s1] = v1
+
+Функція `compile_program` компілює цей текст вбудованою функцією
+`compile` та повертає функцію програми. Тому арифметику виконує байткод
+CPython над локальними змінними, без стеку інтерпретатора. Скомпільовані
+функції зберігаються у кеші LRU за SHA-256 коду програми.
+
+Номер комірки змінної (див. `storage.py`) та її значення читаються з
+пам'яті лише при першому зверненні до змінної у програмі, далі
+використовується локальна змінна; при присвоєнні значення записується і
+у локальну змінну, і у комірку пам'яті. Команди з номерами комірок
+(LOADS, SETS та інші, див. `code_generator.NAMED_COMMANDS`) перекладаються
+як команди з іменами змінних, тому для коду з ними ключ кешу містить також
+імена змінних пам'яті за замовчуванням.
+Функції програми можна передати пам'ять (`storage.Storage`), наприклад,
+створену методом `Storage.fork`, тому одну функцію програми можуть
+одночасно виконувати кілька сеансів з власною пам'яттю.
+Вирази, глибина яких перевищує MAX_DEPTH, та вирази, що залишаються у
+стеку перед командою з побічним ефектом, обчислюються у тимчасові
+локальні змінні, тому порядок введення значень та помилки такі ж, як в
+інтерпретаторі.
+
+Функція програми повертає ті ж коди помилок, що й `interpreter.execute`
+(див. `interpreter.ERRORS`).
+"""
+
+import hashlib
+import math
+from collections import OrderedDict
+
+from closure_engine import _expand
+from code_generator import NAMED_COMMANDS
+from storage import read_value, _default, _names
+
+# арифметичні команди: оператор Python та його пріоритет
+OPERATORS = {
+    "ADD": ("+", 1),
+    "SUB": ("-", 1),
+    "MUL": ("*", 2),
+    "DIV": ("/", 2),
+}
+
+# пріоритет атомарного запису (числа або імені)
+_ATOM = 3
+
+# максимальна глибина вкладеності операцій у виразі Python
+MAX_DEPTH = 100
+
+_program_cache = OrderedDict()
+_program_cache_size = 128   # максимальна кількість функцій програм у кеші
+_program_cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def compile_program(code):
+    """Функція повертає функцію програми для коду code.
+
+    Функція програми має необов'язковий параметр storage - пам'ять
+    (`storage.Storage`, за замовчуванням - пам'ять за замовчуванням модуля
+    storage), виконує код над цією пам'яттю та повертає код останньої
+    помилки або 0, якщо помилки немає.
+    Якщо код вже компілювався, то функція береться з кешу.
+
+    :param code: код програми - список кортежів (<команда>, <операнд>),
+        зокрема з командами оптимізатора та суперкомандами
+    :return: функція програми
+    """
+    text = repr(code)
+    if any(command in NAMED_COMMANDS for command, _ in code):
+        text += repr(_names)
+    key = hashlib.sha256(text.encode("utf-8")).digest()
+    program = _program_cache.get(key)
+    if program is not None:
+        _program_cache.move_to_end(key)
+        _program_cache_stats["hits"] += 1
+        return program
+
+    _program_cache_stats["misses"] += 1
+    source, namespace, last_error = generate_source(code)
+    exec(compile(source, "<matlang>", "exec"), namespace)
+    program = _make_program(namespace["_program"], last_error)
+    if _program_cache_size > 0:
+        _program_cache[key] = program
+        if len(_program_cache) > _program_cache_size:
+            _program_cache.popitem(last=False)
+            _program_cache_stats["evictions"] += 1
+    return program
+
+
+def cache_info():
+    """Функція повертає статистику кешу функцій програм.
+
+    :return: словник з ключами
+        hits - кількість влучань
+        misses - кількість промахів
+        evictions - кількість витіснених функцій
+        size - поточна кількість функцій у кеші
+        maxsize - максимальна кількість функцій у кеші
+    """
+    info = dict(_program_cache_stats)
+    info["size"] = len(_program_cache)
+    info["maxsize"] = _program_cache_size
+    return info
+
+
+def cache_clear():
+    """Функція очищує кеш функцій програм та його статистику.
+
+    :return: None
+    """
+    _program_cache.clear()
+    for key in _program_cache_stats:
+        _program_cache_stats[key] = 0
+
+
+def generate_source(code):
+    """Функція перекладає код програми у текст функції Python
+    `_program(values, slots)`, де values - список значень пам'яті,
+    а slots - таблиця символів.
+
+    Команди після першої недопустимої команди не перекладаються.
+
+    :param code: код програми
+    :return:
+        текст функції
+        словник глобальних імен для її виконання
+        код помилки після виконання функції (1, якщо є недопустима команда)
+    """
+    translator = _Translator()
+    last_error = 0
+    for command, operand in _expand(code):
+        if not translator.feed(command, operand):
+            last_error = 1
+            break
+    return translator.source(), translator.namespace, last_error
+
+
+class _Translator:
+    """Перекладач команд у рядки функції Python.
+
+    Стек інтерпретатора моделюється стеком записів
+    (<текст виразу>, <пріоритет>, <глибина>, <змінна або None>),
+    де змінна вказується для запису, що є локальною змінною змінної програми.
+    """
+
+    def __init__(self):
+        self.lines = []
+        self.stack = []
+        self.locals = {}        # змінна програми -> номер локальних змінних
+        self.loaded = set()     # змінні, значення яких вже є у локальних змінних
+        self.temps = 0
+        self.namespace = {"_input": _input}
+
+    def feed(self, command, operand):
+        """Метод перекладає одну просту команду.
+
+        :param command: код команди
+        :param operand: операнд
+        :return: False, якщо команда недопустима, інакше True
+        """
+        stack = self.stack
+        if command == "LOADC":
+            stack.append((self._constant(operand), _ATOM, 0, None))
+        elif command == "LOADV":
+            stack.append(self._load(operand))
+        elif command in OPERATORS:
+            symbol, priority = OPERATORS[command]
+            right = stack.pop()
+            left = stack.pop()
+            if max(left[2], right[2]) >= MAX_DEPTH:
+                left, right = self._spill(left), self._spill(right)
+            left_text = left[0] if left[1] >= priority else "(" + left[0] + ")"
+            right_text = right[0] if right[1] > priority else "(" + right[0] + ")"
+            stack.append(("{} {} {}".format(left_text, symbol, right_text),
+                          priority, max(left[2], right[2]) + 1, None))
+        elif command == "SET" or command == "SETKEEP":
+            value = stack.pop()
+            self._flush(operand)
+            self._store(operand, value[0])
+            if command == "SETKEEP":
+                stack.append(("v{}".format(self.locals[operand]), _ATOM, 0, operand))
+        elif command == "DUP":
+            if stack[-1][1] != _ATOM:
+                stack[-1] = self._spill(stack[-1])
+            stack.append(stack[-1])
+        else:
+            return False
+        return True
+
+    def source(self):
+        """Метод повертає текст функції програми.
+
+        Вирази, що залишилися у стеку, обчислюються, щоб виникли ті ж
+        помилки, що й в інтерпретаторі.
+
+        :return: текст функції
+        """
+        self._flush()
+        body = self.lines or ["pass"]
+        return "def _program(values, slots):\n    " + "\n    ".join(body) + "\n"
+
+    def _constant(self, number):
+        """Метод повертає текст константи.
+
+        Нескінченні значення та NaN передаються через глобальні імена.
+
+        :param number: число
+        :return: текст
+        """
+        if isinstance(number, float) and not math.isfinite(number):
+            name = "c{}".format(len(self.namespace))
+            self.namespace[name] = number
+            return name
+        text = repr(number)
+        return "(" + text + ")" if text.startswith("-") else text
+
+    def _load(self, variable):
+        """Метод повертає запис стеку для значення змінної.
+
+        При першому завантаженні змінної додає рядки, що читають її значення
+        з пам'яті (або вводять його, якщо змінна невизначена).
+
+        :param variable: ім'я змінної
+        :return: запис стеку
+        """
+        number = self.locals.setdefault(variable, len(self.locals))
+        name = "v{}".format(number)
+        if variable not in self.loaded:
+            self._flush()
+            self.lines += ["s{} = slots[{!r}]".format(number, variable),
+                           "{} = values[s{}]".format(name, number),
+                           "if {} is None:".format(name),
+                           "    {} = _input(values, s{}, {!r})".format(name, number, variable)]
+            self.loaded.add(variable)
+        return name, _ATOM, 0, variable
+
+    def _store(self, variable, text):
+        """Метод додає рядки, що присвоюють значення змінній.
+
+        :param variable: ім'я змінної
+        :param text: текст виразу
+        :return: None
+        """
+        number = self.locals.setdefault(variable, len(self.locals))
+        self.lines.append("v{} = {}".format(number, text))
+        if variable not in self.loaded:
+            self.lines.append("s{} = slots[{!r}]".format(number, variable))
+            self.loaded.add(variable)
+        self.lines.append("values[s{0}] = v{0}".format(number))
+
+    def _spill(self, entry):
+        """Метод обчислює вираз запису у тимчасову локальну змінну.
+
+        :param entry: запис стеку
+        :return: запис стеку тимчасової змінної
+        """
+        if entry[1] == _ATOM and entry[3] is None:
+            return entry
+        name = "t{}".format(self.temps)
+        self.temps += 1
+        self.lines.append("{} = {}".format(name, entry[0]))
+        return name, _ATOM, 0, None
+
+    def _flush(self, variable=None):
+        """Метод обчислює у тимчасові змінні всі вирази стеку, а також
+        записи змінної variable, значення якої буде змінено.
+
+        :param variable: ім'я змінної або None
+        :return: None
+        """
+        stack = self.stack
+        for i, entry in enumerate(stack):
+            if entry[1] != _ATOM or (variable is not None and entry[3] == variable):
+                stack[i] = self._spill(entry)
+
+
+def _input(values, index, variable):
+    """Функція вводить значення невизначеної змінної з клавіатури.
+
+    :param values: список значень пам'яті
+    :param index: номер комірки змінної
+    :param variable: ім'я змінної
+    :return: значення змінної (None, якщо введено не число)
+    """
+    value = read_value(variable)
+    if value is not None:
+        values[index] = value
+    return value
+
+
+def _make_program(function, last_error):
+    """Функція створює функцію програми зі скомпільованої функції.
+
+    :param function: функція `_program(values, slots)`
+    :param last_error: код помилки після виконання функції
+    :return: функція програми
+    """
+    def program(storage=_default):
+        try:
+            function(storage.writable(), storage._slots)
+        except KeyError:
+            return 2
+        except ZeroDivisionError:
+            return 3
+        return last_error
+    return program
+
+
+if __name__ == "__main__":
+    import random
+
+    import interpreter
+    import storage
+    from code_generator import generate_code
+    from optimizer import optimize, peephole, eliminate_common_subexpressions, \
+        select_superinstructions, FUSIONS
+
+    def run(engine, code, values):
+        for variable in storage.variables():
+            storage.set(variable, values.get(variable, 1.0))
+        if engine == "python":
+            error = compile_program(code)()
+        else:
+            interpreter._stack.clear()
+            error = interpreter.execute(code)
+        return error, dict(zip(storage.variables(), storage._values))
+
+    code, error = generate_code(["y = (a + 2) * a"])
+    success = generate_source(code)[0] == (
+        "def _program(values, slots):\n"
+        "    s0 = slots['a']\n"
+        "    v0 = values[s0]\n"
+        "    if v0 is None:\n"
+        "        v0 = _input(values, s0, 'a')\n"
+        "    v1 = (v0 + 2.0) * v0\n"
+        "    s1 = slots['y']\n"
+        "    values[s1] = v1\n")
+
+    rnd = random.Random(0)
+    names = ["a", "b", "c", "d"]
+    for _ in range(300):
+        lines = []
+        for _ in range(rnd.randint(1, 5)):
+            expression = rnd.choice(names)
+            for _ in range(rnd.randint(0, 5)):
+                operand = rnd.choice(names + ["0", "2", "(a - b)", "(c * (d + 1))"])
+                expression = "{} {} {}".format(expression, rnd.choice("+-*/"), operand)
+            lines.append("{} = {}".format(rnd.choice(names), expression))
+        code, error = generate_code(lines)
+        values = {name: float(rnd.randint(0, 2)) for name in names}
+        expected = run("interpreter", code, values)
+        variants = [code, optimize(code)[0], peephole(code)[0],
+                    select_superinstructions(peephole(code)[0], tuple(FUSIONS))[0]]
+        success = success and all(run("python", variant, values) == expected for variant in variants)
+        new_code, temps = eliminate_common_subexpressions(code)
+        expected_cse = run("interpreter", new_code, values)
+        success = success and run("python", new_code, values) == expected_cse
+
+    storage.clear()
+    storage.add("x")
+    code = [("LOADC", 1.0), ("SET", "x"), ("LOADV", "y"), ("SET", "x")]
+    success = success and compile_program(code)() == 2 and storage.get("x") == 1.0
+    code = [("LOADC", 2.0), ("SET", "x"), ("XXX", None), ("LOADC", 3.0), ("SET", "x")]
+    success = success and compile_program(code)() == 1 and storage.get("x") == 2.0
+    code = [("LOADC", 1.0), ("LOADC", 0.0), ("DIV", None), ("LOADV", "y"), ("ADD", None)]
+    success = success and compile_program(code)() == 3
+    code = [("LOADC", 1e308), ("LOADC", 1e308), ("MUL", None), ("LOADC", -2.0), ("MUL", None),
+            ("SET", "x")]
+    success = success and compile_program(optimize(code)[0])() == 0 and storage.get("x") == -math.inf
+
+    storage.clear()
+    storage.add("b")
+    storage.add("a")
+    storage.set("a", 7.0)
+    success = success and compile_program([("LOADS", 1), ("SETS", 0)])() == 0 and storage.get("b") == 7.0
+    success = success and compile_program([("LOADS", 2), ("SETS", 0)])() == 2
+
+    cache_clear()
+    code, error = generate_code(["x = a * 2", "y = x + a"])
+    program = compile_program(code)
+    success = success and compile_program(list(code)) is program
+    success = success and cache_info()["hits"] == 1 and cache_info()["misses"] == 1
+
+    depth = 100000
+    code, error = generate_code(["x = " + "a - (" * depth + "1" + ")" * depth,
+                                 "y = " + " + ".join(["a"] * depth)])
+    storage.set("a", 1.0)
+    success = success and compile_program(code)() == 0
+    success = success and storage.get("x") == 1.0 and storage.get("y") == float(depth)
+
+    import threading
+
+    base = storage.Storage()
+    for variable in ("a", "b", "y"):
+        base.add(variable)
+    base.set("b", 2.0)
+    code, error = generate_code(["y = a * b"], clear_storage=False)
+    program = compile_program(code)
+    results = {}
+
+    def session(number):
+        own = base.fork()
+        own.set("a", float(number))
+        results[number] = program(own), own.get("y")
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    success = success and results == {i: (0, 2.0 * i) for i in range(8)} and base.get("y") is None
+
+    print("Success =", success)
@@ -0,0 +1,408 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Модуль призначено для реактивного (як в електронних таблицях) виконання
+програми: після зміни значення вхідної змінної повторно виконуються лише
+присвоєння, які від неї залежать.
+
+Функція `load` ділить код програми на присвоєння та будує граф
+залежностей (див. `scheduler.build_graph`), виконує програму та
+запам'ятовує значення, які отримало кожне присвоєння, і значення вхідних
+змінних - змінних, які програма читає до їх присвоєння.
+
+Функції `set` та `update` змінюють значення вхідних змінних і повторно
+виконують залежні присвоєння у порядку рядків програми. Якщо повторне
+виконання присвоєння не змінило його значень, то присвоєння, що залежать
+від нього, не виконуються. Тому час оновлення залежить від кількості
+змінених значень, а не від довжини програми. Присвоєння, які не були
+виконані через помилку, виконуються під час наступного оновлення.
+
+Функція `assign` виконує присвоєння, введене користувачем, як новий
+рядок програми, а `affected` повертає змінні, значення яких залежать від
+заданих змінних.
+"""
+
+import heapq
+
+import storage
+from closure_engine import compile_code
+from code_generator import generate_code
+from scheduler import build_graph
+
+_statements = []    # присвоєння програми (див. `scheduler.build_graph`)
+_programs = []      # функції програм присвоєнь (`closure_engine.compile_code`)
+_writers = []       # для кожного присвоєння: {змінна: присвоєння, значення якого читається}
+_readers = {}       # (присвоєння або None, змінна) -> присвоєння, що читають це значення
+_results = []       # для кожного присвоєння: {змінна: присвоєне значення}
+_inputs = {}        # значення вхідних змінних
+_last_writer = {}   # змінна -> останнє присвоєння змінної
+_pending = {}       # присвоєння, не виконані через помилку (див. `_recompute`)
+
+
+def load(code):
+    """Функція завантажує програму та виконує її.
+
+    Побічний ефект: змінює значення змінних у пам'яті.
+
+    :param code: код програми - список кортежів (<команда>, <операнд>)
+    :return: код помилки (див. `interpreter.ERRORS`) або 0, якщо помилки немає
+    """
+    reset()
+    statements, dependencies, invalid = build_graph(code)
+    for statement in statements:
+        _add_statement(statement)
+    error = _recompute(range(len(_statements)))[0]
+    return error or (1 if invalid else 0)
+
+
+def reset():
+    """Функція вимикає реактивне виконання (видаляє завантажену програму).
+
+    :return: None
+    """
+    for state in (_statements, _programs, _writers, _results, _readers, _inputs, _last_writer, _pending):
+        state.clear()
+
+
+def is_loaded():
+    """Функція перевіряє, чи завантажено програму.
+
+    :return: True, якщо програму завантажено
+    """
+    return bool(_statements)
+
+
+def set(variable, value):
+    """Функція встановлює значення вхідної змінної та повторно виконує
+    залежні присвоєння.
+
+    Якщо програма присвоює змінній значення, то після виконання у пам'яті
+    залишається значення, присвоєне програмою.
+
+    :param variable: ім'я змінної
+    :param value: нове значення
+    :return:
+        код помилки (див. `interpreter.ERRORS`) або 0, якщо помилки немає
+        список змінних, значення яких змінилися
+    """
+    storage.set(variable, value)
+    if storage.get_last_error() != 0:
+        return 2, []
+    return update([variable])
+
+
+def update(variables):
+    """Функція бере значення змінних variables з пам'яті як нові значення
+    вхідних змінних та повторно виконує залежні присвоєння.
+
+    Використовується після зміни значень функцією `storage.set`.
+
+    :param variables: імена змінних
+    :return:
+        код помилки (див. `interpreter.ERRORS`) або 0, якщо помилки немає
+        список змінних, значення яких змінилися
+    """
+    dirty = []
+    changed = {}
+    for variable in variables:
+        value = _value(variable)
+        if variable not in _inputs or _inputs[variable] != value:
+            _inputs[variable] = value
+            changed[variable] = True
+            dirty.extend(_readers.get((None, variable), ()))
+    error, recomputed = _recompute(dirty)
+    for variable in changed:
+        _restore(variable)
+    for variable in recomputed:
+        changed[variable] = True
+    return error, list(changed)
+
+
+def assign(line):
+    """Функція виконує присвоєння, введене користувачем.
+
+    Якщо змінна з лівої частини - вхідна змінна програми, якій програма не
+    присвоює значення, то обчислене значення стає новим значенням вхідної
+    змінної (див. `set`). Якщо програма присвоює змінній значення, то
+    останній рядок, що їй присвоює, замінюється новим (як формула комірки
+    електронної таблиці). Інакше присвоєння додається до програми як новий
+    рядок. Надалі присвоєння виконується повторно при зміні значень, від
+    яких воно залежить.
+
+    :param line: рядок присвоєння
+    :return:
+        текст помилки генерації коду
+        код помилки виконання (див. `interpreter.ERRORS`) або 0
+        список змінних, значення яких змінилися
+    """
+    code, error = generate_code([line], clear_storage=False)
+    if error:
+        return error, 0, []
+    statements, dependencies, invalid = build_graph(code)
+    if invalid or not statements:
+        return "", 1 if invalid else 0, []
+    statement = statements[0]
+    target = statement["defs"][-1]
+    if target not in _last_writer and (None, target) in _readers:
+        error = compile_code(statement["code"])()
+        if error:
+            return "", error, []
+        return ("",) + update([target])
+    old = _value(target)
+    i = _last_writer.get(target)
+    if i is not None and _statements[i]["defs"] == statement["defs"]:
+        _replace_statement(i, statement)
+    else:
+        i = len(_statements)
+        _add_statement(statement)
+    error, recomputed = _recompute([i])
+    if old == _value(target) and target in recomputed:
+        recomputed.remove(target)
+    return "", error, recomputed
+
+
+def affected(variables):
+    """Функція повертає змінні, значення яких залежать від значень
+    вхідних змінних variables, тобто стають недійсними при їх зміні
+    (без виконання програми).
+
+    :param variables: імена змінних
+    :return: список змінних у порядку рядків програми
+    """
+    pending = []
+    for variable in variables:
+        pending.extend(_readers.get((None, variable), ()))
+    seen = dict.fromkeys(pending)
+    while pending:
+        i = pending.pop()
+        for variable in _statements[i]["defs"]:
+            for reader in _readers.get((i, variable), ()):
+                if reader not in seen:
+                    seen[reader] = None
+                    pending.append(reader)
+    result = {}
+    for i in sorted(seen):
+        for variable in _statements[i]["defs"]:
+            result[variable] = True
+    return list(result)
+
+
+def _add_statement(statement):
+    """Функція додає присвоєння у кінець програми.
+
+    :param statement: присвоєння (див. `scheduler.build_graph`)
+    :return: None
+    """
+    i = len(_statements)
+    _statements.append(statement)
+    _programs.append(compile_code(statement["code"]))
+    writers = {}
+    for variable in statement["uses"]:
+        writer = _last_writer.get(variable)
+        writers[variable] = writer
+        _readers.setdefault((writer, variable), []).append(i)
+        if writer is None and variable not in _inputs:
+            _inputs[variable] = _value(variable)
+    _writers.append(writers)
+    _results.append({})
+    for variable in statement["defs"]:
+        _last_writer[variable] = i
+
+
+def _replace_statement(i, statement):
+    """Функція замінює присвоєння i новим присвоєнням з тими ж змінними
+    у лівій частині.
+
+    :param i: номер присвоєння
+    :param statement: присвоєння (див. `scheduler.build_graph`)
+    :return: None
+    """
+    for variable, writer in _writers[i].items():
+        _readers[writer, variable].remove(i)
+    _statements[i] = statement
+    _programs[i] = compile_code(statement["code"])
+    writers = {}
+    for variable in statement["uses"]:
+        writer = next((j for j in range(i - 1, -1, -1) if variable in _statements[j]["defs"]), None)
+        writers[variable] = writer
+        _readers.setdefault((writer, variable), []).append(i)
+        if writer is None and variable not in _inputs:
+            _inputs[variable] = _value(variable)
+    _writers[i] = writers
+
+
+def _recompute(dirty):
+    """Функція виконує присвоєння dirty та залежні від них присвоєння,
+    значення яких змінилися, у порядку рядків програми.
+
+    Перед виконанням присвоєння у пам'ять записуються значення, які
+    читає присвоєння; після виконання у пам'яті залишаються останні
+    значення змінних. Якщо виникла помилка, то виконання зупиняється, а
+    присвоєння з помилкою та ще не виконані присвоєння запам'ятовуються у
+    _pending і виконуються при наступному виклику разом з dirty.
+
+    :param dirty: номери присвоєнь
+    :return:
+        код помилки (див. `interpreter.ERRORS`) або 0, якщо помилки немає
+        список змінних, значення яких змінилися
+    """
+    heap = list(dict.fromkeys([*_pending, *dirty]))
+    _pending.clear()
+    heapq.heapify(heap)
+    queued = dict.fromkeys(heap)
+    changed = {}
+    touched = {}
+    error = 0
+    while heap:
+        i = heapq.heappop(heap)
+        for variable, writer in _writers[i].items():
+            if writer is None:
+                if _inputs.get(variable) is None:
+                    _inputs[variable] = _input(variable)
+                _store(variable, _inputs[variable])
+            else:
+                _store(variable, _results[writer].get(variable))
+            touched[variable] = True
+        error = _programs[i]()
+        if error:
+            _pending.update(dict.fromkeys([i, *heap]))
+            break
+        old = _results[i]
+        new = _results[i] = {variable: _value(variable) for variable in _statements[i]["defs"]}
+        for variable, value in new.items():
+            touched[variable] = True
+            if variable in old and old[variable] == value:
+                continue
+            changed[variable] = True
+            for reader in _readers.get((i, variable), ()):
+                if reader not in queued:
+                    queued[reader] = None
+                    heapq.heappush(heap, reader)
+    for variable in touched:
+        _restore(variable)
+    return error, list(changed)
+
+
+def _restore(variable):
+    """Функція записує у пам'ять останнє значення змінної: значення,
+    присвоєне останнім присвоєнням змінної, або значення вхідної змінної.
+
+    :param variable: ім'я змінної
+    :return: None
+    """
+    writer = _last_writer.get(variable)
+    if writer is not None and variable in _results[writer]:
+        _store(variable, _results[writer][variable])
+    elif variable in _inputs:
+        _store(variable, _inputs[variable])
+
+
+def _value(variable):
+    """Функція повертає значення змінної з пам'яті (None, якщо змінна
+    не існує або невизначена).
+
+    :param variable: ім'я змінної
+    :return: значення змінної або None
+    """
+    index = storage._slots.get(variable)
+    return None if index is None else storage._values[index]
+
+
+def _store(variable, value):
+    """Функція записує значення змінної у пам'ять, якщо змінна існує.
+
+    :param variable: ім'я змінної
+    :param value: значення
+    :return: None
+    """
+    index = storage._slots.get(variable)
+    if index is not None:
+        storage._values[index] = value
+
+
+def _input(variable):
+    """Функція вводить значення невизначеної вхідної змінної з клавіатури.
+
+    :param variable: ім'я змінної
+    :return: значення змінної або None
+    """
+    if storage.is_in(variable):
+        storage.input_var(variable)
+    return _value(variable)
+
+
+if __name__ == "__main__":
+    import interpreter
+
+    lines = ["y = a * 2", "z = b + 1", "w = y + z", "a2 = a", "v = w * 0 + 1", "u = v + a2"]
+    code, error = generate_code(lines)
+    storage.set("a", 1.0)
+    storage.set("b", 2.0)
+    success = load(code) == 0 and storage.get("w") == 5.0 and storage.get("u") == 2.0
+    success = success and affected(["a"]) == ["y", "w", "a2", "v", "u"] and affected(["b"]) == ["z", "w", "v", "u"]
+
+    counter = {"runs": 0}
+    programs = list(_programs)
+    for i, program in enumerate(programs):
+        def counted(program=program):
+            counter["runs"] += 1
+            return program()
+        _programs[i] = counted
+    error, changed = set("b", 3.0)
+    # v не змінилося, тому u не обчислюється повторно
+    success = success and error == 0 and changed == ["b", "z", "w"] and counter["runs"] == 3
+    success = success and storage.get("w") == 6.0 and storage.get("u") == 2.0
+    storage.set("a", 4.0)
+    error, changed = update(["a"])
+    success = success and changed == ["a", "y", "w", "a2", "u"] and storage.get("u") == 5.0
+
+    error, _, changed = assign("t = w / 2")
+    success = success and not error and changed == ["t"] and storage.get("t") == 6.0
+    error, changed = set("b", 0.0)
+    success = success and changed == ["b", "z", "w", "t"] and storage.get("t") == 4.5
+    error, _, changed = assign("y = a * 3")
+    success = success and changed == ["y", "w", "t"] and storage.get("t") == 6.5
+    success = success and len(_statements) == 7 and affected(["b"]) == ["z", "w", "v", "u", "t"]
+    error, _, changed = assign("y = a * 2")
+    error, code, changed = assign("y = a * 2")     # значення не змінюється
+    success = success and not error and code == 0 and changed == []
+    error, _, changed = assign("a = b + 1")
+    success = success and changed == ["a", "y", "w", "a2", "u", "t"] and storage.get("u") == 2.0
+
+    # повторні присвоєння змінної
+    code, error = generate_code(["x = a + 1", "a = x * 10", "y = a + x"])
+    storage.set("a", 1.0)
+    success = success and load(code) == 0 and storage.get("a") == 20.0 and storage.get("y") == 22.0
+    error, changed = set("a", 2.0)
+    success = success and changed == ["a", "x", "y"] and storage.get("a") == 30.0 and storage.get("y") == 33.0
+    code, error = generate_code(["x = a + 1", "a = x * 10", "y = a + x"])
+    storage.set("a", 2.0)
+    interpreter.execute(code)
+    success = success and [storage.get(v) for v in ("x", "a", "y")] == [3.0, 30.0, 33.0]
+
+    code, error = generate_code(["x = 1 / a", "y = x + 1"])
+    storage.set("a", 1.0)
+    success = success and load(code) == 0
+    error, changed = set("a", 0.0)
+    success = success and error == 3 and storage.get("y") == 2.0
+
+    # присвоєння, не виконані через помилку, виконуються при наступному оновленні
+    code, error = generate_code(["x = a + 1", "z = 1 / b", "w = x + 0"])
+    storage.set("a", 1.0)
+    storage.set("b", 1.0)
+    success = success and load(code) == 0 and storage.get("w") == 2.0
+    storage.set("a", 5.0)
+    storage.set("b", 0.0)
+    error, changed = update(["a", "b"])
+    success = success and error == 3 and storage.get("x") == 6.0 and storage.get("w") == 2.0
+    error, changed = set("b", 2.0)
+    success = success and error == 0 and changed == ["b", "z", "w"]
+    success = success and storage.get("z") == 0.5 and storage.get("w") == 6.0 and not _pending
+
+    error, code, changed = assign("t = 1 / 0")
+    success = success and not error and code == 3 and changed == []
+
+    reset()
+    success = success and not is_loaded()
+
+    print("Success =", success)
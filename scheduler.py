@@ -0,0 +1,354 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Модуль призначено для паралельного виконання незалежних рядків програми.
+
+Код кожного рядка програми закінчується командою SET, тому програма - це
+граф залежностей (DAG) між присвоєннями. Функція `build_graph` ділить код
+на присвоєння (послідовності команд, після яких стек порожній) та будує
+залежності між ними за іменами змінних:
+    - присвоєння, що читає змінну, залежить від останнього попереднього
+      присвоєння цієї змінної (read after write);
+    - присвоєння змінної залежить від попереднього присвоєння тієї ж змінної
+      (write after write) та від усіх присвоєнь, що читали її попереднє
+      значення (write after read).
+
+Функція `graph_metrics` обчислює довжину критичного шляху та доступний
+паралелізм, а `run_parallel` виконує присвоєння рівнями: присвоєння
+одного рівня незалежні, тому виконуються одночасно у пулі потоків або
+процесів (див. `MODES`), а час виконання залежить від довжини критичного
+шляху, а не від кількості рядків.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import storage
+from closure_engine import compile_code, _expand
+from storage import input_var
+
+# способи паралельного виконання
+MODES = ("thread", "process")
+
+_worker = None      # скомпільовані присвоєння у процесі пулу (див. `_init_worker`)
+
+
+def build_graph(code):
+    """Функція ділить код програми на присвоєння та будує граф залежностей.
+
+    Команди оптимізатора та суперкоманди замінюються простими командами.
+    Код після першої недопустимої команди не розглядається.
+
+    :param code: код програми - список кортежів (<команда>, <операнд>)
+    :return:
+        список присвоєнь - словників з ключами
+            code - список команд присвоєння
+            uses - імена змінних, які присвоєння читає
+            defs - імена змінних, яким присвоєння присвоює значення
+        список множин номерів присвоєнь, від яких залежить кожне присвоєння
+        True, якщо код містить недопустиму команду, інакше False
+    """
+    statements = []
+    current = {"code": [], "uses": [], "defs": []}
+    depth = 0
+    invalid = False
+    for command, operand in _expand(code):
+        if command == "LOADC" or command == "LOADV":
+            depth += 1
+        elif command in ("ADD", "SUB", "MUL", "DIV", "SET"):
+            depth -= 1
+        elif command == "DUP":
+            depth += 1
+        elif command != "SETKEEP":
+            invalid = True
+            break
+        current["code"].append((command, operand))
+        if command == "LOADV" and operand not in current["defs"] and operand not in current["uses"]:
+            current["uses"].append(operand)
+        elif (command == "SET" or command == "SETKEEP") and operand not in current["defs"]:
+            current["defs"].append(operand)
+        if depth == 0 and command == "SET":
+            statements.append(current)
+            current = {"code": [], "uses": [], "defs": []}
+    if current["code"]:
+        statements.append(current)
+
+    dependencies = []
+    writer = {}         # змінна -> останнє присвоєння змінної
+    readers = {}        # змінна -> присвоєння, що читали її після writer
+    for i, statement in enumerate(statements):
+        needs = set()
+        for variable in statement["uses"]:
+            if variable in writer:
+                needs.add(writer[variable])
+            readers.setdefault(variable, []).append(i)
+        for variable in statement["defs"]:
+            if variable in writer:
+                needs.add(writer[variable])
+            needs.update(reader for reader in readers.get(variable, ()) if reader != i)
+            writer[variable] = i
+            readers[variable] = []
+        dependencies.append(needs)
+    return statements, dependencies, invalid
+
+
+def graph_metrics(statements, dependencies):
+    """Функція обчислює характеристики графу залежностей.
+
+    :param statements: список присвоєнь (див. `build_graph`)
+    :param dependencies: список множин залежностей
+    :return: словник з ключами
+        lines - кількість присвоєнь
+        levels - кількість рівнів, тобто довжина критичного шляху у присвоєннях
+        work - загальна кількість команд
+        span - кількість команд на критичному шляху
+        parallelism - доступний паралелізм work / span
+    """
+    levels = _levels(dependencies)
+    finish = []
+    for statement, needs in zip(statements, dependencies):
+        start = max((finish[j] for j in needs), default=0)
+        finish.append(start + len(statement["code"]))
+    work = sum(len(statement["code"]) for statement in statements)
+    span = max(finish, default=0)
+    return {
+        "lines": len(statements),
+        "levels": len(levels),
+        "work": work,
+        "span": span,
+        "parallelism": work / span if span else 0.0,
+    }
+
+
+def run_parallel(code, workers=None, mode="thread"):
+    """Функція виконує код програми, виконуючи незалежні присвоєння одночасно.
+
+    Значення невизначених змінних, які програма читає до присвоєння,
+    вводяться з клавіатури до початку виконання у порядку першого читання.
+    Присвоєння виконуються рівнями; якщо на рівні виникла помилка, то
+    наступні рівні не виконуються, а повертається помилка присвоєння
+    з найменшим номером (при цьому незалежні від нього присвоєння того ж
+    рівня вже виконані).
+
+    :param code: код програми - список кортежів (<команда>, <операнд>)
+    :param workers: кількість потоків або процесів
+        (за замовчуванням - кількість ядер процесора)
+    :param mode: спосіб виконання з MODES
+    :return: код помилки (див. `interpreter.ERRORS`) або 0, якщо помилки немає
+    """
+    statements, dependencies, invalid = build_graph(code)
+    _input_undefined(statements, dependencies)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    levels = _levels(dependencies)
+
+    if mode == "thread":
+        programs = [compile_code(statement["code"]) for statement in statements]
+        executor = ThreadPoolExecutor(workers)
+        run = _run_threads
+        context = programs
+    else:
+        variables = storage.variables()
+        initargs = ([(statement["code"], statement["defs"]) for statement in statements], variables)
+        executor = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=initargs)
+        run = _run_processes
+        context = statements
+    with executor:
+        for level in levels:
+            chunk_size = -(-len(level) // workers)
+            chunks = [level[i:i + chunk_size] for i in range(0, len(level), chunk_size)]
+            errors = run(executor, context, chunks)
+            if errors:
+                return errors[min(errors)]
+    return 1 if invalid else 0
+
+
+def _levels(dependencies):
+    """Функція розбиває присвоєння на рівні: рівень присвоєння на 1 більший
+    за найбільший рівень присвоєнь, від яких воно залежить.
+
+    :param dependencies: список множин залежностей
+    :return: список рівнів - списків номерів присвоєнь
+    """
+    levels = []
+    level_of = []
+    for needs in dependencies:
+        level = max((level_of[j] + 1 for j in needs), default=0)
+        level_of.append(level)
+        if level == len(levels):
+            levels.append([])
+        levels[level].append(len(level_of) - 1)
+    return levels
+
+
+def _input_undefined(statements, dependencies):
+    """Функція вводить значення невизначених змінних, які присвоєння читають
+    до їх присвоєння, у порядку першого читання.
+
+    :param statements: список присвоєнь
+    :param dependencies: список множин залежностей
+    :return: None
+    """
+    defined = set()
+    for statement in statements:
+        for variable in statement["uses"]:
+            if variable not in defined and storage.is_in(variable) and storage.get(variable) is None:
+                input_var(variable)
+            defined.add(variable)
+        defined.update(statement["defs"])
+
+
+def _run_threads(executor, programs, chunks):
+    """Функція виконує частини рівня у пулі потоків над спільною пам'яттю.
+
+    :param executor: пул потоків
+    :param programs: функції програм присвоєнь
+    :param chunks: списки номерів присвоєнь
+    :return: словник {номер присвоєння: код помилки} для присвоєнь з помилкою
+    """
+    if len(chunks) == 1:
+        results = [_run_programs(programs, chunks[0])]
+    else:
+        results = executor.map(_run_programs, [programs] * len(chunks), chunks)
+    errors = {}
+    for result in results:
+        errors.update(result)
+    return errors
+
+
+def _run_programs(programs, indices):
+    """Функція виконує присвоєння з номерами indices.
+
+    :param programs: функції програм присвоєнь
+    :param indices: номери присвоєнь
+    :return: словник {номер присвоєння: код помилки} для присвоєнь з помилкою
+    """
+    errors = {}
+    for i in indices:
+        error = programs[i]()
+        if error:
+            errors[i] = error
+    return errors
+
+
+def _run_processes(executor, statements, chunks):
+    """Функція виконує частини рівня у пулі процесів.
+
+    Процесам передаються значення змінних, які читають присвоєння частини,
+    а значення присвоєних змінних записуються у пам'ять.
+
+    :param executor: пул процесів
+    :param statements: список присвоєнь
+    :param chunks: списки номерів присвоєнь
+    :return: словник {номер присвоєння: код помилки} для присвоєнь з помилкою
+    """
+    tasks = []
+    for chunk in chunks:
+        values = {}
+        for i in chunk:
+            for variable in statements[i]["uses"]:
+                if storage.is_in(variable):
+                    values[variable] = storage._values[storage.slot(variable)]
+        tasks.append((chunk, values))
+    errors = {}
+    for results in executor.map(_run_task, tasks):
+        for i, error, values in results:
+            for variable, value in values.items():
+                storage.set(variable, value)
+            if error:
+                errors[i] = error
+    return errors
+
+
+def _init_worker(statements, variables):
+    """Функція готує процес пулу: додає змінні до пам'яті
+    та компілює присвоєння.
+
+    :param statements: список пар (<код присвоєння>, <змінні, яким присвоюється значення>)
+    :param variables: змінні пам'яті
+    :return: None
+    """
+    global _worker
+    storage.clear()
+    for variable in variables:
+        storage.add(variable)
+    _worker = [(compile_code(code), defs) for code, defs in statements]
+
+
+def _run_task(task):
+    """Функція виконує присвоєння частини у процесі пулу.
+
+    :param task: (<номери присвоєнь>, <словник значень змінних>)
+    :return: список трійок (<номер присвоєння>, <код помилки>,
+        <словник значень присвоєних змінних або порожній словник, якщо
+        виникла помилка>)
+    """
+    indices, values = task
+    for variable, value in values.items():
+        storage.set(variable, value)
+    results = []
+    for i in indices:
+        program, defs = _worker[i]
+        error = program()
+        assigned = {}
+        if not error:
+            for variable in defs:
+                assigned[variable] = storage.get(variable)
+        results.append((i, error, assigned))
+    return results
+
+
+if __name__ == "__main__":
+    import interpreter
+    from code_generator import generate_code
+    from optimizer import peephole, eliminate_common_subexpressions
+
+    lines = ["a = 1", "b = 2", "c = a + b", "d = a * 3", "a = 5", "e = c + d + a"]
+    code, error = generate_code(lines)
+    statements, dependencies, invalid = build_graph(code)
+    success = not invalid and [statement["defs"] for statement in statements] == [
+        ["a"], ["b"], ["c"], ["d"], ["a"], ["e"]]
+    success = success and dependencies == [set(), set(), {0, 1}, {0}, {0, 2, 3}, {2, 3, 4}]
+    metrics = graph_metrics(statements, dependencies)
+    success = success and metrics["lines"] == 6 and metrics["levels"] == 4
+    success = success and metrics["work"] == 20 and metrics["span"] == 2 + 4 + 2 + 6
+
+    def sequential(code):
+        error = interpreter.execute(code)
+        return error, {variable: storage.get(variable) for variable in storage.variables()}
+
+    def parallel(code, mode):
+        error = run_parallel(code, workers=3, mode=mode)
+        return error, {variable: storage.get(variable) for variable in storage.variables()}
+
+    wide = ["x{} = {} * a + b / {}".format(i, i, i + 1) for i in range(50)]
+    programs = [lines, ["a = 1", "b = 0"] + wide + ["s = " + " + ".join("x{}".format(i) for i in range(50))]]
+    for program_lines in programs:
+        code, error = generate_code(program_lines)
+        expected = sequential(code)
+        for mode in MODES:
+            generate_code(program_lines)
+            success = success and parallel(code, mode) == expected
+
+    # незалежні від помилки присвоєння того ж рівня виконуються
+    for mode in MODES:
+        code, error = generate_code(["a = 1", "b = a / 0", "c = 2", "d = c * 2", "e = b + d"])
+        error, values = parallel(code, mode)
+        success = success and error == 3 and values == {"a": 1.0, "b": None, "c": 2.0, "d": 4.0, "e": None}
+
+    code, error = generate_code(["t = a * a + 1", "x = t * 1 + 0", "y = t * 3 / 3"])
+    code, _ = peephole(eliminate_common_subexpressions(code)[0])
+    storage.set("a", 2.0)
+    expected = sequential(code)
+    storage.set("a", 2.0)
+    success = success and parallel(code, "thread") == expected
+
+    metrics = graph_metrics(*build_graph(generate_code(programs[1])[0])[:2])
+    success = success and metrics["lines"] == 53 and metrics["levels"] == 3
+    success = success and metrics["parallelism"] > 4
+
+    code = [("LOADC", 1.0), ("SET", "a"), ("XXX", None), ("LOADC", 2.0), ("SET", "a")]
+    generate_code(["a = 1"])
+    success = success and run_parallel(code) == 1 and storage.get("a") == 1.0
+
+    print("Success =", success)
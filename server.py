@@ -0,0 +1,338 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Модуль призначено для роботи інтерпретатора у режимі сервера: багато
+користувачів одночасно підключаються до одного процесу через сокет TCP
+або Unix та працюють з інтерпретатором так само, як у консолі
+(див. `main.py`), командами `help()`, `clear()`, `exec(filename)`,
+`print(variable)`, `exit()` та присвоєннями.
+
+Кожне підключення - це окремий сеанс (`Session`) з власною пам'яттю
+(`storage.Storage`) та інтерпретатором (`interpreter.Interpreter`).
+Сервер працює у циклі подій asyncio: сеанс не блокує інших користувачів,
+поки очікує рядок від клієнта. Значення невизначених змінних, які
+програма читає, запитуються у клієнта перед виконанням (замість
+`storage.input_var`, що чекає на введення з клавіатури).
+
+Генерація коду виконується у циклі подій (генератор коду використовує
+пам'ять за замовчуванням як таблицю змінних рядка), а програми з файлів
+виконуються у пулі потоків, бо кожен сеанс має власний інтерпретатор.
+
+Кількість одночасних сеансів обмежена max_sessions: понад цю кількість
+клієнт отримує повідомлення про зайнятість сервера, і підключення
+закривається. Після кожної відповіді сервер чекає, доки клієнт прочитає
+дані (`StreamWriter.drain`), тому повільний клієнт не накопичує відповіді
+у пам'яті сервера; довжина рядка від клієнта обмежена MAX_LINE.
+
+Запуск:
+    python main.py --serve 127.0.0.1:8765
+    python main.py --serve /tmp/matlang.sock
+"""
+
+import asyncio
+import os
+
+import main
+import storage
+from bytecode_cache import compile_file
+from closure_engine import _expand
+from code_generator import generate_code
+from interpreter import Interpreter, ERRORS
+from optimizer import optimize, peephole, eliminate_common_subexpressions, select_superinstructions
+
+# максимальна кількість одночасних сеансів за замовчуванням
+MAX_SESSIONS = 256
+# максимальна довжина рядка від клієнта у байтах
+MAX_LINE = 1 << 16
+# запрошення до введення команди
+PROMPT = "\n--> "
+
+
+class Session:
+    """Сеанс одного клієнта: власна пам'ять, інтерпретатор та потоки
+    читання/запису підключення.
+    """
+
+    def __init__(self, reader, writer, base=None):
+        """
+        :param reader: asyncio.StreamReader підключення
+        :param writer: asyncio.StreamWriter підключення
+        :param base: пам'ять, копія якої (`Storage.fork`) стає пам'яттю
+            сеансу, або None - порожня пам'ять
+        """
+        self.reader = reader
+        self.writer = writer
+        self.storage = storage.Storage() if base is None else base.fork()
+        self.interpreter = Interpreter(self.storage)
+
+    async def write(self, *lines, end="\n"):
+        """Метод надсилає рядки клієнту та чекає, доки вони будуть прочитані.
+
+        :param lines: рядки
+        :param end: закінчення останнього рядка
+        :return: None
+        """
+        self.writer.write(("\n".join(lines) + end).encode("utf-8"))
+        await self.writer.drain()
+
+    async def readline(self, prompt):
+        """Метод надсилає запрошення та читає рядок від клієнта.
+
+        :param prompt: запрошення
+        :return: рядок без пробілів на кінцях або None, якщо клієнт
+            відключився
+        """
+        await self.write(prompt, end="")
+        try:
+            line = await self.reader.readline()
+        except (ValueError, asyncio.LimitOverrunError):     # задовгий рядок
+            return ""
+        if not line:
+            return None
+        return line.decode("utf-8", "replace").strip()
+
+    async def run(self):
+        """Метод виконує команди клієнта, доки він не відключиться
+        або не введе `exit()`.
+
+        :return: None
+        """
+        await self.write(main.__doc__.splitlines()[0],
+                         "\nВведіть `help()` для показу документації.", end="")
+        while True:
+            line = await self.readline(PROMPT)
+            if line is None or line == "exit()":
+                break
+            await self.command(line)
+
+    async def command(self, line):
+        """Метод виконує одну команду (рядок) клієнта.
+
+        :param line: рядок
+        :return: None
+        """
+        if line == "help()":
+            await self.write("\n", main.__doc__)
+        elif line == "clear()":
+            self.storage.clear()
+        elif line.startswith("exec(") and line.endswith(")"):
+            await self.exec_program(line[len("exec("):-1])
+        elif line.startswith("print(") and line.endswith(")"):
+            value = self.storage.get(line[len("print("):-1])
+            if self.storage.get_last_error() == 2:
+                await self.write("Помилка під час виконання програми: змінна не існує.")
+            else:
+                await self.write(str(value))
+        else:
+            await self.exec_line(line)
+
+    async def exec_line(self, line):
+        """Метод виконує присвоєння над пам'яттю сеансу.
+
+        :param line: рядок програми
+        :return: None
+        """
+        code, error = generate_code([line])
+        if error:
+            await self.write("Помилка під час генерації коду: {}".format(error))
+            return
+        code, _ = optimize(code)
+        code, _ = peephole(code)
+        code, _ = select_superinstructions(code)
+        await self.execute(code, storage.variables())
+
+    async def exec_program(self, filename):
+        """Метод виконує програму з файлу filename у пам'яті сеансу
+        (пам'ять сеансу спочатку очищується, як у `main.exec_program`).
+
+        :param filename: ім'я файлу '.mlg'
+        :return: None
+        """
+        if not filename.endswith(".mlg"):
+            await self.write("Помилка під час генерації коду: неправильне розширення у файлу.")
+            return
+        try:
+            with open(filename, "r") as file:
+                lines = [line.strip() for line in file.readlines()]
+        except OSError as error:
+            await self.write("Помилка відкриття файлу: {}".format(error))
+            return
+        await self.write(*("... " + line for line in lines))
+        code, error = compile_file(filename, lines)
+        if error:
+            await self.write("Помилка під час генерації коду: {}".format(error))
+            return
+        code, _ = optimize(code)
+        code, temps = eliminate_common_subexpressions(code)
+        code, _ = peephole(code)
+        code, _ = select_superinstructions(code)
+        self.storage.clear()
+        await self.execute(code, storage.variables(), in_thread=True)
+        self.storage.remove_many(temps)
+
+    async def execute(self, code, variables, in_thread=False):
+        """Метод додає змінні до пам'яті сеансу, запитує у клієнта значення
+        невизначених вхідних змінних та виконує код.
+
+        :param code: код програми (зі змінними, заданими іменами)
+        :param variables: імена змінних програми
+        :param in_thread: виконувати код у пулі потоків
+        :return: None
+        """
+        for variable in variables:
+            if not self.storage.is_in(variable):
+                self.storage.add(variable)
+        for variable in input_variables(code, self.storage):
+            text = await self.readline("Введіть значення {}: ".format(variable))
+            try:
+                self.storage.set(variable, float(text))
+            except (TypeError, ValueError):
+                await self.write("Помилка виконання програми: {}".format(storage.ERRORS[3]))
+                return
+        self.interpreter._stack.clear()
+        if in_thread:
+            loop = asyncio.get_running_loop()
+            last_error = await loop.run_in_executor(None, self.interpreter.execute, code)
+        else:
+            last_error = self.interpreter.execute(code)
+        if last_error:
+            await self.write("Помилка виконання програми: {}".format(ERRORS[last_error]))
+
+
+def input_variables(code, memory):
+    """Функція повертає невизначені змінні пам'яті, які програма читає до
+    першого присвоєння, у порядку першого читання.
+
+    :param code: код програми
+    :param memory: пам'ять (storage.Storage)
+    :return: список імен змінних
+    """
+    assigned, inputs = set(), {}
+    for command, operand in _expand(code):
+        if command == "LOADV":
+            if operand not in assigned and memory.is_in(operand) and memory.get(operand) is None:
+                inputs[operand] = True
+        elif command == "SET" or command == "SETKEEP":
+            assigned.add(operand)
+    return list(inputs)
+
+
+async def start_server(address, max_sessions=MAX_SESSIONS, base=None):
+    """Функція запускає сервер.
+
+    :param address: (<хост>, <порт>) для TCP або шлях до сокета Unix
+    :param max_sessions: максимальна кількість одночасних сеансів
+    :param base: пам'ять, копію якої отримує кожен сеанс, або None
+    :return: asyncio.Server
+    """
+    sessions = set()
+
+    async def handle(reader, writer):
+        if len(sessions) >= max_sessions:
+            writer.write("Сервер зайнятий, спробуйте пізніше.\n".encode("utf-8"))
+            await writer.drain()
+            writer.close()
+            return
+        session = Session(reader, writer, base)
+        sessions.add(session)
+        try:
+            await session.run()
+        except ConnectionError:
+            pass
+        finally:
+            sessions.discard(session)
+            writer.close()
+
+    if isinstance(address, str):
+        return await asyncio.start_unix_server(handle, address, limit=MAX_LINE)
+    return await asyncio.start_server(handle, address[0], address[1], limit=MAX_LINE)
+
+
+def parse_address(text):
+    """Функція перетворює текст адреси у адресу для `start_server`.
+
+    :param text: '<хост>:<порт>' або шлях до сокета Unix
+    :return: (<хост>, <порт>) або шлях
+    """
+    host, _, port = text.rpartition(":")
+    if host and port.isdigit():
+        return host.strip("[]"), int(port)
+    return text
+
+
+def serve(address, max_sessions=MAX_SESSIONS):
+    """Функція запускає сервер та обслуговує клієнтів до переривання.
+
+    :param address: адреса (див. `parse_address`)
+    :param max_sessions: максимальна кількість одночасних сеансів
+    :return: None
+    """
+    async def run():
+        server = await start_server(parse_address(address), max_sessions)
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    async def dialog(address, lines):
+        if isinstance(address, str):
+            reader, writer = await asyncio.open_unix_connection(address)
+        else:
+            reader, writer = await asyncio.open_connection(*address)
+        for line in lines:
+            writer.write((line + "\n").encode("utf-8"))
+        writer.write(b"exit()\n")
+        await writer.drain()
+        text = (await reader.read()).decode("utf-8")
+        writer.close()
+        return text
+
+    async def check(directory):
+        path = os.path.join(directory, "matlang.sock")
+        server = await start_server(path, max_sessions=100)
+        first = ["x = 2", "y = x * a", "3", "print(y)"]
+        second = ["y = 5", "print(y)", "print(x)", "z = 1 / (y - 5)", "clear()", "print(y)"]
+        results = await asyncio.gather(*(dialog(path, first if i % 2 == 0 else second)
+                                         for i in range(100)))
+        success = all(text.rstrip().endswith("-->") for text in results)
+        success = success and all("Введіть значення a: " in text and "--> 6.0\n" in text
+                                  for text in results[0::2])
+        success = success and all("--> 5.0\n" in text and text.count("змінна не існує") == 2
+                                  and ERRORS[3] in text for text in results[1::2])
+
+        program = os.path.join(directory, "program.mlg")
+        with open(program, "w") as file:
+            file.write("b = a * 2\nc = b + 1\n")
+        text = await dialog(path, ["exec({})".format(program), "1.5", "print(c)"])
+        success = success and "... c = b + 1" in text and "--> 4.0\n" in text
+
+        blocked = [await asyncio.open_unix_connection(path) for _ in range(100)]
+        reader, writer = await asyncio.open_unix_connection(path)
+        success = success and (await reader.read()).decode("utf-8").startswith("Сервер зайнятий")
+        writer.close()
+        for reader, writer in blocked:
+            writer.close()
+        server.close()
+        await server.wait_closed()
+
+        server = await start_server(("127.0.0.1", 0))
+        port = server.sockets[0].getsockname()[1]
+        text = await dialog(parse_address("127.0.0.1:{}".format(port)), ["x = (", "x = 1", "print(x)"])
+        success = success and "Помилка під час генерації коду" in text and "--> 1.0\n" in text
+        server.close()
+        await server.wait_closed()
+        return success
+
+    with tempfile.TemporaryDirectory() as directory:
+        success = asyncio.run(check(directory))
+    success = success and parse_address("/tmp/x.sock") == "/tmp/x.sock"
+    success = success and parse_address("[::1]:80") == ("::1", 80)
+
+    print("Success =", success)
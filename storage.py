@@ -5,10 +5,47 @@
 
 Змінні можуть мати числові значення цілого або дійсного типу
 
+Кожній змінній при додаванні призначається комірка (slot) - індекс у
+списку значень _values. Таблиця символів _slots співставляє імена змінних
+з їх комірками, тому функції модуля працюють з іменами змінних, а код,
+у якому змінні замінено номерами комірок (див.
+`code_generator.resolve_slots`), звертається до значення однією
+операцією індексування.
+
+Функція clear очищує таблицю символів та список значень на місці, тому
+посилання на _slots та _values залишаються дійсними.
+
+Пам'ять - це об'єкт класу `Storage`; функції модуля працюють з пам'яттю
+за замовчуванням `_default`, а _slots, _names та _values - це її таблиця
+символів, імена та значення. Окремі об'єкти Storage дозволяють виконувати
+в одному процесі багато незалежних сеансів, зокрема у різних потоках.
+
+Метод `Storage.fork` створює копію пам'яті без копіювання даних: копія
+та оригінал спільно використовують таблицю символів і список значень,
+доки один з них не змінить пам'ять (copy-on-write). Тоді пам'ять, яку
+створено методом fork, отримує власні копії, а оригінал свої дані не
+замінює, тому посилання на _slots та _values пам'яті за замовчуванням
+дійсні (крім відкриття та закриття журналу, див. нижче).
+
+Стан пам'яті можна зберегти у знімок (`snapshot`) та відновити з нього
+(`restore`), а також вести журнал змін (`open_journal`): відновлення
+після перезапуску - це читання останнього знімка та повторення записів
+журналу після нього (див. `journal.py`). Поки журнал відкритий, список
+значень замінено списком `journal.JournalValues`, що записує у журнал
+кожне присвоєння, зокрема присвоєння рушіїв виконання; функції модуля
+open_journal та close_journal оновлюють посилання _values.
+
+Об'єкт Storage не блокується при кожній операції: його має
+використовувати один потік (сеанс) одночасно. Блокування потрібне лише
+для fork та копіювання спільних даних, бо ці операції змінюють кілька
+об'єктів пам'яті.
 """
 
-_storage = {}  # пам'ять
-_last_error = 0  # код помилки останньої операції
+import os
+import threading
+import weakref
+
+import journal as _journal_module
 
 # словник, що співствляє коди помилок до їх описи
 ERRORS = {0: "",
@@ -17,6 +54,397 @@ ERRORS = {0: "",
           3: "Змінна невизначена"}
 
 
+class Storage:
+    """Пам'ять, що складається зі змінних.
+
+    Атрибути:
+        _slots - таблиця символів: ім'я змінної -> номер комірки
+        _names - імена змінних за номерами комірок
+        _values - значення змінних за номерами комірок
+        _last_error - код помилки останньої операції
+        _origin - пам'ять, дані якої спільно використовуються, або None
+        _forks - пам'яті, створені методом fork, що використовують дані
+            цієї пам'яті
+        _shared - чи є дані спільними з іншою пам'яттю
+        _lock - блокування для fork та копіювання спільних даних
+        _journal - відкритий журнал змін (journal.Journal) або None
+    """
+
+    __slots__ = ("_slots", "_names", "_values", "_last_error",
+                 "_origin", "_forks", "_shared", "_lock", "_journal", "__weakref__")
+
+    def __init__(self):
+        self._slots = {}
+        self._names = []
+        self._values = []
+        self._last_error = 0
+        self._origin = None
+        self._forks = weakref.WeakSet()
+        self._shared = False
+        self._lock = threading.Lock()
+        self._journal = None
+
+    def add(self, variable):
+        """
+        Метод додає змінну у память.
+        Якщо така змінна вже існує, то встановлює помилку
+        :param variable: змінна
+        :return: None
+        """
+        if variable in self._slots:
+            self._last_error = 1
+            return
+        self.writable()
+        self._slots[variable] = len(self._values)
+        self._names.append(variable)
+        self._values.append(None)
+        self._last_error = 0
+        if self._journal is not None:
+            self._journal.add(variable)
+            self._journal_written()
+
+    def is_in(self, variable) -> bool:
+        """
+        Метод перевіряє, чи є змінна у пам'яті.
+        :param variable: змінна
+        :return: булівське значенна (True, якщо є)
+        """
+        return variable in self._slots
+
+    def get(self, variable):
+        """
+        Метод повертає значення змінної.
+        Якщо така змінна не існує або невизначена (==None),
+        то встановлює відповідну помилку
+        :param variable: змінна
+        :return: значення змінної або None, якщо змінна не існує або невизначена
+        """
+        index = self._slots.get(variable)
+        if index is None:
+            self._last_error = 2
+            return
+        value = self._values[index]
+        if value is None:
+            self._last_error = 3
+            return
+        self._last_error = 0
+        return value
+
+    def set(self, variable, value):
+        """
+        Метод встановлює значення змінної
+        Якщо змінна не існує, встановлює помилку
+        :param variable: змінна
+        :param value: нове значення
+        :return: None
+        """
+        index = self._slots.get(variable)
+        if index is None:
+            self._last_error = 2
+            return
+        if self._shared:
+            self.writable()
+        self._values[index] = value
+        self._last_error = 0
+
+    def input_var(self, variable):
+        """
+        Метод здійснює введення з клавіатури та встановлення значення змінної
+        Якщо змінна не існує або введено не число, встановлює помилку
+        :param variable: змінна
+        :return: None
+        """
+        if variable not in self._slots:
+            self._last_error = 2
+            return
+        value = read_value(variable)
+        if value is None:
+            self._last_error = 3
+            return
+        self.set(variable, value)
+
+    def input_all(self):
+        """
+        Метод здійснює введення з клавіатури та встановлення значення
+        усіх змінних з пам'яті
+        :return: None
+        """
+        for variable in list(self._names):
+            self.input_var(variable)
+
+    def clear(self):
+        """
+        Метод видаляє усі змінні з пам'яті.
+        :return: None
+        """
+        self.writable()
+        self._slots.clear()
+        self._names.clear()
+        self._values.clear()
+        if self._journal is not None:
+            self._journal.clear()
+            self._journal_written()
+
+    def remove(self, variable):
+        """
+        Метод видаляє змінну з пам'яті. Номери комірок наступних змінних
+        зменшуються на 1, тому код з номерами комірок, створений до
+        видалення, стає неправильним (як і після clear).
+        Якщо така змінна не існує, то встановлює помилку
+        :param variable: змінна
+        :return: None
+        """
+        self.remove_many((variable,))
+
+    def remove_many(self, variables):
+        """
+        Метод видаляє кілька змінних з пам'яті (див. `remove`). Номери
+        комірок решти змінних перераховуються один раз, тому видалення
+        k змінних коштує O(n), а не O(k * n) викликів remove.
+        Якщо якась змінна не існує, то встановлює помилку (решта змінних
+        видаляються)
+        :param variables: ітерований об'єкт змінних
+        :return: None
+        """
+        removed = {}
+        self._last_error = 0
+        for variable in variables:
+            index = self._slots.get(variable)
+            if index is None:
+                self._last_error = 2
+            else:
+                removed[index] = variable
+        if not removed:
+            return
+        self.writable()
+        indices = sorted(removed, reverse=True)
+        for index in indices:
+            del self._slots[removed[index]]
+            del self._names[index]
+            del self._values[index]
+        for i in range(indices[-1], len(self._names)):
+            self._slots[self._names[i]] = i
+        if self._journal is not None:
+            for index in indices:
+                self._journal.remove(removed[index])
+            self._journal_written()
+
+    def slot(self, variable):
+        """
+        Метод повертає номер комірки змінної.
+        Якщо така змінна не існує, то встановлює помилку
+        :param variable: змінна
+        :return: номер комірки або None, якщо змінна не існує
+        """
+        index = self._slots.get(variable)
+        self._last_error = 2 if index is None else 0
+        return index
+
+    def name(self, index):
+        """
+        Метод повертає ім'я змінної за номером комірки.
+        Якщо такої комірки немає, то встановлює помилку
+        :param index: номер комірки
+        :return: ім'я змінної або None, якщо комірки немає
+        """
+        if not 0 <= index < len(self._names):
+            self._last_error = 2
+            return
+        self._last_error = 0
+        return self._names[index]
+
+    def variables(self):
+        """
+        Метод повертає список імен змінних у порядку їх додавання
+        (тобто за номерами комірок).
+        :return: список імен змінних
+        """
+        return list(self._names)
+
+    def get_last_error(self):
+        """
+        Метод повертає код останньої помилки code
+        Для виведення повідомлення треба взяти
+        storage.ERRORS[code]
+
+        :return: код останньої помилки
+        """
+        return self._last_error
+
+    def fork(self):
+        """
+        Метод створює копію пам'яті, яка спільно використовує дані з цією
+        пам'яттю до першої зміни однієї з них (copy-on-write).
+        Час створення копії не залежить від кількості змінних.
+        :return: нова пам'ять (Storage)
+        """
+        while True:
+            origin = self._origin or self
+            with origin._lock:
+                if (self._origin or self) is not origin:   # дані вже скопійовано
+                    continue
+                storage = Storage()
+                storage._slots = self._slots
+                storage._names = self._names
+                storage._values = self._values
+                storage._origin = origin
+                storage._shared = origin._shared = True
+                origin._forks.add(storage)
+            return storage
+
+    def writable(self):
+        """
+        Метод готує пам'ять до зміни: якщо дані спільні з іншою пам'яттю,
+        то пам'ять, створена методом fork, отримує власні копії даних.
+        Код, що змінює _values безпосередньо (наприклад, функції програм
+        рушіїв виконання), має викликати цей метод перед виконанням.
+        :return: список значень пам'яті (_values)
+        """
+        if not self._shared:
+            return self._values
+        origin = self._origin
+        if origin is not None:
+            with origin._lock:
+                if self._origin is origin:
+                    self._detach()
+                    origin._forks.discard(self)
+        with self._lock:
+            for storage in list(self._forks):
+                storage._detach()
+            self._forks.clear()
+            self._shared = False
+        return self._values
+
+    def snapshot(self, path):
+        """
+        Метод атомарно записує знімок пам'яті у файл (див. `journal.py`).
+        Якщо журнал пам'яті відкритий, то у знімку запам'ятовується поточна
+        позиція журналу, тому при відновленні повторюються лише наступні
+        записи журналу.
+        :param path: шлях до файлу знімка
+        :return: None
+        """
+        position = self._journal.position() if self._journal is not None else (0, 0)
+        _journal_module.write_snapshot(path, self._names, self._values, position)
+
+    def restore(self, path, journal=None):
+        """
+        Метод замінює вміст пам'яті станом зі знімка та журналу.
+        Таблиця символів та список значень змінюються на місці.
+        Якщо журнал пам'яті відкритий, то після відновлення він стискається
+        (див. `compact`).
+        :param path: шлях до файлу знімка або None - порожня пам'ять
+        :param journal: шлях до файлу журналу, записи якого повторюються
+            після читання знімка, або None
+        :return: кількість повторених записів журналу
+        """
+        names, values, position = _journal_module.read_snapshot(path) if path is not None else ([], [], (0, 0))
+        current = self.writable()
+        self._slots.clear()
+        self._slots.update(zip(names, range(len(names))))
+        self._names[:] = names
+        if isinstance(current, list):
+            list.__setitem__(current, slice(None), values)
+        else:
+            current.clear()
+            for value in values:
+                current.append(value)
+        count = 0
+        if journal is not None and os.path.exists(journal):
+            count = _journal_module.replay(journal, self, position)
+        if self._journal is not None:
+            self.compact()
+        self._last_error = 0
+        return count
+
+    def open_journal(self, path, snapshot=None, fsync="interval", interval=1.0, compact_size=None):
+        """
+        Метод відкриває журнал змін пам'яті: усі наступні операції add,
+        set, remove, clear та присвоєння значень дописуються у журнал.
+        Список значень при цьому замінюється (див. `journal.JournalValues`).
+        :param path: шлях до файлу журналу
+        :param snapshot: шлях до файлу знімка для стиснення журналу
+        :param fsync: політика fsync (див. `journal.FSYNC_POLICIES`)
+        :param interval: інтервал fsync у секундах для політики "interval"
+        :param compact_size: розмір журналу у байтах, після досягнення якого
+            журнал автоматично стискається, або None
+        :return: None
+        """
+        if compact_size is not None and snapshot is None:
+            raise ValueError("для стиснення журналу потрібен шлях до знімка")
+        values = self.writable()
+        if not isinstance(values, list):
+            raise TypeError("журнал підтримує лише пам'ять зі списком значень")
+        self.close_journal()
+        journal = _journal_module.Journal(path, fsync, interval)
+        journal.snapshot, journal.compact_size = snapshot, compact_size
+        self._values = _journal_module.JournalValues(self._values, journal, self)
+        self._journal = journal
+
+    def close_journal(self):
+        """
+        Метод закриває журнал змін пам'яті (якщо він відкритий) та
+        повертає звичайний список значень.
+        :return: None
+        """
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+            self._values = list(self._values)
+
+    def compact(self):
+        """
+        Метод стискає журнал: записує знімок пам'яті у файл знімка журналу
+        та видаляє записи журналу.
+        :return: None
+        """
+        journal = self._journal
+        if journal is None or journal.snapshot is None:
+            raise ValueError("журнал зі шляхом до знімка не відкритий")
+        position = (journal.generation + 1, 0)
+        _journal_module.write_snapshot(journal.snapshot, self._names, self._values, position)
+        journal.truncate()
+
+    def _journal_written(self):
+        """
+        Метод стискає журнал, якщо його розмір досяг межі стиснення.
+        :return: None
+        """
+        journal = self._journal
+        if journal.compact_size is not None and journal.size() >= journal.compact_size:
+            self.compact()
+
+    def _detach(self):
+        """
+        Метод замінює спільні дані пам'яті власними копіями.
+        Викликається з блокуванням пам'яті, дані якої використовуються.
+        :return: None
+        """
+        self._slots = self._slots.copy()
+        self._names = self._names.copy()
+        self._values = self._values.copy()
+        self._origin = None
+        self._shared = False
+
+
+def read_value(variable):
+    """
+    Функція здійснює введення значення змінної з клавіатури.
+    :param variable: змінна
+    :return: число або None, якщо введено не число
+    """
+    try:
+        return float(input("Введіть значення {}: ".format(variable)))
+    except ValueError:
+        return
+
+
+_default = Storage()    # пам'ять за замовчуванням для функцій модуля
+_slots = _default._slots  # таблиця символів: ім'я змінної -> номер комірки
+_names = _default._names  # імена змінних за номерами комірок
+_values = _default._values  # пам'ять: значення змінних за номерами комірок
+
+
 def add(variable):
     """
     Функція додає змінну у память.
@@ -24,13 +452,7 @@ def add(variable):
     :param variable: змінна
     :return: Код помилки (int)
     """
-    global _storage, _last_error
-
-    if variable in _storage:
-        _last_error = 1
-        return
-    _storage[variable] = None
-    _last_error = 0
+    _default.add(variable)
 
 
 def is_in(variable) -> bool:
@@ -39,9 +461,7 @@ def is_in(variable) -> bool:
     :param variable: змінна
     :return: булівське значенна (True, якщо є)
     """
-    global _storage
-
-    return variable in _storage
+    return variable in _slots
 
 
 def get(variable):
@@ -52,16 +472,7 @@ def get(variable):
     :param variable: змінна
     :return: значення змінної або None, якщо змінна не існує або невизначена
     """
-    global _storage, _last_error
-
-    if variable not in _storage:
-        _last_error = 2
-        return
-    if _storage[variable] is None:
-        _last_error = 3
-        return
-    _last_error = 0
-    return _storage[variable]
+    return _default.get(variable)
 
 
 def set(variable, value):
@@ -72,13 +483,7 @@ def set(variable, value):
     :param value: нове значення
     :return: Код помилки (int)
     """
-    global _storage, _last_error
-
-    if variable not in _storage:
-        _last_error = 2
-        return
-    _storage[variable] = value
-    _last_error = 0
+    _default.set(variable, value)
 
 
 def input_var(variable):
@@ -88,18 +493,7 @@ def input_var(variable):
     :param variable: змінна
     :return: Код помилки (int)
     """
-    global _storage, _last_error
-
-    if variable not in _storage:
-        _last_error = 2
-        return
-    try:
-        value = float(input("Введіть значення {}: ".format(variable)))
-    except ValueError:
-        _last_error = 3
-        return
-    _storage[variable] = value
-    _last_error = 0
+    _default.input_var(variable)
 
 
 def input_all():
@@ -108,10 +502,7 @@ def input_all():
     усіх змінних з пам'яті
     :return: Код помилки (int)
     """
-    global _storage
-
-    for variable in _storage:
-        input_var(variable)
+    _default.input_all()
 
 
 def clear():
@@ -119,9 +510,114 @@ def clear():
     Функція видаляє усі змінні з пам'яті.
     :return: None
     """
-    global _storage
+    _default.clear()
+
+
+def remove(variable):
+    """
+    Функція видаляє змінну з пам'яті (див. `Storage.remove`).
+    Якщо така змінна не існує, то встановлює помилку
+    :param variable: змінна
+    :return: None
+    """
+    _default.remove(variable)
+
+
+def remove_many(variables):
+    """
+    Функція видаляє кілька змінних з пам'яті (див. `Storage.remove_many`).
+    Якщо якась змінна не існує, то встановлює помилку
+    :param variables: ітерований об'єкт змінних
+    :return: None
+    """
+    _default.remove_many(variables)
+
+
+def slot(variable):
+    """
+    Функція повертає номер комірки змінної.
+    Якщо така змінна не існує, то встановлює помилку
+    :param variable: змінна
+    :return: номер комірки або None, якщо змінна не існує
+    """
+    return _default.slot(variable)
+
+
+def name(index):
+    """
+    Функція повертає ім'я змінної за номером комірки.
+    Якщо такої комірки немає, то встановлює помилку
+    :param index: номер комірки
+    :return: ім'я змінної або None, якщо комірки немає
+    """
+    return _default.name(index)
+
+
+def variables():
+    """
+    Функція повертає список імен змінних у порядку їх додавання
+    (тобто за номерами комірок).
+    :return: список імен змінних
+    """
+    return list(_names)
+
+
+def fork():
+    """
+    Функція створює копію пам'яті за замовчуванням (див. `Storage.fork`).
+    :return: нова пам'ять (Storage)
+    """
+    return _default.fork()
+
+
+def snapshot(path):
+    """
+    Функція записує знімок пам'яті за замовчуванням (див. `Storage.snapshot`).
+    :param path: шлях до файлу знімка
+    :return: None
+    """
+    _default.snapshot(path)
 
-    _storage = {}
+
+def restore(path, journal=None):
+    """
+    Функція відновлює пам'ять за замовчуванням зі знімка та журналу
+    (див. `Storage.restore`).
+    :param path: шлях до файлу знімка або None
+    :param journal: шлях до файлу журналу або None
+    :return: кількість повторених записів журналу
+    """
+    return _default.restore(path, journal)
+
+
+def open_journal(path, snapshot=None, fsync="interval", interval=1.0, compact_size=None):
+    """
+    Функція відкриває журнал змін пам'яті за замовчуванням
+    (див. `Storage.open_journal`) та оновлює посилання _values.
+    :return: None
+    """
+    global _values
+    _default.open_journal(path, snapshot, fsync, interval, compact_size)
+    _values = _default._values
+
+
+def close_journal():
+    """
+    Функція закриває журнал змін пам'яті за замовчуванням та оновлює
+    посилання _values.
+    :return: None
+    """
+    global _values
+    _default.close_journal()
+    _values = _default._values
+
+
+def compact():
+    """
+    Функція стискає журнал пам'яті за замовчуванням (див. `Storage.compact`).
+    :return: None
+    """
+    _default.compact()
 
 
 def get_last_error():
@@ -132,8 +628,7 @@ def get_last_error():
 
     :return: код останньої помилки
     """
-    global _last_error
-    return _last_error
+    return _default._last_error
 
 
 if __name__ == "__main__":
@@ -174,4 +669,124 @@ if __name__ == "__main__":
 
     assert not is_in("_asda") and get_last_error() == 0
 
+    assert slot("d") == 1 and name(1) == "d" and variables() == ["a", "d"]
+    assert slot("_asda") is None and get_last_error() == 2
+    assert name(2) is None and get_last_error() == 2
+    values = _values
+    clear()
+    add("d")
+    assert slot("d") == 0 and values is _values and values == [None]
+
+    set("d", 1.0)
+    first = fork()
+    second = first.fork()
+    assert first.get("d") == 1.0 and first._values is _values and second._values is _values
+    first.set("d", 2.0)
+    assert get("d") == 1.0 and first.get("d") == 2.0 and second.get("d") == 1.0
+    assert first._values is not _values and second._values is _values
+    add("e")
+    assert _values is values and second.variables() == ["d"] and not second.is_in("e")
+    second.add("f")
+    assert second.slot("f") == 1 and slot("f") is None and get_last_error() == 2
+    third = first.fork()
+    third.clear()
+    assert first.variables() == ["d"] and first.get("d") == 2.0 and third.variables() == []
+    third = first.fork()
+    third.add("g")
+    third.add("h")
+    third.set("h", 5.0)
+    third.remove("d")
+    assert third.variables() == ["g", "h"] and third.slot("h") == 1 and third.get("h") == 5.0
+    assert first.variables() == ["d"] and first.get("d") == 2.0
+    third.remove("d")
+    assert third.get_last_error() == 2
+    third.add("i")
+    third.add("j")
+    third.set("j", 6.0)
+    third.remove_many(["g", "i", "x"])
+    assert third.get_last_error() == 2 and third.variables() == ["h", "j"]
+    assert third.slot("j") == 1 and third.get("j") == 6.0
+
+    def session(number):
+        own = base.fork()
+        for i in range(1000):
+            own.set("n", number)
+            assert own.get("n") == number and own.get_last_error() == 0
+            assert own.get("m") is None and own.get_last_error() == 2
+        results[number] = own.get("n")
+
+    base = Storage()
+    base.add("n")
+    results = {}
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == {i: i for i in range(8)} and base.get("n") is None
+
+    import shutil
+    import tempfile
+
+    directory = tempfile.mkdtemp()
+    try:
+        state, log = os.path.join(directory, "state.snap"), os.path.join(directory, "state.log")
+        memory = Storage()
+        memory.add("a")
+        memory.add("b")
+        memory.set("a", 1.5)
+        memory.snapshot(state)
+        memory.open_journal(log, state, fsync="never")
+        memory.add("c")
+        memory._values[2] = 3.0         # як команда SETS або функція програми
+        memory.set("a", None)
+        memory.add("t")
+        memory.remove("b")
+        memory._values[1] = 4.0
+        restored = Storage()            # "збій" без закриття журналу
+        assert restored.restore(state, log) == 6
+        assert restored.variables() == ["a", "c", "t"] and restored.get("c") == 4.0
+        assert restored.get("a") is None and restored.get_last_error() == 3
+        memory.compact()
+        assert os.path.getsize(log) == 16 and Storage().restore(state, log) == 0
+        memory.clear()
+        memory.add("d")
+        memory.close_journal()
+        assert type(memory._values) is list
+        restored.restore(state, log)
+        assert restored.variables() == ["d"] and restored.get("d") is None
+
+        memory = Storage()
+        memory.open_journal(log, state, fsync="always", compact_size=200)
+        for i in range(50):
+            memory.add("x{}".format(i))
+            memory.set("x{}".format(i), float(i))
+        assert os.path.getsize(log) < 200
+        memory.close_journal()
+        restored.restore(state, log)
+        assert restored.get("x49") == 49.0 and len(restored.variables()) == 50
+        restored.restore(None)
+        assert restored.variables() == [] and restored._values == []
+
+        # записи журналу до знімка не повторюються
+        os.remove(log)
+        memory = Storage()
+        memory.open_journal(log, state, fsync="never")
+        memory.add("a")
+        memory.add("b")
+        memory.set("b", 5.0)
+        memory.remove("a")
+        memory.add("c")
+        memory.snapshot(state)
+        assert restored.restore(state, log) == 0
+        assert restored.variables() == ["b", "c"] and restored.get("b") == 5.0 and restored.get("c") is None
+        memory.set("c", 1.0)
+        assert restored.restore(state, log) == 1 and restored.get("c") == 1.0
+        memory.add("d")         # збій між записом знімка та очищенням журналу
+        _journal_module.write_snapshot(state, memory._names, memory._values, (memory._journal.generation + 1, 0))
+        assert restored.restore(state, log) == 0 and restored.variables() == ["b", "c", "d"]
+        memory.close_journal()
+    finally:
+        shutil.rmtree(directory)
+
     print("Success = True")
\ No newline at end of file
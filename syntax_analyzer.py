@@ -21,9 +21,15 @@
 правильність розставлення дужок.
 Функція `check_assignment_syntax` за заданим списком токенів
 для присвоєння має повернути булівське значення та (можливо) помилку.
+
+Обидві функції використовують скінченний автомат `SyntaxMachine`,
+переходи якого задані таблицею `_TRANSITIONS` (побудованою з VALID_PAIRS,
+VALID_START та VALID_END). Автомат отримує токени по одному, тому його
+можна запускати у тому ж проході, що й генерацію коду
+(див. `code_generator._iterative_expression`).
 """
 
-from tokenizer import get_tokens, Token
+from tokenizer import get_tokens, Token, TOKEN_TYPE, TOKEN_CODES, VARIABLE, EQUAL, LEFT_PAREN, RIGHT_PAREN
 
 # словник множин допустимих наступних токенів для заданого токена
 VALID_PAIRS = {
@@ -51,47 +57,165 @@ VALID_START = ('variable', 'constant', 'left_paren')
 # кортеж допустимих останніх токенів
 VALID_END = ('variable', 'constant', 'right_paren')
 
+# ті ж таблиці з цілочисельними кодами типів токенів (див. tokenizer.TOKEN_CODES):
+# _VALID_NEXT_CODES[<код токена>] - множина кодів допустимих наступних токенів
+_VALID_NEXT_CODES = tuple(
+    frozenset(TOKEN_CODES[next_type] for next_type in VALID_PAIRS[type])
+    for type in TOKEN_TYPE
+)
+_VALID_START_CODES = frozenset(TOKEN_CODES[type] for type in VALID_START)
+_VALID_END_CODES = frozenset(TOKEN_CODES[type] for type in VALID_END)
+
+# стани автомата SyntaxMachine: коди типів токенів (стан після токена
+# такого типу всередині виразу) та три додаткові стани
+_ASSIGN_START = len(TOKEN_TYPE)     # перед змінною зліва від '='
+_ASSIGN_TARGET = _ASSIGN_START + 1  # після змінної зліва від '='
+_EXPR_START = _ASSIGN_START + 2      # перед першим токеном виразу
+
+# таблиця переходів: _TRANSITIONS[<стан>][<код токена>] - наступний стан
+# або -1, якщо токен у цьому стані недопустимий
+_TRANSITIONS = tuple(
+    tuple(code if code in _VALID_NEXT_CODES[state] else -1 for code in range(len(TOKEN_TYPE)))
+    for state in range(len(TOKEN_TYPE))
+) + (
+    tuple(_ASSIGN_TARGET if code == VARIABLE else -1 for code in range(len(TOKEN_TYPE))),
+    tuple(_EXPR_START if code == EQUAL else -1 for code in range(len(TOKEN_TYPE))),
+    tuple(code if code in _VALID_START_CODES else -1 for code in range(len(TOKEN_TYPE))),
+)
+
+
+class SyntaxMachine:
+    """Скінченний автомат для перевірки синтаксису присвоєння або виразу.
+
+    Токени подаються по одному методом `feed`, результат перевірки
+    (такий самий, як у `check_assignment_syntax` / `check_expression_syntax`)
+    повертає метод `result`.
+
+    Під час роботи автомат запам'ятовує перші помилки кожного виду
+    (недопустима змінна зліва, неправильне присвоєння, недопустимий початок
+    виразу, недопустима пара, від'ємний баланс дужок), а `result` обирає
+    з них одну у тому ж порядку пріоритетів, що й функції перевірки.
+    """
+
+    __slots__ = ("assignment", "state", "count", "balance", "last", "valid",
+                 "target_error", "assignment_error", "start_error",
+                 "paren_error", "pair_error")
+
+    def __init__(self, assignment=True):
+        """
+        :param assignment: True - перевіряти присвоєння, False - вираз
+        """
+        self.assignment = assignment
+        self.state = _ASSIGN_START if assignment else _EXPR_START
+        self.count = 0                  # кількість отриманих токенів
+        self.balance = 0                # баланс дужок
+        self.last = None                # останній отриманий токен
+        self.valid = True               # чи немає помилок у отриманих токенах
+        self.target_error = False       # зліва від '=' не змінна
+        self.assignment_error = False   # другий токен не '='
+        self.start_error = False        # недопустимий перший токен виразу
+        self.paren_error = False        # баланс дужок ставав від'ємним
+        self.pair_error = None          # перша недопустима пара токенів
+
+    def feed(self, token):
+        """Метод обробляє наступний токен.
+
+        Повертає True, якщо всі отримані токени можуть бути початком
+        правильного присвоєння (виразу), інакше False.
+
+        :param token: токен типу Token
+        :return: булівське значення
+        """
+        code = token.code
+        state = self.state
+        next_state = _TRANSITIONS[state][code]
+        if next_state < 0:
+            if state < _ASSIGN_START:
+                if self.pair_error is None:
+                    self.pair_error = (self.last, token)
+            elif state == _ASSIGN_START:
+                self.target_error = True
+            elif state == _ASSIGN_TARGET:
+                self.assignment_error = True
+            else:
+                self.start_error = True
+            self.valid = False
+            next_state = code
+        if code == LEFT_PAREN:
+            self.balance += 1
+        elif code == RIGHT_PAREN:
+            self.balance -= 1
+            if self.balance < 0:
+                self.paren_error = True
+                self.valid = False
+        self.state = next_state
+        self.last = token
+        self.count += 1
+        return self.valid
+
+    def result(self):
+        """Метод повертає результат перевірки всіх отриманих токенів.
+
+        :return:
+            success: булівське значення
+            error: рядок помилки
+        """
+        if self.count < (3 if self.assignment else 1):
+            return False, ERRORS["empty_expr"]
+        end_error = self.last.code not in _VALID_END_CODES
+        if self.assignment:
+            if end_error or self.target_error:
+                return False, ERRORS["invalid_start"]
+            if self.assignment_error:
+                return False, ERRORS["incorrect_assignment"]
+        if self.paren_error or self.balance != 0:
+            return False, ERRORS["incorrect_parens"]
+        if end_error or self.start_error:
+            return False, ERRORS["invalid_start"]
+        if self.pair_error is not None:
+            return False, ERRORS["invalid_pair"].format(*self.pair_error)
+        return True, ""
+
 
 def check_assignment_syntax(tokens):
     """Функція перевіряє синтаксичну правильність присвоєння за списком токенів.
     Повертає True/False та рядок помилки.
     Якщо помилки немає, то повертає порожній рядок.
-    Використовує функцію check_expression_syntax
+    Використовує автомат SyntaxMachine
     :param tokens: список токенів типу Token (див. tokenizer.py)
     :return:
         success: булівське значення
         error: рядок помилки
     """
-    if len(tokens) < 3:
-        return False, ERRORS["empty_expr"]
-    if _check_start_end(tokens) != True:
-        return False, ERRORS["invalid_start"]
-    if tokens[0].type != "variable":
-        return False, ERRORS["invalid_start"]
-    if tokens[1].type != "equal":
-        return False, ERRORS["incorrect_assignment"]
-    return check_expression_syntax(tokens[2:])
+    return _run_machine(SyntaxMachine(assignment=True), tokens)
 
 
 def check_expression_syntax(tokens):
     """Функція перевіряє синтаксичну правильність виразу за списком токенів.
     Повертає True/False та рядок помилки.
     Якщо помилки немає, то повертає порожній рядок
+    Використовує автомат SyntaxMachine
     :param tokens: список токенів типу Token (див. tokenizer.py)
     :return:
         success: булівське значення
         error: рядок помилки
     """
-    if len(tokens) < 1:
-        return False, ERRORS["empty_expr"]
-    if not _check_parens(tokens):
-        return False, ERRORS["incorrect_parens"]
-    if _check_start_end(tokens) != True:
-        return False, ERRORS["invalid_start"]
-    for i in range(len(tokens) - 1):
-        if not _check_pair(tokens[i], tokens[i + 1]):
-            return False, ERRORS["invalid_pair"].format(tokens[i], tokens[i + 1])
-    return True, ""
+    return _run_machine(SyntaxMachine(assignment=False), tokens)
+
+
+def _run_machine(machine, tokens):
+    """Функція подає автомату всі токени та повертає результат перевірки.
+
+    :param machine: автомат SyntaxMachine
+    :param tokens: список токенів
+    :return:
+        success: булівське значення
+        error: рядок помилки
+    """
+    feed = machine.feed
+    for token in tokens:
+        feed(token)
+    return machine.result()
 
 
 def _check_parens(tokens):
@@ -102,9 +226,9 @@ def _check_parens(tokens):
     """
     balance = 0
     for token in tokens:
-        if token.type == "left_paren":
+        if token.code == LEFT_PAREN:
             balance += 1
-        elif token.type == "right_paren":
+        elif token.code == RIGHT_PAREN:
             balance -= 1
         if balance < 0:
             return False
@@ -119,7 +243,7 @@ def _check_pair(token, next_token):
     :param next_token: наступний токен
     :return: success - булівське значення
     """
-    return next_token.type in VALID_PAIRS[token.type]
+    return next_token.code in _VALID_NEXT_CODES[token.code]
 
 
 def _check_start_end(tokens):
@@ -130,7 +254,7 @@ def _check_start_end(tokens):
     """
     if not tokens:
         return True
-    if tokens[0].type not in VALID_START or tokens[-1].type not in VALID_END:
+    if tokens[0].code not in _VALID_START_CODES or tokens[-1].code not in _VALID_END_CODES:
         return False
     return True
 
@@ -17,6 +17,9 @@
 Кожний токен (див. class Token) -- це пара: (<тип токену>, <значення токену>)
 """
 
+import re
+from sys import intern
+
 # типи токенів
 TOKEN_TYPE = (
     "variable",
@@ -40,23 +43,230 @@ TOKEN_TYPES = {
 }
 
 
+# цілочисельні коди типів токенів (індекси у кортежі TOKEN_TYPE)
+VARIABLE, CONSTANT, OPERATION, EQUAL, LEFT_PAREN, RIGHT_PAREN, OTHER = range(len(TOKEN_TYPE))
+
+# словник, що співставляє типи токенів до їх кодів
+TOKEN_CODES = {type: code for code, type in enumerate(TOKEN_TYPE)}
+
+
 class Token:
+    """Токен - пара (<тип токену>, <значення токену>).
+
+    Для економії пам'яті токен не має словника атрибутів (__slots__)
+    і зберігає тип як ціле число `code` (індекс у TOKEN_TYPE).
+    Рядковий тип доступний через властивість `type`.
+
+    Токени одного символа з TOKEN_TYPES спільні для всіх рядків
+    (див. `_FIXED_TOKENS`), тому токени не слід змінювати.
+    """
+
+    __slots__ = ("code", "value")
 
     def __init__(self, type, value):
-        assert type in TOKEN_TYPE, 'недопустимий тип токена'
-        self.type = type
+        code = TOKEN_CODES.get(type)
+        assert code is not None, 'недопустимий тип токена'
+        self.code = code
         self.value = value
 
+    @property
+    def type(self):
+        return TOKEN_TYPE[self.code]
+
+    @type.setter
+    def type(self, type):
+        code = TOKEN_CODES.get(type)
+        assert code is not None, 'недопустимий тип токена'
+        self.code = code
+
     def __eq__(self, __value: object) -> bool:
-        return self.type == __value.type and self.value == __value.value
+        if not isinstance(__value, Token):
+            return NotImplemented
+        return self.code == __value.code and self.value == __value.value
 
     def __repr__(self):
         return f"Token(type='{self.type}', value='{self.value}')"
 
 
+def _make_token(code, value, _new=object.__new__):
+    """Функція швидко створює токен за кодом типу без перевірки типу.
+
+    :param code: код типу токена
+    :param value: значення токена
+    :return: токен типу Token
+    """
+    token = _new(Token)
+    token.code = code
+    token.value = value
+    return token
+
+
+# спільні токени для символів з TOKEN_TYPES
+_FIXED_TOKENS = {char: Token(type, char) for char, type in TOKEN_TYPES.items()}
+
+
 def get_tokens(string):
     """Функція за рядком повертає список токенів типу Token.
 
+    Рядок проглядається один раз за допомогою індексу (див. `_scan`),
+    тому час роботи лінійний відносно довжини рядка.
+
+    :param string: рядок
+    :return: список токенів
+    """
+    return list(_scan(string))
+
+
+def iter_tokens(source):
+    """Функція-генератор повертає токени програми один за одним
+    разом з номером рядка, у якому стоїть токен.
+
+    source може бути відкритим файлом або будь-яким ітерованим об'єктом
+    рядків (наприклад, списком). Рядки читаються по одному і перед
+    розбором обрізаються за допомогою str.strip(), так само як у
+    `main.exec_program`. Ні програма, ні рядок не перетворюються у список
+    токенів, тому пам'ять не залежить від розміру програми.
+
+    Номери рядків починаються з 1.
+
+    :param source: файл або ітерований об'єкт рядків
+    :return: генератор пар (<номер рядка>, <токен>)
+    """
+    for line_number, line in enumerate(source, 1):
+        for token in _scan(line.strip()):
+            yield line_number, token
+
+
+def iter_lines_tokens(source):
+    """Функція-генератор повертає токени програми, згруповані за рядками.
+
+    На відміну від `iter_tokens` повертає також порожні рядки (з порожнім
+    списком токенів), тому може бути першою стадією лінивого конвеєра
+    компіляції (див. `code_generator.iter_code`).
+
+    :param source: файл або ітерований об'єкт рядків
+    :return: генератор пар (<номер рядка>, <список токенів рядка>)
+    """
+    for line_number, line in enumerate(source, 1):
+        yield line_number, list(_scan(line.strip()))
+
+
+def _scan(string):
+    """Функція-генератор за один прохід по рядку повертає токени.
+
+    Замість відрізання залишку рядка після кожного токена (як у
+    `_get_next_token`) рухає індекс по рядку. Для символів ASCII клас
+    символу береться з таблиці `_ASCII_CLASS`, а довгі ідентифікатори,
+    константи та послідовності інших символів пропускаються одним викликом
+    скомпільованого регулярного виразу. Для символів поза ASCII
+    використовуються ті ж перевірки `isdigit()` / `isidentifier()`,
+    що й у `_get_*` функціях, тому результат співпадає з
+    `_get_tokens_legacy`.
+
+    Токени одного символа беруться з `_FIXED_TOKENS`, а імена змінних
+    інтернуються (sys.intern), тому однакові імена в усій програмі
+    зберігаються в пам'яті один раз.
+
+    :param string: рядок
+    :return: генератор токенів
+    """
+    n = len(string)
+    i = 0
+    while i < n:
+        char = string[i]
+        cls = _ASCII_CLASS.get(char)
+        if cls is None:
+            cls = _char_class(char)
+        if cls == _FIXED:
+            yield _FIXED_TOKENS[char]
+            i += 1
+        elif cls == _SPACE:
+            i += 1
+        elif cls == _DIGIT:
+            j = _scan_constant(string, i + 1, n)
+            yield _make_token(CONSTANT, string[i:j])
+            i = j
+        elif cls == _IDENT:
+            j = _ASCII_IDENT_TAIL.match(string, i + 1).end()
+            while j < n and (string[j].isidentifier() or string[j].isdigit()):
+                j = _ASCII_IDENT_TAIL.match(string, j + 1).end()
+            yield _make_token(VARIABLE, intern(string[i:j]))
+            i = j
+        else:
+            j = _ASCII_OTHER_RUN.match(string, i + 1).end()
+            while j < n and _char_class(string[j]) == _OTHER:
+                j = _ASCII_OTHER_RUN.match(string, j + 1).end()
+            yield _make_token(OTHER, string[i:j])
+            i = j
+
+
+def _scan_constant(string, i, n):
+    """Функція повертає індекс кінця константи, перша цифра якої
+    стоїть перед позицією i.
+
+    Константа може містити не більше однієї десяткової крапки.
+
+    :param string: рядок
+    :param i: індекс символу після першої цифри константи
+    :param n: довжина рядка
+    :return: індекс першого символу після константи
+    """
+    point_count = 0
+    while i < n:
+        match = _ASCII_DIGITS.match(string, i)
+        i = match.end()
+        if i >= n:
+            break
+        char = string[i]
+        if char == '.' and point_count < 1:
+            point_count += 1
+            i += 1
+        elif char.isdigit():
+            i += 1
+        else:
+            break
+    return i
+
+
+def _char_class(char):
+    """Функція повертає клас символу так, як його визначають `_get_*` функції.
+
+    :param char: символ
+    :return: один з класів _FIXED, _SPACE, _DIGIT, _IDENT, _OTHER
+    """
+    if char in TOKEN_TYPES:
+        return _FIXED
+    if char == " ":
+        return _SPACE
+    if char.isdigit():
+        return _DIGIT
+    if char.isidentifier():
+        return _IDENT
+    return _OTHER
+
+
+# класи символів для `_scan`
+_FIXED, _SPACE, _DIGIT, _IDENT, _OTHER = range(5)
+
+# таблиця класів для символів ASCII
+_ASCII_CLASS = {chr(code): _char_class(chr(code)) for code in range(128)}
+
+# продовження ідентифікатора, константи та послідовності інших символів,
+# що складаються лише з символів ASCII
+_ASCII_IDENT_TAIL = re.compile(r'[A-Za-z0-9_]*')
+_ASCII_DIGITS = re.compile(r'[0-9]*')
+_ASCII_OTHER_RUN = re.compile(
+    '[' + re.escape(''.join(c for c, cls in _ASCII_CLASS.items() if cls == _OTHER)) + ']*'
+)
+
+
+def _get_tokens_legacy(string):
+    """Функція за рядком повертає список токенів, відрізаючи залишок
+    рядка після кожного токена за допомогою `_get_next_token`.
+
+    Це початкова реалізація `get_tokens`, яка працює за квадратичний час
+    від довжини рядка. Залишена як еталон для перевірки `_scan`.
+
     :param string: рядок
     :return: список токенів
     """
@@ -293,4 +503,18 @@ if __name__ == "__main__":
             if exp != real:
                 print(f'Expected: {exp}, got {real}')
 
+    for line in ["(((ab1_ - 345.56)(*/.2{_cde23", "x = (a + b)",
+                 "x = (_a_s12 + 12.12321)*(123 _asd. - 3.)",
+                 "x\t= 1.2.3 + ї2 ²5 $$é", ""]:
+        success = success and get_tokens(line) == _get_tokens_legacy(line)
+
+    tagged = list(iter_tokens(["x = a\n", "\n", "  y = (b)\n"]))
+    success = success and [n for n, _ in tagged] == [1, 1, 1, 3, 3, 3, 3, 3]
+    success = success and [t for _, t in tagged] == get_tokens("x = a") + get_tokens("y = (b)")
+
+    tokens = get_tokens("abc = abc + (1)")
+    success = success and tokens[0].value is tokens[2].value and tokens[1] is _FIXED_TOKENS["="]
+    success = success and tokens[4].code == LEFT_PAREN and tokens[4].type == "left_paren"
+    success = success and not hasattr(tokens[0], "__dict__")
+
     print("Success =", success)
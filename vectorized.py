@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Модуль призначено для виконання коду програми одразу для багатьох наборів
+значень змінних за допомогою NumPy.
+
+Функція `execute_vectorized` виконує код так само, як
+`interpreter.execute`, але елементами стеку є масиви NumPy: кожна команда
+обробляє одразу всі набори значень. Вхідні змінні задаються масивами
+(або числами), які узгоджуються за правилами broadcasting NumPy.
+Пам'ять (storage) не використовується.
+
+Ділення на 0 не зупиняє виконання: для кожного набору значень
+запам'ятовується, чи сталося ділення на 0, і для таких наборів наступні
+присвоєння не виконуються, тобто значення змінних такі ж, як після
+зупинки інтерпретатора з помилкою 3. Змінні, які не отримали значення,
+мають значення NaN.
+
+Модуль потребує NumPy; інші модулі інтерпретатора його не використовують.
+"""
+
+try:
+    import numpy as np
+except ImportError:     # NumPy потрібен лише для цього модуля
+    np = None
+
+from closure_engine import _expand
+
+
+def execute_vectorized(code, inputs):
+    """Функція виконує код програми для всіх наборів значень вхідних змінних.
+
+    :param code: код програми - список кортежів (<команда>, <операнд>),
+        зокрема з командами оптимізатора та суперкомандами
+    :param inputs: словник {ім'я змінної: масив або число}
+    :return:
+        словник {ім'я змінної: масив значень} для всіх змінних,
+        яким присвоюються значення у програмі
+        булевий масив - для кожного набору значень, чи сталося ділення на 0
+        код помилки (див. `interpreter.ERRORS`), спільний для всіх наборів:
+        1 - недопустима команда, 2 - змінна не має значення
+    """
+    if np is None:
+        raise ImportError("execute_vectorized потребує NumPy")
+    env = {variable: np.asarray(value, dtype=float) for variable, value in inputs.items()}
+    shape = np.broadcast_shapes(*(value.shape for value in env.values()))
+    failed = np.zeros(shape, dtype=bool)
+    assigned = {}
+    stack = []
+    error = 0
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        for command, operand in _expand(code):
+            if command == "LOADC":
+                stack.append(operand)
+            elif command == "LOADV":
+                if operand not in env:
+                    error = 2
+                    break
+                stack.append(env[operand])
+            elif command == "ADD":
+                b = stack.pop()
+                stack.append(stack.pop() + b)
+            elif command == "SUB":
+                b = stack.pop()
+                stack.append(stack.pop() - b)
+            elif command == "MUL":
+                b = stack.pop()
+                stack.append(stack.pop() * b)
+            elif command == "DIV":
+                b = np.asarray(stack.pop(), dtype=float)
+                failed |= b == 0
+                stack.append(stack.pop() / b)
+            elif command == "SET" or command == "SETKEEP":
+                value = stack.pop() if command == "SET" else stack[-1]
+                _assign(env, assigned, operand, value, failed)
+            elif command == "DUP":
+                stack.append(stack[-1])
+            else:
+                error = 1
+                break
+    outputs = {variable: np.broadcast_to(env[variable], shape).copy() for variable in assigned}
+    return outputs, failed, error
+
+
+def _assign(env, assigned, variable, value, failed):
+    """Функція присвоює значення змінній для наборів значень без помилки.
+
+    Для наборів, у яких вже сталося ділення на 0, залишається попереднє
+    значення змінної (або NaN, якщо значення не було).
+
+    :param env: словник {ім'я змінної: масив значень}
+    :param assigned: словник змінних, яким присвоювались значення
+    :param variable: ім'я змінної
+    :param value: масив або число
+    :param failed: булевий масив наборів з діленням на 0
+    :return: None
+    """
+    value = np.asarray(value, dtype=float)
+    if failed.any():
+        value = np.where(failed, env.get(variable, np.nan), value)
+    env[variable] = value
+    assigned[variable] = True
+
+
+if __name__ == "__main__":
+    import random
+
+    import interpreter
+    import storage
+    from code_generator import generate_code
+    from optimizer import peephole, select_superinstructions, FUSIONS
+
+    code, error = generate_code(["y = a * x + b", "z = y / (x - 1)", "w = 2"])
+    outputs, failed, error = execute_vectorized(code, {"a": 2.0, "b": 1.0, "x": np.arange(4.0)})
+    success = error == 0 and sorted(outputs) == ["w", "y", "z"]
+    success = success and outputs["y"].tolist() == [1.0, 3.0, 5.0, 7.0]
+    success = success and failed.tolist() == [False, True, False, False]
+    success = success and outputs["z"][[0, 2, 3]].tolist() == [-1.0, 5.0, 3.5]
+    success = success and np.isnan(outputs["z"][1]) and np.isnan(outputs["w"][1])
+    success = success and outputs["w"][[0, 2, 3]].tolist() == [2.0] * 3
+
+    outputs, failed, error = execute_vectorized(code, {"a": 2.0, "x": 1.0})
+    success = success and error == 2 and outputs == {}
+    outputs, failed, error = execute_vectorized([("LOADC", 1.0), ("SET", "x"), ("XXX", None)], {})
+    success = success and error == 1 and outputs["x"] == 1.0
+
+    # порівняння з інтерпретатором для кожного набору значень
+    rnd = random.Random(0)
+    names = ["a", "b", "c"]
+    for _ in range(100):
+        lines = []
+        for _ in range(rnd.randint(1, 4)):
+            expression = rnd.choice(names)
+            for _ in range(rnd.randint(0, 4)):
+                operand = rnd.choice(names + ["0", "2", "(a - b)"])
+                expression = "{} {} {}".format(expression, rnd.choice("+-*/"), operand)
+            lines.append("{} = {}".format(rnd.choice(names), expression))
+        code, error = generate_code(lines)
+        code = select_superinstructions(peephole(code)[0], tuple(FUSIONS))[0]
+        inputs = {name: np.array([rnd.randint(-1, 2) for _ in range(8)], dtype=float) for name in names}
+        outputs, failed, error = execute_vectorized(code, inputs)
+        for i in range(8):
+            for name in names:
+                storage.set(name, inputs[name][i])
+            expected_error = interpreter.execute(code)
+            success = success and (expected_error == 3) == failed[i]
+            for name, values in outputs.items():
+                expected = storage.get(name)
+                success = success and (values[i] == expected or np.isnan(values[i]) and np.isnan(expected))
+
+    print("Success =", success)